@@ -0,0 +1,415 @@
+# agent_pool.py
+# 프로세스 외부 에이전트 워커 풀 (AGENT_POOL_WORKERS > 0 일 때 server.py가 사용)
+# - 웹 프로세스: NER 엔티티를 task로 로컬 Unix 소켓(multiprocessing.connection)에 게시만 함
+#   → 에이전트 폴링/CSV 쓰기/필터 CPU 작업이 요청 처리와 GIL을 다투지 않음
+# - 워커 프로세스(python agent_pool.py worker ...): meeting별 AgentService(CSV tail 없이 워커 스레드만)
+#   최종 용어/terms_delta/heartbeat를 같은 연결로 반환 → 웹 프로세스가 WS 브로드캐스트
+# - meeting_id 해시로 워커 고정 (중복 제거/부정 캐시/Foundry Thread 상태가 한 프로세스에 모임)
+# - 헬스: 프로세스 종료/heartbeat 끊김 감지 → 재기동 (이미 보낸 미처리 task는 유실, 카운트)
+#   재연결 전 게시된 task는 워커별 버퍼(AGENT_POOL_BUFFER)에 보관 후 연결되면 전송, 넘치면 버림(경고 + 카운트)
+# - 종료: stop()이 atexit에 등록됨 → 워커 정지 + 소켓 임시 디렉토리 삭제
+#   워커는 받은 drain 시간 안에 AgentService들을 병렬로 정지하고 로그를 flush한 뒤 종료
+#   (시간 초과 시 SIGTERM → atexit이 돌지 않으므로 drain 시간은 대기 시간보다 짧게 전달)
+# - 워커는 서브프로세스로 띄움 (multiprocessing spawn은 server.py를 __main__으로 재실행하므로 사용 안 함)
+# - multiprocessing.connection은 gevent가 patch하지 않는 블로킹 I/O → 웹 프로세스 쪽 accept/send/recv는
+#   gevent_mode.run_blocking()으로 네이티브 스레드풀에서 실행 (patch 안 된 프로세스에서는 바로 실행)
+#
+# 메시지 (pickle 튜플):
+#   웹 → 워커   ("task", mid, item) | ("config", mid, {"freshness_sec": x}) | ("release", mid) | ("stop", drain_sec)
+#   워커 → 웹   ("hello", idx, pid) | ("term", mid, payload, traceparent) | ("delta", mid, payload, "")
+#               | ("hb", idx, pid, {mid: info})
+
+import os
+import sys
+import time
+import zlib
+import atexit
+import shutil
+import secrets
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from multiprocessing.connection import Client, Listener
+from typing import Deque, Dict, List, Optional
+
+from gevent_mode import run_blocking
+from metrics_registry import AGENT_POOL_ALIVE, AGENT_POOL_RESTARTS, remove_meeting_metrics
+
+AGENT_POOL_WORKERS       = int(os.getenv("AGENT_POOL_WORKERS", "0"))          # 0 = 웹 프로세스 내 AgentService
+AGENT_POOL_HEARTBEAT_SEC = float(os.getenv("AGENT_POOL_HEARTBEAT_SEC", "2"))
+AGENT_POOL_STALE_SEC     = float(os.getenv("AGENT_POOL_STALE_SEC", "15"))     # heartbeat 끊김 → 재기동
+AGENT_POOL_START_GRACE_SEC = float(os.getenv("AGENT_POOL_START_GRACE_SEC", "60"))  # 첫 연결까지 유예 (SDK import)
+AGENT_POOL_BUFFER        = int(os.getenv("AGENT_POOL_BUFFER", "1000"))       # 워커 재연결 대기 중 보관할 task 수 (워커별)
+AGENT_POOL_STOP_SEC      = float(os.getenv("AGENT_POOL_STOP_SEC", "10"))     # 워커 종료 대기 (초과 시 SIGTERM)
+
+
+# ---------------- 워커 프로세스 ----------------
+def _worker_main(idx: int, address: str, authkey: bytes, heartbeat_sec: float):
+    from glossify_agent import AGENT_STOP_DRAIN_SEC, prewarm_foundry, start_agent_in_background
+    from log_writer import flush_logs
+
+    prewarm_foundry()      # 첫 meeting 배정 전에 client/검증/빈 Thread 준비 (백그라운드)
+    conn = Client(address, family="AF_UNIX", authkey=authkey)
+    send_lock = threading.Lock()     # 에이전트 워커 스레드들이 동시에 결과를 보냄
+
+    def send(msg):
+        with send_lock:
+            conn.send(msg)
+
+    services: Dict[str, object] = {}
+    freshness: Dict[str, float] = {}
+    stopping: List[threading.Thread] = []     # release로 정지 중인 서비스 (종료 전 join)
+    drain_sec = AGENT_STOP_DRAIN_SEC
+
+    def stop_async(mid: str, svc, timeout: float) -> threading.Thread:
+        def _stop():
+            svc.stop(timeout=timeout)
+            remove_meeting_metrics(mid)     # 워커 프로세스 레지스트리의 meeting 시계열도 정리
+        t = threading.Thread(target=_stop, name=f"agent-stop-{mid}", daemon=True)
+        t.start()
+        return t
+
+    def svc_for(mid: str):
+        svc = services.get(mid)
+        if svc is None:
+            svc = services[mid] = start_agent_in_background(
+                meeting_id=mid,
+                freshness_sec=freshness.get(mid),
+                delta_sink=lambda payload, mid=mid: send(("delta", mid, payload, "")),
+                term_sink=lambda payload, trace, mid=mid: send(("term", mid, payload, trace)),
+                watch=False,
+            )
+        return svc
+
+    def heartbeat():
+        info = {}
+        for mid, svc in services.items():
+            info[mid] = {"qsize": svc._q.qsize(), "explain_csv": svc.explain_csv,
+                         "freshness_sec": svc.freshness_sec, **svc.metrics_snapshot()}
+        send(("hb", idx, os.getpid(), info))
+
+    send(("hello", idx, os.getpid()))
+    last_hb = 0.0
+    try:
+        while True:
+            if time.monotonic() - last_hb >= heartbeat_sec:
+                heartbeat()
+                last_hb = time.monotonic()
+            if not conn.poll(min(0.5, heartbeat_sec)):
+                continue
+            msg = conn.recv()
+            kind = msg[0]
+            if kind == "stop":
+                if len(msg) > 1 and msg[1] is not None:
+                    drain_sec = float(msg[1])
+                break
+            try:
+                if kind == "task":
+                    svc_for(msg[1])._enqueue_if_pass(msg[2])
+                elif kind == "config":
+                    mid, cfg = msg[1], msg[2]
+                    if cfg.get("freshness_sec") is not None:
+                        freshness[mid] = float(cfg["freshness_sec"])
+                        svc_for(mid).freshness_sec = freshness[mid]
+                elif kind == "release":
+                    # meeting 소유권이 다른 웹 워커로 넘어감 → 서비스 정리 (stop은 유한 drain이지만 수신 루프를 막지 않도록 별도 스레드)
+                    freshness.pop(msg[1], None)
+                    svc = services.pop(msg[1], None)
+                    stopping[:] = [t for t in stopping if t.is_alive()]
+                    if svc is not None:
+                        stopping.append(stop_async(msg[1], svc, AGENT_STOP_DRAIN_SEC))
+            except Exception as e:
+                print(f"[agent-pool:{idx}] {kind} error: {e}")
+    except (EOFError, OSError):
+        print(f"[agent-pool:{idx}] connection closed → exit")
+    finally:
+        # 모든 서비스를 drain_sec 안에 병렬 정지 → 웹 프로세스의 SIGTERM 전에 로그 flush까지 끝냄
+        deadline = time.monotonic() + drain_sec + 1.0
+        stopping += [stop_async(mid, svc, drain_sec) for mid, svc in services.items()]
+        for t in stopping:
+            t.join(max(0.0, deadline - time.monotonic()))
+        left = sum(t.is_alive() for t in stopping)
+        if left:
+            print(f"[agent-pool:{idx}] ⚠️ {left} agent(s) still stopping → exit anyway")
+        flush_logs()
+
+
+# ---------------- 웹 프로세스 쪽 ----------------
+class _Worker:
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.proc: Optional[subprocess.Popen] = None
+        self.conn = None
+        self.lock = threading.Lock()            # conn / meetings / pending 보호
+        self.started_at = 0.0
+        self.last_hb = 0.0
+        self.meetings: Dict[str, dict] = {}
+        self.pending: Deque[tuple] = deque()    # 연결 전/재연결 중 게시된 task
+        self.restarts = 0
+        self.dropped = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.proc.pid if self.proc is not None else None
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+
+class PoolHandle:
+    """server._AGENTS 에 들어가는 meeting 핸들 (AgentService 대신 explain_csv/freshness_sec 제공)"""
+
+    def __init__(self, pool: "AgentPool", meeting_id: str):
+        self.pool = pool
+        self.meeting_id = meeting_id
+
+    @property
+    def explain_csv(self) -> Optional[str]:
+        return self.pool.meeting_info(self.meeting_id).get("explain_csv")
+
+    @property
+    def freshness_sec(self) -> Optional[float]:
+        return self.pool.meeting_info(self.meeting_id).get("freshness_sec")
+
+    @freshness_sec.setter
+    def freshness_sec(self, value: float):
+        self.pool.configure(self.meeting_id, freshness_sec=value)
+
+
+class AgentPool:
+    def __init__(self, workers: int = AGENT_POOL_WORKERS):
+        self.workers: List[_Worker] = [_Worker(i) for i in range(max(1, workers))]
+        self._authkey = secrets.token_bytes(16)
+        self._sock_dir = tempfile.mkdtemp(prefix="glossify_pool_")
+        self._address = os.path.join(self._sock_dir, "agents.sock")
+        self._listener: Optional[Listener] = None
+        self._stopped = False
+
+    # --- lifecycle ---
+    def _spawn(self, w: _Worker):
+        env = {**os.environ, "AGENT_POOL_AUTHKEY": self._authkey.hex()}
+        w.conn = None
+        w.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "worker", "--idx", str(w.idx), "--address", self._address],
+            env=env, cwd=os.getcwd())
+        w.started_at = w.last_hb = time.monotonic()
+        print(f"[agent-pool] worker {w.idx} spawned (pid={w.pid})")
+
+    def _accept_loop(self):
+        while self._listener is not None:
+            try:
+                conn = run_blocking(self._listener.accept)
+                hello = run_blocking(conn.recv)
+            except Exception as e:
+                if self._listener is None:
+                    return
+                print(f"[agent-pool] accept error: {e}")
+                continue
+            if not (isinstance(hello, tuple) and hello[0] == "hello"):
+                conn.close()
+                continue
+            _, idx, pid = hello
+            w = self.workers[idx]
+            if pid != w.pid:           # 재기동 전 프로세스의 늦은 연결
+                conn.close()
+                continue
+            with w.lock:
+                w.conn = conn
+                restore = [(mid, info.get("freshness_sec")) for mid, info in w.meetings.items()]
+            w.last_hb = time.monotonic()
+            AGENT_POOL_ALIVE.labels(str(idx)).set(1)
+            print(f"[agent-pool] worker {idx} connected (pid={pid})")
+            for mid, freshness in restore:     # 재기동 후 meeting 설정 복원
+                if freshness is not None:
+                    self._send(w, ("config", mid, {"freshness_sec": freshness}))
+            self._flush_pending(w)
+
+    def start(self):
+        self._listener = Listener(self._address, family="AF_UNIX", authkey=self._authkey)
+        threading.Thread(target=self._accept_loop, name="agent-pool-accept", daemon=True).start()
+        for w in self.workers:
+            self._spawn(w)
+        atexit.register(self.stop)     # 웹 프로세스 정상 종료(gunicorn SIGTERM 포함) 시 워커/소켓 정리
+
+    def stop(self, timeout: float = AGENT_POOL_STOP_SEC):
+        if self._stopped:
+            return
+        self._stopped = True
+        drain_sec = max(0.0, timeout - 3.0)      # 워커가 정지 + flush 후 스스로 종료할 여유
+        for w in self.workers:
+            self._send(w, ("stop", drain_sec))
+        for w in self.workers:
+            if w.proc is not None:
+                try:
+                    w.proc.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    w.proc.terminate()
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+        shutil.rmtree(self._sock_dir, ignore_errors=True)
+
+    def check(self):
+        """죽었거나 heartbeat가 끊긴 워커 재기동"""
+        now = time.monotonic()
+        for w in self.workers:
+            if w.conn is None:
+                unhealthy = not w.alive() or now - w.started_at > AGENT_POOL_START_GRACE_SEC
+                reason = "not connected"
+            else:
+                unhealthy = not w.alive() or now - w.last_hb > AGENT_POOL_STALE_SEC
+                reason = "heartbeat timeout"
+            if not unhealthy:
+                continue
+            if not w.alive():
+                reason = f"exit={w.proc.returncode if w.proc is not None else None}"
+            print(f"[agent-pool] worker {w.idx} unhealthy ({reason}) → restart")
+            AGENT_POOL_ALIVE.labels(str(w.idx)).set(0)
+            AGENT_POOL_RESTARTS.labels(str(w.idx)).inc()
+            self._close(w)
+            if w.alive():
+                w.proc.kill()
+                w.proc.wait(2.0)
+            w.restarts += 1
+            self._spawn(w)
+
+    def _close(self, w: _Worker):
+        with w.lock:
+            conn, w.conn = w.conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _send(self, w: _Worker, msg) -> bool:
+        with w.lock:
+            if w.conn is None:
+                return False
+            try:
+                run_blocking(w.conn.send, msg)
+                return True
+            except (OSError, EOFError, ValueError):
+                w.conn = None
+                return False
+
+    # --- publish ---
+    def _worker_for(self, meeting_id: str) -> _Worker:
+        return self.workers[zlib.crc32(meeting_id.encode("utf-8")) % len(self.workers)]
+
+    def publish(self, meeting_id: str, item: dict) -> bool:
+        """task 게시. 워커가 (재)연결 중이면 버퍼에 보관 → True, 버퍼도 가득 차면 버림 → False"""
+        w = self._worker_for(meeting_id)
+        msg = ("task", meeting_id, item)
+        with w.lock:
+            w.meetings.setdefault(meeting_id, {})
+            queued = bool(w.pending)
+            if queued:                   # 순서 유지: 밀린 task가 있으면 뒤에 붙임
+                return self._buffer(w, msg)
+        if self._send(w, msg):
+            return True
+        with w.lock:
+            return self._buffer(w, msg)
+
+    def _buffer(self, w: _Worker, msg) -> bool:
+        """w.lock 보유 상태에서 호출"""
+        if len(w.pending) < AGENT_POOL_BUFFER:
+            if not w.pending:
+                print(f"[agent-pool] worker {w.idx} not connected → buffering tasks (max {AGENT_POOL_BUFFER})")
+            w.pending.append(msg)
+            return True
+        if w.dropped % 100 == 0:
+            print(f"[agent-pool] ⚠️ worker {w.idx} buffer full → dropping tasks (dropped={w.dropped + 1})")
+        w.dropped += 1
+        return False
+
+    def _flush_pending(self, w: _Worker):
+        """재연결 직후 버퍼된 task 전송 (전송 실패 시 남은 것은 다음 연결까지 보관)"""
+        sent = 0
+        while True:
+            with w.lock:
+                if not w.pending:
+                    break
+                msg = w.pending[0]
+            if not self._send(w, msg):
+                break
+            with w.lock:
+                w.pending.popleft()
+            sent += 1
+        if sent:
+            print(f"[agent-pool] worker {w.idx} flushed {sent} buffered task(s)")
+
+    def configure(self, meeting_id: str, **cfg):
+        w = self._worker_for(meeting_id)
+        with w.lock:
+            w.meetings.setdefault(meeting_id, {}).update({k: v for k, v in cfg.items() if v is not None})
+        self._send(w, ("config", meeting_id, cfg))
+
+    def release(self, meeting_id: str):
+        """meeting 배정 해제: 워커의 AgentService 정지 + 헬스/설정 복원 대상에서 제거"""
+        w = self._worker_for(meeting_id)
+        with w.lock:
+            w.meetings.pop(meeting_id, None)
+        self._send(w, ("release", meeting_id))
+
+    def handle(self, meeting_id: str) -> PoolHandle:
+        w = self._worker_for(meeting_id)
+        with w.lock:
+            w.meetings.setdefault(meeting_id, {})
+        return PoolHandle(self, meeting_id)
+
+    # --- results ---
+    def drain(self, max_items: int = 256) -> list:
+        """모든 워커 연결에서 비블로킹으로 결과 수집 → [("term"|"delta", mid, payload, trace)]. heartbeat는 내부 처리"""
+        out = []
+        for w in self.workers:
+            conn = w.conn
+            if conn is None:
+                continue
+            try:
+                while len(out) < max_items and conn.poll(0):
+                    msg = run_blocking(conn.recv)
+                    if msg[0] == "hb":
+                        w.last_hb = time.monotonic()
+                        with w.lock:
+                            for mid, info in msg[3].items():
+                                if mid in w.meetings:      # release 후 도착한 heartbeat로 되살리지 않음
+                                    w.meetings[mid].update(info)
+                    elif msg[0] in ("term", "delta"):
+                        out.append(msg)
+            except (EOFError, OSError):
+                print(f"[agent-pool] worker {w.idx} connection lost")
+                self._close(w)
+        return out
+
+    def meeting_info(self, meeting_id: str) -> dict:
+        w = self._worker_for(meeting_id)
+        with w.lock:
+            return dict(w.meetings.get(meeting_id) or {})
+
+    def health(self) -> dict:
+        now = time.monotonic()
+        out = []
+        for w in self.workers:
+            with w.lock:
+                meetings = {mid: {k: m.get(k) for k in ("qsize", "read", "enq", "stale_dropped")}
+                            for mid, m in w.meetings.items()}
+                buffered = len(w.pending)
+            out.append({
+                "idx": w.idx, "pid": w.pid, "alive": w.alive(), "connected": w.conn is not None,
+                "heartbeat_age_sec": round(now - w.last_hb, 2),
+                "restarts": w.restarts, "dropped": w.dropped, "buffered": buffered,
+                "meetings": meetings,
+            })
+        return {"workers": out}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Glossify agent pool worker (started by server.py)")
+    ap.add_argument("role", choices=["worker"])
+    ap.add_argument("--idx", type=int, required=True)
+    ap.add_argument("--address", required=True)
+    args = ap.parse_args()
+    _worker_main(args.idx, args.address, bytes.fromhex(os.environ["AGENT_POOL_AUTHKEY"]), AGENT_POOL_HEARTBEAT_SEC)
@@ -0,0 +1,351 @@
+# alias_index.py
+# 철자 변형을 기존 표준 용어 키로 합치는 로컬 alias 인덱스 (에이전트 호출 전에 "k8s"/"K8S"/"Kubernetes"를 한 키로)
+# - alias_key(): canonicalize_term(NFKC + 소문자) + 구분자(공백/하이픈/슬래시/점/밑줄) 제거 → "ci cd" == "CI/CD" == "ci-cd"
+# - 학습 alias 테이블: 에이전트는 표준 표기로 정규화해 설명하므로 본문 첫 주어("Kubernetes는 …", "AML(자금세탁방지)은 …")가
+#     표준 용어. entity 키 → 본문 주어 키를 기록. 같은 변형이 서로 다른 표준으로 학습되면 충돌로 보고 폐기(이후 학습 안 함)
+#     Person/PersonType은 학습하지 않음 (다른 인물로의 교정 금지)
+# - 문자 bigram 유사도: 학습 테이블에 없으면 이미 본 표준 키 중 Dice ≥ ALIAS_NGRAM_MIN인 것 1개로 매핑
+#     숫자가 다르거나(Windows 10/11) 길이 차가 2자 넘거나 ALIAS_NGRAM_MIN_LEN자 미만(약어)이면 합치지 않음, 동점 후보도 합치지 않음
+# - resolve(term) → 키. AgentService가 negative cache/타임스탬프 dedup/in-flight coalescing 키로 사용
+# - 프로세스 전역 1개(get_alias_index), ALIAS_TABLE_PATH 지정 시 JSON으로 영속화 (수동 항목 추가 가능)
+# - ALIAS_INDEX=0: 학습/유사도 없이 canonicalize_term 키만 (이전 동작)
+#
+# 사용 예:
+#   python alias_index.py build --glossify agent_results/glossify_*.csv --out alias_table.json
+#   python alias_index.py eval --pairs alias_gold.csv --ngram-min 0.8,0.85,0.9       # term,canonical 정답 쌍
+#   python alias_index.py eval --glossify agent_results/glossify_*.csv --holdout-frac 0.2
+
+import os
+import re
+import csv
+import glob
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from cosmos_terms import canonicalize_term
+
+ALIAS_INDEX         = (os.getenv("ALIAS_INDEX") or "1").lower() in {"1", "true", "y"}
+ALIAS_TABLE_PATH    = os.getenv("ALIAS_TABLE_PATH", "").strip()     # 비우면 메모리 전용
+ALIAS_NGRAM_MIN     = float(os.getenv("ALIAS_NGRAM_MIN", "0.85"))   # 1 이상 = 유사도 매칭 안 함
+ALIAS_NGRAM_MIN_LEN = int(os.getenv("ALIAS_NGRAM_MIN_LEN", "5"))
+ALIAS_MAX_TERMS     = int(os.getenv("ALIAS_MAX_TERMS", "20000"))
+
+NO_LEARN_CATS = {"Person", "PersonType"}
+# 용어가 아니라 문맥 문장으로 시작한 본문의 주어 ("여기서는 …", "이 용어는 …")
+_GENERIC_HEADS = {"여기서", "이", "이것", "이는", "이 용어", "해당 용어", "용어", "본 용어", "현재", "이번"}
+
+_SEP_RE = re.compile(r"[\s\-_/.·・]+")
+_DIGITS_RE = re.compile(r"\d+")
+# 설명 본문의 첫 주어: "Kubernetes는 …", "AML(자금세탁방지)은 …", "Microsoft Teams는 …"
+_HEAD_RE = re.compile(r'^\s*["“]?([^\s(（"”,.][^(（"”,.]{0,39}?)["”]?\s*(?:[(（][^)）]{0,60}[)）])?\s*'
+                      r'(?:은|는|이란|란|이|가)\s')
+
+
+def alias_key(term: str) -> str:
+    return _SEP_RE.sub("", canonicalize_term(term))
+
+
+def explained_head(body: str) -> str:
+    """에이전트 설명 본문에서 표준 표기(첫 주어). 못 찾으면 ''"""
+    m = _HEAD_RE.match(body or "")
+    if not m:
+        return ""
+    head = m.group(1).strip()
+    if head in _GENERIC_HEADS or len(head.split()) > 4:
+        return ""
+    return head
+
+
+def _bigrams(key: str) -> Set[str]:
+    s = f"^{key}$"
+    return {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+class AliasIndex:
+    """thread-safe. 학습 테이블(변형 키 → 표준 키) + 본 표준 키의 bigram 역색인(LRU 상한)"""
+
+    def __init__(self, path: Optional[str] = None, ngram_min: float = ALIAS_NGRAM_MIN,
+                 ngram_min_len: int = ALIAS_NGRAM_MIN_LEN, max_terms: int = ALIAS_MAX_TERMS,
+                 enabled: bool = ALIAS_INDEX):
+        self.path = path or None
+        self.ngram_min = ngram_min
+        self.ngram_min_len = ngram_min_len
+        self.max_terms = max_terms
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._learned: Dict[str, str] = {}
+        self._conflicts: Set[str] = set()
+        self._terms: "OrderedDict[str, Set[str]]" = OrderedDict()    # 표준 키 → bigram
+        self._grams: Dict[str, Set[str]] = {}                        # bigram → 표준 키
+        self._memo: Dict[str, Tuple[str, str]] = {}
+        self._dirty = False
+        self.merged = {"learned": 0, "ngram": 0}
+        if self.path:
+            self.load()
+
+    # ---------- 조회 ----------
+    def resolve(self, term: str) -> str:
+        return self.resolve_with_source(term)[0]
+
+    def resolve_with_source(self, term: str) -> Tuple[str, str]:
+        """(키, 출처) — 출처: 'learned' | 'ngram' | '' (자기 자신)"""
+        if not self.enabled:
+            return canonicalize_term(term), ""
+        key = alias_key(term)
+        if not key:
+            return key, ""
+        with self._lock:
+            hit = self._memo.get(key)
+            if hit is None:
+                hit = self._resolve(key)
+                if len(self._memo) >= self.max_terms:
+                    self._memo.clear()
+                self._memo[key] = hit
+            if hit[1]:
+                self.merged[hit[1]] += 1
+            return hit
+
+    def _resolve(self, key: str) -> Tuple[str, str]:
+        canon, seen = key, set()
+        while canon in self._learned and canon not in seen and len(seen) < 3:    # a→b→c 연쇄, 순환 방지
+            seen.add(canon)
+            canon = self._learned[canon]
+        if canon != key:
+            return canon, "learned"
+        near = self._nearest(key)
+        return (near, "ngram") if near else (key, "")
+
+    def _nearest(self, key: str) -> Optional[str]:
+        if self.ngram_min >= 1.0 or len(key) < self.ngram_min_len or key in self._terms:
+            return None
+        grams = _bigrams(key)
+        shared: Dict[str, int] = {}
+        for g in grams:
+            for cand in self._grams.get(g, ()):
+                shared[cand] = shared.get(cand, 0) + 1
+        digits = _DIGITS_RE.findall(key)
+        best, best_score, tie = None, 0.0, False
+        for cand, n in shared.items():
+            if abs(len(cand) - len(key)) > 2 or _DIGITS_RE.findall(cand) != digits:
+                continue
+            score = 2.0 * n / (len(grams) + len(self._terms[cand]))
+            if score > best_score:
+                best, best_score, tie = cand, score, False
+            elif score == best_score:
+                tie = True
+        if best is None or best_score < self.ngram_min or tie:
+            return None
+        return best
+
+    # ---------- 갱신 ----------
+    def observe(self, key: str):
+        """큐에 들어간 용어의 키를 표준 키 후보로 등록 (이후 유사 변형이 이 키로 합쳐짐)"""
+        if not self.enabled or not key:
+            return
+        with self._lock:
+            if key in self._terms:
+                self._terms.move_to_end(key)
+                return
+            self._add_term(key)
+
+    def _add_term(self, key: str):
+        grams = self._terms[key] = _bigrams(key)
+        for g in grams:
+            self._grams.setdefault(g, set()).add(key)
+        while len(self._terms) > self.max_terms:
+            old, old_grams = self._terms.popitem(last=False)
+            for g in old_grams:
+                s = self._grams.get(g)
+                if s is not None:
+                    s.discard(old)
+                    if not s:
+                        del self._grams[g]
+        self._memo.clear()      # 이전에 '자기 자신'으로 판정된 변형이 새 키로 합쳐질 수 있음
+
+    def learn(self, entity: str, body: str, category: str = "") -> Optional[str]:
+        """에이전트 설명에서 entity → 본문 주어 alias 학습. 새로 학습한 표준 키 반환"""
+        if not self.enabled or category in NO_LEARN_CATS:
+            return None
+        head = alias_key(explained_head(body))
+        key = alias_key(entity)
+        if not head or not key or head == key:
+            return None
+        with self._lock:
+            if key in self._conflicts:
+                return None
+            prev = self._learned.get(key)
+            if prev == head:
+                return None
+            if prev is not None:
+                del self._learned[key]              # 같은 변형이 다른 표준으로 → 모호, 합치지 않음
+                self._conflicts.add(key)
+                self._memo.clear()
+                self._dirty = True
+                return None
+            self._learned[key] = head
+            if head not in self._terms:
+                self._add_term(head)
+            self._memo.clear()
+            self._dirty = True
+            return head
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"learned": len(self._learned), "conflicts": len(self._conflicts),
+                    "terms": len(self._terms), "merged": dict(self.merged)}
+
+    # ---------- 영속화 ----------
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[alias] load fail: {e}")
+            return
+        with self._lock:
+            self._conflicts.update(data.get("conflicts") or [])
+            for variant, canon in (data.get("aliases") or {}).items():
+                v, c = alias_key(variant), alias_key(canon)      # 수동 항목은 원래 표기로 적어도 됨
+                if v and c and v != c and v not in self._conflicts:
+                    self._learned[v] = c
+                    if c not in self._terms:
+                        self._add_term(c)
+
+    def save(self, force: bool = False):
+        if not self.path or not (self._dirty or force):
+            return
+        with self._lock:
+            data = {"version": 1, "aliases": dict(sorted(self._learned.items())),
+                    "conflicts": sorted(self._conflicts)}
+            self._dirty = False
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)  # 원자적 교체
+        except Exception as e:
+            print(f"[alias] save fail: {e}")
+
+
+_ALIAS_INDEX: Optional[AliasIndex] = None
+_ALIAS_INDEX_LOCK = threading.Lock()
+
+def get_alias_index() -> AliasIndex:
+    """프로세스 전역 alias 인덱스 (lazy)"""
+    global _ALIAS_INDEX
+    with _ALIAS_INDEX_LOCK:
+        if _ALIAS_INDEX is None:
+            _ALIAS_INDEX = AliasIndex(path=ALIAS_TABLE_PATH or None)
+        return _ALIAS_INDEX
+
+
+# ---------------------- 오프라인 학습/평가 ----------------------
+def load_glossify_rows(paths: Iterable[str]) -> List[dict]:
+    rows: List[dict] = []
+    for p in paths:
+        with open(p, "r", encoding="utf-8-sig", newline="") as f:
+            for r in csv.DictReader(f):
+                if (r.get("entity") or "").strip():
+                    rows.append(r)
+    rows.sort(key=lambda r: r.get("timestamp") or "")
+    return rows
+
+def build_index(rows: Iterable[dict], **kw) -> AliasIndex:
+    idx = AliasIndex(path=None, enabled=True, **kw)
+    for r in rows:
+        idx.observe(alias_key(r["entity"]))
+        idx.learn(r["entity"], r.get("explanation") or r.get("body") or "")
+    return idx
+
+def evaluate(idx: AliasIndex, samples: List[Tuple[str, str]]) -> dict:
+    """
+    samples: (term, 정답 표준 표기) 시간순. 실제 파이프라인처럼 resolve → observe 순서로 흘림
+    false merge: 다른 키로 합쳤는데 정답과 다름 (잘못된 설명 재사용/누락 위험)
+    missed     : 정답이 다른 표기인데 합치지 못함 (에이전트 호출 1회 낭비)
+    """
+    merged = false_merge = needed = missed = 0
+    by_source = {"learned": [0, 0], "ngram": [0, 0]}
+    examples: List[Tuple[str, str, str]] = []
+    for term, gold in samples:
+        own, want = alias_key(term), alias_key(gold)
+        got, source = idx.resolve_with_source(term)
+        if got != own:
+            merged += 1
+            by_source[source][0] += 1
+            if got != want:
+                false_merge += 1
+                by_source[source][1] += 1
+                examples.append((term, got, want))
+        if want != own:
+            needed += 1
+            if got != want:
+                missed += 1
+        idx.observe(got)
+    return {
+        "n": len(samples), "merged": merged, "false_merges": false_merge,
+        "false_merge_rate": false_merge / merged if merged else 0.0,
+        "needed": needed, "missed": missed, "missed_rate": missed / needed if needed else 0.0,
+        "by_source": by_source, "examples": examples[:10],
+    }
+
+def _print_report(ngram_min: float, r: dict):
+    src = " ".join(f"{k}={v[0]}/{v[1]}" for k, v in r["by_source"].items())
+    print(f"{ngram_min:>6.2f} {r['n']:>6d} {r['merged']:>7d} {r['false_merges']:>6d} {r['false_merge_rate']:>10.3f} "
+          f"{r['needed']:>7d} {r['missed']:>7d} {r['missed_rate']:>7.3f}   {src}")
+    for term, got, want in r["examples"]:
+        print(f"       ✗ {term!r} → {got!r} (expected {want!r})")
+
+# ---------------- Optional CLI ----------------
+if __name__ == "__main__":
+    import argparse
+    base = os.getenv("AGENT_RESULTS_DIR", os.path.join(os.getcwd(), "agent_results"))
+    parser = argparse.ArgumentParser(description="Build/evaluate the spelling-variant alias index")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    bd = sub.add_parser("build")
+    bd.add_argument("--glossify", nargs="*", help="glossify_*.csv (default: all in $AGENT_RESULTS_DIR)")
+    bd.add_argument("--out", default=ALIAS_TABLE_PATH or "alias_table.json")
+
+    ev = sub.add_parser("eval")
+    ev.add_argument("--pairs", nargs="*", help="정답 CSV (term,canonical), 시간순")
+    ev.add_argument("--glossify", nargs="*", help="glossify_*.csv: 앞부분으로 학습, 마지막 --holdout-frac은 본문 주어를 정답으로 평가")
+    ev.add_argument("--holdout-frac", type=float, default=0.2)
+    ev.add_argument("--table", help="학습 테이블을 미리 로드 (alias_table.json)")
+    ev.add_argument("--ngram-min", default=f"{ALIAS_NGRAM_MIN},0.8,0.9,1.0", help="비교할 유사도 임계값 (쉼표 구분, 1 = 끔)")
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        paths = args.glossify or sorted(glob.glob(os.path.join(base, "glossify_*.csv")))
+        idx = build_index(load_glossify_rows(paths))
+        idx.path = args.out
+        idx.save(force=True)
+        s = idx.stats()
+        print(f"✅ {s['learned']} alias(es), {s['conflicts']} conflict(s) from {len(paths)} file(s) → {args.out}")
+    else:
+        train: List[dict] = []
+        samples: List[Tuple[str, str]] = []
+        for p in args.pairs or []:
+            with open(p, "r", encoding="utf-8-sig", newline="") as f:
+                samples += [(r[0], r[1]) for r in csv.reader(f) if len(r) >= 2 and r[0] not in {"term", ""}]
+        if args.glossify:
+            rows = load_glossify_rows(args.glossify)
+            cut = int(len(rows) * (1.0 - args.holdout_frac))
+            train = rows[:cut]
+            for r in rows[cut:]:
+                head = explained_head(r.get("explanation") or r.get("body") or "")
+                samples.append((r["entity"], head or r["entity"]))
+        if not samples:
+            raise SystemExit("eval needs --pairs or --glossify")
+        print(f"[eval] {len(samples)} samples, trained on {len(train)} row(s)")
+        print(f"{'ngram':>6} {'n':>6} {'merged':>7} {'false':>6} {'false_rate':>10} {'needed':>7} {'missed':>7} {'missed%':>7}   by_source(merged/false)")
+        for thr in [float(x) for x in args.ngram_min.split(",") if x.strip()]:
+            idx = build_index(train, ngram_min=thr)
+            if args.table:
+                idx.path = args.table
+                idx.load()
+                idx.path = None
+            _print_report(thr, evaluate(idx, samples))
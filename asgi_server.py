@@ -0,0 +1,497 @@
+# asgi_server.py
+# server.py(Flask + Flask-SocketIO)와 같은 REST/WS 계약을 제공하는 네이티브 ASGI 진입점
+# - FastAPI + python-socketio AsyncServer (async_mode="asgi"), 하나의 이벤트 루프에서 처리
+# - NER 호출/소유 워커 전달은 httpx.AsyncClient 커넥션 풀 공유 (요청마다 TCP/TLS 재수립 없음)
+# - AgentService는 기존 스레드 모델 그대로, delta/최종 용어는 이벤트 루프로 넘겨 브로드캐스트 (/terms REST 왕복 없음)
+# - 파일 로그(STT/NER CSV, 재처리 저널) 쓰기는 asyncio.to_thread로 루프 밖에서
+# - 공유 상태(STATE)/메트릭/trace/링버퍼 커서는 server.py와 동일 → 클라이언트는 어느 진입점이든 동일하게 동작
+# - 초기화(설정 확인/로그 파일/백그라운드 태스크)는 lifespan에서, glossify_agent(Azure SDK)는 첫 사용/예열 시 import
+#
+# 실행 예 (uvicorn 필요):
+#   uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+#   gunicorn -k uvicorn.workers.UvicornWorker -w 1 -b 127.0.0.1:5000 asgi_server:app
+
+import os
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+import httpx
+import socketio
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from ner_core import (
+    analyze_ner_async,
+    analyze_ner_batch,
+    check_ner_config,
+    init_ner_log,
+    append_ner_rows,
+    append_ner_batch,
+    init_stt_log,
+    append_stt_line,
+    NER_BATCH_DOCS,
+    NER_BREAKER,
+    NER_JOURNAL,
+)
+from log_writer import flush_logs
+from ner_resilience import NER_REPLAY_INTERVAL_SEC, NER_REPLAY_RATE, is_outage, replay_once
+from cosmos_terms import CosmosTermStore, newest_glossify_csv
+from metrics_registry import (
+    REGISTRY, BROADCASTS, NER_LATENCY, STT_REQUESTS, STT_DUPLICATES, NER_DEFERRED,
+    WS_BATCH_ITEMS, WS_LAGGARD_KICKS, WS_LAGGARD_SKIPS, remove_meeting_metrics,
+)
+from tracing import current_traceparent, init_tracing, span, trace_id_of
+from state_backend import make_backend, MemoryBackend, OWNER_TTL_SEC
+from server_common import (
+    WS_BATCH_WINDOW_MS, WS_CLIENT_MAX_QUEUE,
+    as_bool, batch_chunks, classify_laggards, normalize_terms, now_iso_z, observe_e2e, parse_payload,
+    resolve_worker_url, stt_fields, terms_from_payload,
+)
+
+# ----------------- ENV -----------------
+RUN_NER_ON_PARTIAL = (os.getenv("RUN_NER_ON_PARTIAL") or "0").lower() in {"1", "true", "y"}
+AGENT_AUTOSTART    = (os.getenv("AGENT_AUTOSTART") or "1").lower() in {"1", "true", "y"}
+WS_COMPRESSION_THRESHOLD   = int(os.getenv("WS_COMPRESSION_THRESHOLD", "1024"))
+SOCKETIO_MESSAGE_QUEUE = (os.getenv("SOCKETIO_MESSAGE_QUEUE") or "").strip() or None
+
+# 비동기 HTTP 커넥션 풀 (NER + 소유 워커 전달 공용)
+HTTP_MAX_CONNECTIONS = int(os.getenv("ASGI_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE   = int(os.getenv("ASGI_HTTP_MAX_KEEPALIVE", "20"))
+
+FORWARD_HEADER = "X-Glossify-Forwarded"
+
+# ----------------- App & Socket.IO -----------------
+# 설정 확인/tracing/로그 파일/백그라운드 태스크는 lifespan(기동)에서. import만으로는 부작용 없음
+STATE = make_backend()
+WORKER_URL = resolve_worker_url(shared_state=not isinstance(STATE, MemoryBackend))
+
+_HTTP: httpx.AsyncClient | None = None
+_LOOP: asyncio.AbstractEventLoop | None = None
+
+def _prewarm_agent():
+    from glossify_agent import prewarm_foundry   # Azure SDK/watchdog import를 이벤트 루프 밖 스레드에서
+    prewarm_foundry()
+
+@asynccontextmanager
+async def _lifespan(_app):
+    global _HTTP, _LOOP
+    check_ner_config()
+    init_tracing()
+    init_ner_log()
+    init_stt_log()
+    _LOOP = asyncio.get_running_loop()
+    _HTTP = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        timeout=httpx.Timeout(15.0, connect=3.0),
+    )
+    renew = asyncio.create_task(_renew_ownership_loop())
+    replay = asyncio.create_task(_ner_replay_loop())
+    if AGENT_AUTOSTART:
+        _LOOP.run_in_executor(None, _prewarm_agent)     # 공유 Foundry client 예열 (완료를 기다리지 않음)
+    try:
+        yield
+    finally:
+        renew.cancel()
+        replay.cancel()
+        await _HTTP.aclose()
+        with _AGENTS_LOCK:
+            agents = list(_AGENTS.items())
+        await asyncio.gather(*(_stop_agent(mid, svc) for mid, svc in agents))
+
+api = FastAPI(lifespan=_lifespan)
+sio = socketio.AsyncServer(
+    async_mode="asgi", cors_allowed_origins="*",
+    http_compression=True, compression_threshold=WS_COMPRESSION_THRESHOLD,
+    client_manager=socketio.AsyncRedisManager(SOCKETIO_MESSAGE_QUEUE) if SOCKETIO_MESSAGE_QUEUE else None,
+)
+api.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app = socketio.ASGIApp(sio, other_asgi_app=api)
+
+# ----------------- Helpers (프레임워크 무관 파싱/정규화는 server_common.py) -----------------
+async def _read_payload(request: Request) -> dict:
+    """server._read_payload와 같은 순서: JSON → raw JSON 재시도 → urlencoded form"""
+    raw = (await request.body()).decode("utf-8", errors="replace")
+    return parse_payload(raw)
+
+async def _state(fn, *args, **kw):
+    """STATE 호출: 메모리 백엔드는 바로, 네트워크 백엔드(Redis)는 스레드로 넘겨 루프 블로킹 방지"""
+    if isinstance(STATE, MemoryBackend):
+        return fn(*args, **kw)
+    return await asyncio.to_thread(fn, *args, **kw)
+
+# ----------------- WS broadcast -----------------
+_ROOM_BUF: dict[str, list] = {}          # meeting_id -> [(item, trace)], 이벤트 루프 안에서만 접근
+
+async def _laggards(meeting_id: str) -> list:
+    try:
+        kick, skip = classify_laggards(sio.manager.get_participants("/", meeting_id), sio.eio.sockets)
+        for sid, backlog in kick:
+            WS_LAGGARD_KICKS.labels(meeting_id).inc()
+            print(f"[WS] disconnect laggard {sid} (backlog={backlog})")
+            await sio.disconnect(sid)
+        return skip
+    except Exception as e:
+        print(f"[WS] backlog check failed: {e}")
+        return []
+
+async def _emit_room(event: str, meeting_id: str, payload: dict):
+    skip = await _laggards(meeting_id) if WS_CLIENT_MAX_QUEUE > 0 else []
+    if skip:
+        WS_LAGGARD_SKIPS.labels(meeting_id).inc(len(skip))
+    await sio.emit(event, payload, to=meeting_id, skip_sid=skip or None)
+
+async def _emit_terms(meeting_id: str, items: list, traces: list) -> bool:
+    parent = next((t for t in traces if t), None)
+    items = await _state(STATE.history_append, meeting_id, items)
+    with span("ws.broadcast", parent=parent, meeting=meeting_id, items=len(items)) as sp:
+        try:
+            await _emit_room("terms", meeting_id, {"type": "terms", "meeting_id": meeting_id,
+                                                   "items": items, "cursor": items[-1]["seq"] if items else None})
+            BROADCASTS.labels(meeting_id, "ok").inc()
+            WS_BATCH_ITEMS.labels(meeting_id).observe(len(items))
+        except Exception as e:
+            BROADCASTS.labels(meeting_id, "error").inc()
+            sp.record_exception(e)
+            print(f"[WS] broadcast error: {e}")
+            return False
+    observe_e2e(meeting_id, items)
+    return True
+
+async def _flush_room_later(meeting_id: str):
+    await asyncio.sleep(WS_BATCH_WINDOW_MS / 1000.0)
+    buf = _ROOM_BUF.pop(meeting_id, None) or []
+    for items, traces in batch_chunks(buf):
+        await _emit_terms(meeting_id, items, traces)
+
+async def broadcast_to_meeting(meeting_id: str, items: list, trace: str | None = None) -> bool:
+    if WS_BATCH_WINDOW_MS <= 0:
+        return await _emit_terms(meeting_id, items, [trace])
+    buf = _ROOM_BUF.get(meeting_id)
+    if buf is None:
+        buf = _ROOM_BUF[meeting_id] = []
+        asyncio.create_task(_flush_room_later(meeting_id))
+    buf.extend((it, trace) for it in items)
+    return True
+
+def _delta_from_thread(meeting_id: str, payload: dict) -> bool:
+    """에이전트 워커 스레드 → 이벤트 루프로 terms_delta emit 예약 (완료를 기다리지 않음)"""
+    if _LOOP is None or _LOOP.is_closed():
+        return False
+    asyncio.run_coroutine_threadsafe(_emit_room("terms_delta", meeting_id, payload), _LOOP)
+    return True
+
+def _term_from_thread(meeting_id: str, payload: dict, trace: str):
+    """에이전트 최종 용어 → 이벤트 루프에서 바로 브로드캐스트 (자기 자신 /terms로의 blocking REST 왕복 없음)"""
+    if _LOOP is None or _LOOP.is_closed():
+        raise RuntimeError("event loop not running")
+    out = normalize_terms([payload], trace)
+    if out:
+        asyncio.run_coroutine_threadsafe(broadcast_to_meeting(meeting_id, out, trace=trace), _LOOP)
+
+# ----------------- Per-meeting agents / ownership -----------------
+_AGENTS: dict[str, object] = {}
+_AGENTS_LOCK = threading.Lock()
+
+def _ensure_agent_for(meeting_id: str, freshness_sec: float | None = None):
+    with _AGENTS_LOCK:
+        svc = _AGENTS.get(meeting_id)
+        if svc:
+            if freshness_sec is not None:
+                svc.freshness_sec = freshness_sec
+            return svc
+        from glossify_agent import start_agent_in_background   # Azure SDK import는 첫 에이전트 기동 시
+        svc = start_agent_in_background(
+            meeting_id=meeting_id,
+            freshness_sec=freshness_sec,
+            delta_sink=lambda payload, mid=meeting_id: _delta_from_thread(mid, payload),
+            term_sink=lambda payload, trace, mid=meeting_id: _term_from_thread(mid, payload, trace),
+        )
+        _AGENTS[meeting_id] = svc
+        print(f"[asgi] Agent started for meeting '{meeting_id}' (csv={getattr(svc, 'explain_csv', None)})")
+        return svc
+
+async def _stop_agent(meeting_id: str, svc):
+    """AgentService.stop()(유한 drain)을 스레드에서 실행, 루프는 막지 않고 상한 시간까지만 기다림"""
+    from glossify_agent import AGENT_STOP_DRAIN_SEC
+    try:
+        await asyncio.wait_for(asyncio.to_thread(svc.stop), timeout=AGENT_STOP_DRAIN_SEC + 5.0)
+    except asyncio.TimeoutError:
+        print(f"[asgi] agent stop timeout ({meeting_id})")
+    except Exception as e:
+        print(f"[asgi] agent stop error ({meeting_id}): {e}")
+    remove_meeting_metrics(meeting_id)
+
+def _release_agent(meeting_id: str):
+    """소유권을 잃었거나 회의가 끝난 meeting의 에이전트 제거 → 백그라운드 정지 + meeting 메트릭 삭제"""
+    with _AGENTS_LOCK:
+        svc = _AGENTS.pop(meeting_id, None)
+    if svc is not None:
+        asyncio.create_task(_stop_agent(meeting_id, svc))
+    else:
+        remove_meeting_metrics(meeting_id)
+
+async def _meeting_owner(request: Request, meeting_id: str) -> str:
+    if FORWARD_HEADER in request.headers:
+        return WORKER_URL
+    return await _state(STATE.claim_meeting, meeting_id, WORKER_URL, ttl=OWNER_TTL_SEC)
+
+async def _forward_to_owner(request: Request, owner: str):
+    url = f"{owner}{request.url.path}" + (f"?{request.url.query}" if request.url.query else "")
+    headers = {"Content-Type": request.headers.get("content-type", "application/json"), FORWARD_HEADER: WORKER_URL}
+    if "traceparent" in request.headers:
+        headers["traceparent"] = request.headers["traceparent"]
+    try:
+        r = await _HTTP.request(request.method, url, content=await request.body(), headers=headers)
+        return PlainTextResponse(r.content, status_code=r.status_code,
+                                 media_type=r.headers.get("content-type", "application/json"))
+    except Exception as e:
+        print(f"[asgi] forward to owner {owner} failed: {e}")
+        return JSONResponse({"status": "error", "error": "owner unreachable", "owner": owner}, status_code=502)
+
+async def _renew_ownership_loop():
+    while True:
+        await asyncio.sleep(max(1.0, OWNER_TTL_SEC / 3))
+        with _AGENTS_LOCK:
+            mids = list(_AGENTS)
+        for mid in mids:
+            try:
+                if not await _state(STATE.renew_meeting, mid, WORKER_URL, ttl=OWNER_TTL_SEC):
+                    owner = await _state(STATE.claim_meeting, mid, WORKER_URL, ttl=OWNER_TTL_SEC)
+                    if owner != WORKER_URL:
+                        print(f"[asgi] lost ownership of '{mid}' to {owner}")
+                        _release_agent(mid)      # 새 소유자와 중복 설명 방지
+            except Exception as e:
+                print(f"[asgi] ownership renew error ({mid}): {e}")
+
+# ------------------- REST -------------------
+@api.get("/")
+async def home():
+    return {"message": "Hello from Glossify backend! (asgi)", "time": now_iso_z()}
+
+@api.get("/health")
+async def health():
+    return {"status": "ok", "ner": {**NER_BREAKER.snapshot(), "journal_pending": NER_JOURNAL.pending()}}
+
+@api.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@api.post("/meeting/{meeting_id}/start")
+async def start_agent(meeting_id: str, request: Request):
+    owner = await _meeting_owner(request, meeting_id)
+    if owner != WORKER_URL:
+        return await _forward_to_owner(request, owner)
+    data = await _read_payload(request)
+    freshness = data.get("freshness_sec")
+    try:
+        freshness = float(freshness) if freshness not in (None, "") else None
+    except (TypeError, ValueError):
+        return JSONResponse({"error": "freshness_sec must be a number"}, status_code=400)
+    svc = await asyncio.to_thread(_ensure_agent_for, meeting_id, freshness)
+    return {"status": "ok", "meeting_id": meeting_id,
+            "csv_path": getattr(svc, "explain_csv", None),
+            "freshness_sec": getattr(svc, "freshness_sec", None)}
+
+@api.post("/meeting/{meeting_id}/stt")
+async def receive_stt(meeting_id: str, request: Request):
+    owner = await _meeting_owner(request, meeting_id)
+    if owner != WORKER_URL:
+        return await _forward_to_owner(request, owner)
+    if AGENT_AUTOSTART and meeting_id not in _AGENTS:
+        await asyncio.to_thread(_ensure_agent_for, meeting_id)
+
+    data = await _read_payload(request)
+    text, is_final, ts, speaker, seq = stt_fields(data)
+    if not text:
+        return JSONResponse({"error": "text required"}, status_code=400)
+    return await _ingest_stt(meeting_id, text, is_final, ts, parent_trace=request.headers.get("traceparent"),
+                             speaker=speaker, seq=seq)
+
+async def _ingest_stt(meeting_id: str, text: str, is_final: bool, ts: str, parent_trace: str | None = None,
+                      speaker: str = "", seq: int | None = None) -> dict:
+    """server._ingest_stt와 동일한 흐름 (seq 윈도/중복 판정 포함), NER만 await (대기 중 다른 요청/WS 처리)"""
+    STT_REQUESTS.labels(meeting_id, "final" if is_final else "partial").inc()
+
+    if not is_final and not RUN_NER_ON_PARTIAL:
+        await asyncio.to_thread(append_stt_line, text, ts)
+        print(f"[STT][partial][{meeting_id}] {text}")
+        return {"status": "ok", "skipped_ner": True}
+
+    if seq is not None:
+        state, ack = await _state(STATE.seq_claim, meeting_id, speaker, seq, is_final, text)
+        if state != "new":
+            STT_DUPLICATES.labels(meeting_id, "seq" if state == "dup" else "stale").inc()
+            if state == "stale":
+                return {"status": "ok", "stale_seq": True}
+            return {**(ack or {"status": "ok", "pending": True}), "duplicate_seq": True}
+    await asyncio.to_thread(append_stt_line, text, ts)    # 로그 파일 쓰기는 루프 밖에서
+
+    if seq is None and is_final and await _state(STATE.seen_final, meeting_id, text):
+        STT_DUPLICATES.labels(meeting_id, "text").inc()
+        print(f"[STT][final][{meeting_id}] (dup) {text}")
+        return {"status": "ok", "duplicate_final": True}
+
+    deferred = False
+    with span("stt.receive", parent=parent_trace, meeting=meeting_id, final=is_final, chars=len(text)) as sp:
+        trace = current_traceparent(parent_trace)
+        try:
+            print(f"[STT][{'final' if is_final else 'partial'}][{meeting_id}] trace={trace_id_of(trace)[:8]} {text}")
+            t0 = time.perf_counter()
+            try:
+                with span("ner.analyze", meeting=meeting_id):
+                    entities, _grouped = await analyze_ner_async(text, _HTTP)
+            except Exception:
+                NER_LATENCY.labels(meeting_id, "error").observe(time.perf_counter() - t0)
+                raise
+            NER_LATENCY.labels(meeting_id, "ok").observe(time.perf_counter() - t0)
+            sp.set_attribute("glossify.entities", len(entities))
+            await asyncio.to_thread(append_ner_rows, entities, text, ts, trace=trace)
+        except Exception as e:
+            sp.record_exception(e)
+            if not is_outage(e):
+                print(f"[NER ERROR] {e}")
+            else:
+                # NER 장애: 재처리 저널에 적재 (server.py와 같은 파일 형식, _ner_replay_loop가 재처리)
+                await asyncio.to_thread(NER_JOURNAL.append,
+                                        [{"meeting_id": meeting_id, "text": text, "ts": ts, "trace": trace}])
+                NER_DEFERRED.labels(meeting_id, "journaled").inc()
+                print(f"[NER DEFERRED][{meeting_id}] journaled: {e}")
+                deferred = True
+
+    ack = {"status": "ok", "trace_id": trace_id_of(trace)}
+    if deferred:
+        ack["deferred"] = True
+    if seq is not None:
+        await _state(STATE.seq_done, meeting_id, speaker, seq, is_final, ack)
+    return ack
+
+def _replay_ner(records: list):
+    """재처리 저널 레코드 → NER 1회 호출(동기, 스레드에서 실행) → NER CSV"""
+    analyzed = analyze_ner_batch([r["text"] for r in records])
+    append_ner_batch([(entities, r["text"], r["ts"], r.get("trace") or "")
+                      for r, (entities, _g) in zip(records, analyzed)])
+    for r in records:
+        NER_DEFERRED.labels(r["meeting_id"], "replayed").inc()
+
+async def _ner_replay_loop():
+    """저널에 쌓인 문장을 NER_REPLAY_RATE(docs/s)로 재처리 (브레이커 open이면 다음 주기까지 대기)"""
+    while True:
+        await asyncio.sleep(NER_REPLAY_INTERVAL_SEC)
+        while NER_JOURNAL.pending():
+            try:
+                n = await asyncio.to_thread(replay_once, NER_JOURNAL, _replay_ner, NER_BATCH_DOCS)
+            except Exception as e:
+                print(f"[NER REPLAY] error: {e}")
+                n = 0
+            if not n:
+                break
+            await asyncio.sleep(n / max(NER_REPLAY_RATE, 0.01))
+
+@api.post("/meeting/{meeting_id}/terms")
+async def receive_terms(meeting_id: str, request: Request):
+    data = await _read_payload(request)
+    items = terms_from_payload(data)
+    if items is None:
+        return JSONResponse({"error": "items or single term payload required"}, status_code=400)
+
+    trace = request.headers.get("traceparent")
+    out = normalize_terms(items, trace)
+    if not out:
+        return JSONResponse({"error": "no valid items"}, status_code=400)
+    ok = await broadcast_to_meeting(meeting_id, out, trace=trace)
+    return {"status": "ok", "count": len(out), "broadcasted": ok}
+
+async def _replay_payload(meeting_id: str, since, limit=None) -> dict:
+    try:
+        cursor = int(since) if since not in (None, "") else None
+    except (TypeError, ValueError):
+        cursor = None
+    items, last, truncated = await _state(STATE.history_since, meeting_id, cursor, limit=limit)
+    return {"type": "terms", "meeting_id": meeting_id, "items": items,
+            "cursor": last, "truncated": truncated, "replay": True}
+
+@api.get("/meeting/{meeting_id}/terms")
+async def list_terms(meeting_id: str, since: str | None = None, limit: int | None = None):
+    return await _replay_payload(meeting_id, since, limit=limit)
+
+# ------------------- Stop & Cosmos upsert -------------------
+_term_store = None
+
+def _ensure_store():
+    global _term_store
+    if _term_store is None:
+        _term_store = CosmosTermStore()
+        _term_store.start()
+    return _term_store
+
+def _pick_csv_for_meeting(meeting_id: str) -> str | None:
+    with _AGENTS_LOCK:
+        svc = _AGENTS.get(meeting_id)
+    if svc and getattr(svc, "explain_csv", None):
+        return svc.explain_csv
+    base = os.getenv("AGENT_RESULTS_DIR", os.path.join(os.getcwd(), "agent_results"))
+    return newest_glossify_csv(base)
+
+async def _upsert_task(meeting_id: str, csv_path: str):
+    try:
+        await asyncio.to_thread(flush_logs)   # 버퍼에 남은 설명 CSV 행까지 반영
+        n = await asyncio.to_thread(lambda: _ensure_store().upsert_from_csv(csv_path))
+        await _state(STATE.set_stop_status, meeting_id, status="done", upserted=n, ended_at=now_iso_z())
+        await _state(STATE.end_meeting, meeting_id, WORKER_URL)
+        _release_agent(meeting_id)                 # 에이전트 정지 + meeting 메트릭 삭제
+        await sio.emit("cosmos_upsert_done", {"meeting_id": meeting_id, "csv_path": csv_path, "upserted": n},
+                       to=meeting_id)
+        print(f"[COSMOS][{meeting_id}] upsert done: {n} rows from {csv_path}")
+    except Exception as e:
+        await _state(STATE.set_stop_status, meeting_id, status="error", error=str(e), ended_at=now_iso_z())
+        await sio.emit("cosmos_upsert_error", {"meeting_id": meeting_id, "csv_path": csv_path, "error": str(e)},
+                       to=meeting_id)
+        print(f"[COSMOS][{meeting_id}] upsert error: {e}")
+
+@api.post("/meeting/{meeting_id}/stop")
+async def stop_and_upsert(meeting_id: str, request: Request):
+    owner = await _meeting_owner(request, meeting_id)
+    if owner != WORKER_URL:
+        return await _forward_to_owner(request, owner)
+    data = await _read_payload(request)
+    csv_path = (data.get("csv_path") or "").strip() or _pick_csv_for_meeting(meeting_id)
+    if not csv_path or not os.path.exists(csv_path):
+        return JSONResponse({"error": "csv not found", "csv_path": csv_path}, status_code=404)
+    await _state(STATE.set_stop_status, meeting_id, status="running", csv_path=csv_path, upserted=0,
+                 error=None, started_at=now_iso_z(), ended_at=None)
+    asyncio.create_task(_upsert_task(meeting_id, csv_path))
+    return {"status": "accepted", "csv_path": csv_path}
+
+@api.get("/meeting/{meeting_id}/stop/status")
+async def stop_status(meeting_id: str):
+    return await _state(STATE.get_stop_status, meeting_id) or {"status": "idle"}
+
+# ---------------- WebSocket ----------------
+@sio.on("join")
+async def ws_join(sid, data):
+    data = data or {}
+    meeting_id = data.get("meeting_id")
+    if not meeting_id:
+        await sio.emit("error", {"message": "meeting_id required"}, to=sid)
+        return
+    await sio.enter_room(sid, meeting_id)
+    await sio.emit("ack", {"message": "joined", "meeting_id": meeting_id,
+                           "user_id": data.get("user_id"), "user_name": data.get("user_name")}, to=sid)
+    if as_bool(data.get("replay", True), default=True):
+        replay = await _replay_payload(meeting_id, data.get("since"))
+        if replay["items"]:
+            await sio.emit("terms", replay, to=sid)
+
+@sio.on("leave")
+async def ws_leave(sid, data):
+    meeting_id = (data or {}).get("meeting_id")
+    if meeting_id:
+        await sio.leave_room(sid, meeting_id)
+        await sio.emit("ack", {"message": "left", "meeting_id": meeting_id}, to=sid)
+
+@sio.on("ping")
+async def ws_ping(sid, _data=None):
+    await sio.emit("pong", {"t": now_iso_z()}, to=sid)
@@ -0,0 +1,327 @@
+# bench_hotpath.py
+# 엔티티마다 실행되는 순수 hot-path 함수 마이크로벤치마크 + 베이스라인 회귀 검사
+# - 대상: parse_csv_line, split_domain_and_body, drop_trailing_context_sentence,
+#         split_sentences_with_spans, entity_context(2,000자 발화), AgentService._pass_filters,
+#         AgentService._read_complete_csv_record(여러 줄 quoted 레코드),
+#         NER 로그 tail(긴 최종문 1건 + 엔티티 20개: v1 행마다 source_text vs v2 발화 1행 + offset 참조),
+#         cosmos_terms.load_latest_rows / term_to_uuid (10k~1M 행 CSV)
+# - --memory: 큐/overflow task 1건당 메모리 (tracemalloc, 긴 회의: 2,000자 발화 × 엔티티 20개 × 250발화 = overflow 5,000건)
+#     이전 표현(parse dict → task dict, v1은 행마다 source_text 복제)과 AgentTask(__slots__ + source_text 공유) 비교
+# - 베이스라인: bench_baseline.json. 절대 시간이라 머신/파이썬 버전마다 다르므로 저장소에 커밋하지 않음
+#     → 비교할 머신(배포 VM/CI 러너)에서 기준 커밋으로 --save-baseline 1회 실행해 만들고, 그 머신에서만 비교
+# - 회귀 판정: median이 베이스라인 대비 --threshold(기본 25%) 이상 느려지면 exit 1
+#
+# 사용 예:
+#   python bench_hotpath.py --save-baseline          # 현재 머신 기준 베이스라인 기록
+#   python bench_hotpath.py                          # 베이스라인과 비교 (CI/로컬)
+#   python bench_hotpath.py --rows 10000,100000,1000000 --only load_latest_rows
+#   python bench_hotpath.py --memory
+
+import os
+import io
+import csv
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import threading
+import gc
+import tracemalloc
+import statistics
+from typing import Callable, Dict, List
+
+BASELINE_PATH = os.getenv("BENCH_BASELINE_PATH", "bench_baseline.json")
+
+SAMPLE_SRC = ("메모리 부문에서 DRAM 고정거래가격은 전월 대비 7.3% 상승, NAND는 5.1% 상승했습니다. "
+              "서버용 HBM3E 수요가 강하게 유지되었고, AI 가속기 탑재용 고대역 메모리 중심으로 믹스 개선이 있었습니다.")
+SAMPLE_BODY = ("Finance: HBM3E는 고대역폭 메모리(HBM)의 5세대 규격으로, AI 가속기에 주로 탑재됩니다. "
+               "적층 구조로 대역폭과 전력 효율을 높였습니다. 여기서는 서버용 수요 증가 맥락에서 언급되었습니다.")
+
+
+def _bench(fn: Callable[[], object], inner: int, rounds: int, warmup: int = 1) -> Dict[str, float]:
+    """fn을 inner회 호출하는 라운드를 rounds번 → 1회 호출당 초 단위 통계"""
+    for _ in range(warmup):
+        for _ in range(inner):
+            fn()
+    samples: List[float] = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        samples.append((time.perf_counter() - t0) / inner)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.pstdev(samples),
+        "rounds": rounds,
+        "inner": inner,
+    }
+
+
+def _make_service():
+    """_pass_filters/_read_complete_csv_record만 쓰는 최소 AgentService (네트워크/파일 초기화 없음)"""
+    from glossify_agent import AgentService
+    svc = AgentService.__new__(AgentService)
+    svc.meeting_id = "bench"
+    svc.metrics = {}
+    svc._metrics_lock = threading.Lock()
+    svc._ts_lock = threading.Lock()
+    svc._last_ts = None
+    svc._seen_in_ts = set()
+    svc._last_src = ""
+    return svc
+
+
+def _write_glossify_csv(path: str, n: int, vocab: int):
+    rnd = random.Random(7)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["timestamp", "entity", "explanation", "domain"])
+        for i in range(n):
+            k = rnd.randrange(vocab)
+            w.writerow([f"2025-09-15T10:{i % 60:02d}:00Z", f"Term-{k}", SAMPLE_BODY,
+                        ("Finance", "Logistics", "EnterpriseIT")[k % 3]])
+
+
+def build_cases(rows: List[int], tmpdir: str) -> Dict[str, Callable[[], Dict[str, float]]]:
+    """tmpdir: load_latest_rows용 CSV를 만들 디렉토리 (케이스 실행이 끝날 때까지 유지)"""
+    import glossify_agent as ga
+    import cosmos_terms as ct
+
+    cases: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    line = io.StringIO()
+    csv.writer(line).writerow(["2025-09-15T10:00:00Z", "Product", "HBM3E", "0.97", SAMPLE_SRC * 4])
+    line = line.getvalue()
+    cases["parse_csv_line"] = lambda: _bench(lambda: ga.parse_csv_line(line), 2000, 15)
+    cases["split_domain_and_body"] = lambda: _bench(lambda: ga.split_domain_and_body(SAMPLE_BODY), 5000, 15)
+    body = ga.split_domain_and_body(SAMPLE_BODY)[1]
+    cases["split_sentences_with_spans"] = lambda: _bench(lambda: ga.split_sentences_with_spans(body), 5000, 15)
+    cases["drop_trailing_context_sentence"] = lambda: _bench(lambda: ga.drop_trailing_context_sentence(body), 5000, 15)
+
+    svc = _make_service()
+    items = [ga.parse_csv_line(line)] + [
+        ga.AgentTask(f"t{i // 8}", c, e, cf, SAMPLE_SRC)
+        for i, (c, e, cf) in enumerate([("Product", "HBM3E", 0.97), ("Person", "김현수", 0.99),
+                                        ("Skill", "AI", 0.6), ("Organization", "삼성전자 IR룸", 0.88)] * 8)
+    ]
+    it = iter(())
+    def _pf():
+        nonlocal it
+        try:
+            item = next(it)
+        except StopIteration:
+            it = iter(items)
+            item = next(it)
+        svc._pass_filters(item)
+    cases["AgentService._pass_filters"] = lambda: _bench(_pf, 5000, 15)
+
+    # 여러 줄 quoted 레코드 (source_text 안에 줄바꿈/따옴표)
+    rec = io.StringIO()
+    multi_src = 'CFO는 "HBM 수요가\n견조하다"고 말했고,\n4분기 가이던스는\n"4조 2천억"입니다.'
+    w = csv.writer(rec)
+    for i in range(50):
+        w.writerow([f"2025-09-15T10:00:{i:02d}Z", "Product", "HBM", "0.95", multi_src, ""])
+    blob = rec.getvalue()
+    def _read_all():
+        f = io.StringIO(blob)
+        while svc._read_complete_csv_record(f) is not None:
+            pass
+    cases["AgentService._read_complete_csv_record[50 multi-line]"] = lambda: _bench(_read_all, 50, 15)
+
+    # 긴 최종문(≈2,000자) 1건 + 엔티티 20개: tail 1회분 read + parse (v1 vs v2 NER 로그)
+    long_src = (SAMPLE_SRC * 12)[:2000]
+    ents = [("Product", "HBM3E"), ("Product", "DRAM"), ("Product", "NAND")] * 7
+    ents = [(c, e, long_src.find(e)) for c, e in ents[:20]]
+    v1, v2 = io.StringIO(), io.StringIO()
+    w1, w2 = csv.writer(v1), csv.writer(v2)
+    w2.writerow(["U", "1", "2025-09-15T10:00:00Z", "", long_src])
+    for c, e, off in ents:
+        w1.writerow(["2025-09-15T10:00:00Z", c, e, "0.95", long_src, ""])
+        w2.writerow(["E", "1", c, e, "0.95", off, len(e)])
+    blobs = {"v1": v1.getvalue(), "v2": v2.getvalue()}
+    def _tail(blob):
+        f = io.StringIO(blob)
+        utts = ga.UtteranceCache()
+        while True:
+            rec = svc._read_complete_csv_record(f)
+            if rec is None:
+                break
+            ga.parse_csv_line(rec, utts)
+    ga._sentence_spans.cache_clear()
+    cases["entity_context[2000ch]"] = lambda: _bench(
+        lambda: [ga.entity_context(long_src, e, off, len(e)) for _, e, off in ents], 200, 15)
+    for schema, blob in blobs.items():
+        cases[f"tail_ner_log[{schema} 2000ch x20, {len(blob.encode()) // 1024}KB]"] = \
+            (lambda b=blob: _bench(lambda: _tail(b), 50, 15))
+
+    terms = [f"Term-{i}" for i in range(1000)]
+    cases["term_to_uuid[1k]"] = lambda: _bench(lambda: [ct.term_to_uuid(t) for t in terms], 5, 15)
+
+    for n in rows:
+        path = os.path.join(tmpdir, f"glossify_{n}.csv")
+        _write_glossify_csv(path, n, vocab=max(100, n // 10))
+        rounds = 5 if n <= 100_000 else 3
+        cases[f"load_latest_rows[{n}]"] = (lambda p=path, r=rounds: _bench(lambda: ct.load_latest_rows(p), 1, r))
+    return cases
+
+
+# ---------- task 메모리 ----------
+def _retained_bytes(build: Callable[[], list]) -> int:
+    """build()가 반환한 객체들이 붙잡고 있는 메모리 (tracemalloc 현재 사용량)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        keep = build()
+        cur = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del keep
+    return cur
+
+
+def _dict_task(line: str, utts: dict):
+    """이전 표현 (비교 기준): parse_csv_line의 item dict → _enqueue_if_pass에서 새 task dict"""
+    row = next(csv.reader(io.StringIO(line)))
+    if row[0] == "U":
+        utts[row[1]] = (row[2], row[3], row[4])
+        return None
+    if row[0] == "E":
+        ts, trace, src = utts[row[1]]
+        item = {"timestamp": ts, "category": row[2], "entity": row[3], "confidence": row[4],
+                "source_text": src, "trace": trace, "utt_id": row[1], "offset": int(row[5]), "length": int(row[6])}
+    else:
+        item = {"timestamp": row[0], "category": row[1], "entity": row[2], "confidence": row[3],
+                "source_text": row[4], "trace": row[5]}
+    return {"timestamp": item["timestamp"], "category": item["category"], "entity": item["entity"],
+            "confidence": float(item["confidence"]), "source_text": item["source_text"] or "",
+            "enq_at": time.monotonic(), "trace": item.get("trace") or "",
+            "offset": item.get("offset", -1), "length": item.get("length", 0)}
+
+
+def measure_task_memory(utterances: int = 250, ents_per_utt: int = 20) -> Dict[str, Dict[str, float]]:
+    import glossify_agent as ga
+
+    trace = "00-" + "ab" * 16 + "-" + "cd" * 8 + "-01"
+    ents = [("Product", "HBM3E"), ("Product", "DRAM"), ("Product", "NAND"), ("Organization", "삼성전자")]
+    v1, v2 = io.StringIO(), io.StringIO()
+    w1, w2 = csv.writer(v1), csv.writer(v2)
+    for u in range(utterances):
+        src = (f"[{u}] " + SAMPLE_SRC * 12)[:2000]
+        ts = f"2025-09-15T10:{u // 60 % 60:02d}:{u % 60:02d}Z"
+        w2.writerow(["U", str(u), ts, trace, src])
+        for k in range(ents_per_utt):
+            c, e = ents[k % len(ents)]
+            w1.writerow([ts, c, f"{e}-{k}", "0.95", src, trace])
+            w2.writerow(["E", str(u), c, f"{e}-{k}", "0.95", src.find(e), len(e)])
+    out: Dict[str, Dict[str, float]] = {}
+    for schema, blob in (("v1", v1.getvalue()), ("v2", v2.getvalue())):
+        lines = blob.splitlines(keepends=True)
+
+        def _old():
+            utts: dict = {}
+            return [t for t in (_dict_task(ln, utts) for ln in lines) if t is not None]
+
+        def _new():
+            svc, utts, keep = _make_service(), ga.UtteranceCache(), []
+            for ln in lines:
+                t = ga.parse_csv_line(ln, utts)
+                if t is not None:
+                    svc._intern_source(t)
+                    t.enq_at = time.monotonic()
+                    keep.append(t)
+            return keep
+
+        n = utterances * ents_per_utt
+        old_b, new_b = _retained_bytes(_old), _retained_bytes(_new)
+        out[f"task_memory[{schema} {n} tasks]"] = {"dict_bytes_per_task": old_b / n,
+                                                   "slots_bytes_per_task": new_b / n}
+    return out
+
+
+def _fmt_t(sec: float) -> str:
+    if sec < 1e-6:
+        return f"{sec * 1e9:8.1f} ns"
+    if sec < 1e-3:
+        return f"{sec * 1e6:8.2f} us"
+    if sec < 1:
+        return f"{sec * 1e3:8.2f} ms"
+    return f"{sec:8.3f} s "
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Glossify hot-path microbenchmarks")
+    ap.add_argument("--rows", default="10000,100000", help="load_latest_rows CSV 행 수 (쉼표 구분, 예: 10000,100000,1000000)")
+    ap.add_argument("--only", default="", help="이름에 이 문자열이 포함된 케이스만 실행")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--save-baseline", action="store_true", help="결과를 베이스라인으로 저장")
+    ap.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.25")),
+                    help="허용 회귀 비율 (0.25 = median 25%% 느려지면 실패)")
+    ap.add_argument("--json", help="결과를 JSON으로 저장 (예: bench_output.json)")
+    ap.add_argument("--memory", action="store_true", help="task 1건당 메모리만 측정 (dict vs AgentTask)")
+    args = ap.parse_args()
+
+    if args.memory:
+        mem = measure_task_memory()
+        print(f"{'name':<40} {'dict B/task':>12} {'slots B/task':>13} {'ratio':>7}")
+        for name, r in mem.items():
+            print(f"{name:<40} {r['dict_bytes_per_task']:12.0f} {r['slots_bytes_per_task']:13.0f} "
+                  f"{r['slots_bytes_per_task'] / r['dict_bytes_per_task']:7.2f}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"memory": mem}, f, indent=2)
+        return 0
+
+    rows = [int(x) for x in args.rows.split(",") if x.strip()]
+    with tempfile.TemporaryDirectory(prefix="glossify_bench_") as tmpdir:
+        return _run_cases(args, build_cases(rows, tmpdir))
+
+
+def _run_cases(args, cases: Dict[str, Callable[[], Dict[str, float]]]) -> int:
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+    print(f"{'name':<58} {'median':>11} {'min':>11} {'stdev':>11} {'vs base':>9}")
+    for name, run in cases.items():
+        if args.only and args.only not in name:
+            continue
+        r = run()
+        results[name] = r
+        delta = ""
+        base = baseline.get(name, {}).get("median")
+        if base:
+            ratio = r["median"] / base - 1.0
+            delta = f"{ratio:+8.1%}"
+            if ratio > args.threshold:
+                regressions.append((name, ratio))
+                delta += " !"
+        print(f"{name:<58} {_fmt_t(r['median']):>11} {_fmt_t(r['min']):>11} {_fmt_t(r['stdev']):>11} {delta:>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "results": results}, f, indent=2)
+        print(f"✅ baseline saved → {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"(no baseline at {args.baseline}; run with --save-baseline first)")
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for name, ratio in regressions:
+            print(f"   - {name}: {ratio:+.1%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
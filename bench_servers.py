@@ -0,0 +1,240 @@
+# bench_servers.py
+# Flask(server.py) vs ASGI(asgi_server.py) 진입점 동시성 비교 부하 테스트
+# - 가짜 NER 업스트림(지연 --ner-delay-ms)을 띄우고, 두 서버를 같은 환경변수로 서브프로세스 기동
+#   (AGENT_AUTOSTART=0 → Azure 에이전트 없이 HTTP/WS 경로만 측정)
+# - 부하 1: POST /meeting/<id>/stt (고유 final 문장) --requests 건, 동시성 --concurrency
+# - 부하 2: WS 구독자 --subscribers 명이 join한 룸에 POST /terms → 'terms' 수신까지 지연
+# - 결과: 처리량(req/s), 지연 p50/p95/p99, 오류 수. --json 으로 저장
+#
+# 사용 예:
+#   python bench_servers.py                                   # flask, asgi 둘 다
+#   python bench_servers.py --only asgi --concurrency 64 --ner-delay-ms 80
+#   python bench_servers.py --flask-cmd "gunicorn -k geventwebsocket.gunicorn.workers.GeventWebSocketWorker -w 1 -b 127.0.0.1:{port} server:app"
+# 필요 패키지: httpx, python-socketio[client] (ASGI 실행에는 uvicorn)
+
+import os
+import sys
+import json
+import time
+import shlex
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import httpx
+
+DEFAULT_CMDS = {
+    "flask": f"{shlex.quote(sys.executable)} server.py",
+    "asgi": f"{shlex.quote(sys.executable)} -m uvicorn asgi_server:app --host 127.0.0.1 --port {{port}} --log-level warning",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------------- 가짜 NER 업스트림 ----------------
+def start_fake_ner(delay_ms: float) -> ThreadingHTTPServer:
+    body = json.dumps({"results": {"documents": [{"id": "1", "entities": [
+        {"text": "HBM3E", "category": "Product", "offset": 0, "length": 5, "confidenceScore": 0.97}]}]}}).encode()
+
+    class _H(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(delay_ms / 1000.0)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_a):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", _free_port()), _H)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="fake-ner", daemon=True).start()
+    return srv
+
+
+# ---------------- 서버 기동 ----------------
+def spawn(name: str, cmd: str, port: int, ner_url: str, workdir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "LANGUAGE_ENDPOINT": ner_url,
+        "LANGUAGE_KEY": os.getenv("LANGUAGE_KEY", "bench"),
+        "AGENT_AUTOSTART": "0",
+        "BACKEND_BASE_URL": f"http://127.0.0.1:{port}",
+        "NER_RESULTS_DIR": os.path.join(workdir, name, "ner_results"),
+        "STT_RESULTS_DIR": os.path.join(workdir, name, "stt_results"),
+    }
+    log = open(os.path.join(workdir, f"{name}.log"), "w", encoding="utf-8")
+    return subprocess.Popen(shlex.split(cmd.format(port=port)), env=env, stdout=log, stderr=subprocess.STDOUT,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+async def wait_ready(base: str, proc: subprocess.Popen, timeout: float = 30.0) -> bool:
+    end = time.monotonic() + timeout
+    async with httpx.AsyncClient() as c:
+        while time.monotonic() < end:
+            if proc.poll() is not None:
+                return False
+            try:
+                if (await c.get(f"{base}/health", timeout=1.0)).status_code == 200:
+                    return True
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    return False
+
+
+# ---------------- 부하 ----------------
+def _stats(lat: List[float], wall: float, errors: int) -> Dict[str, float]:
+    lat = sorted(lat)
+    q = (lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] if lat else float("nan"))
+    return {"count": len(lat), "errors": errors, "wall_sec": wall,
+            "rps": len(lat) / wall if wall > 0 else 0.0,
+            "p50_ms": q(0.50) * 1e3, "p95_ms": q(0.95) * 1e3, "p99_ms": q(0.99) * 1e3,
+            "mean_ms": (statistics.fmean(lat) * 1e3) if lat else float("nan")}
+
+
+async def load_stt(base: str, meeting: str, n: int, concurrency: int) -> Dict[str, float]:
+    lat: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as c:
+        async def one(i: int):
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    r = await c.post(f"{base}/meeting/{meeting}/stt",
+                                     json={"text": f"부하 테스트 문장 {i} HBM3E 수요", "is_final": True})
+                    r.raise_for_status()
+                    lat.append(time.perf_counter() - t0)
+                except httpx.HTTPError:
+                    errors += 1
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n)))
+        wall = time.perf_counter() - t0
+    return _stats(lat, wall, errors)
+
+
+async def load_broadcast(base: str, meeting: str, subscribers: int, posts: int) -> Dict[str, float]:
+    """구독자 전원이 각 POST의 용어를 받기까지의 지연 (POST 시작 → 마지막 구독자 수신)"""
+    import socketio  # python-socketio[client]
+
+    sent: Dict[str, float] = {}
+    got: Dict[str, int] = {}
+    done: Dict[str, float] = {}
+    clients = []
+    for _ in range(subscribers):
+        cl = socketio.AsyncClient(reconnection=False)
+
+        @cl.on("terms")
+        async def _on_terms(payload):
+            if payload.get("replay"):
+                return
+            now = time.perf_counter()
+            for it in payload.get("items") or []:
+                key = it.get("entity")
+                got[key] = got.get(key, 0) + 1
+                if got[key] == subscribers and key in sent:
+                    done[key] = now - sent[key]
+
+        await cl.connect(base, transports=["websocket"])
+        await cl.emit("join", {"meeting_id": meeting, "replay": False})
+        clients.append(cl)
+    await asyncio.sleep(0.5)
+
+    t0 = time.perf_counter()
+    errors = 0
+    async with httpx.AsyncClient(timeout=30.0) as c:
+        for i in range(posts):
+            key = f"bench-term-{i}"
+            sent[key] = time.perf_counter()
+            try:
+                (await c.post(f"{base}/meeting/{meeting}/terms",
+                              json={"entity": key, "body": "부하 테스트 설명", "domain": "Bench"})).raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+            await asyncio.sleep(0.01)
+    end = time.monotonic() + 10
+    while len(done) < posts - errors and time.monotonic() < end:
+        await asyncio.sleep(0.05)
+    wall = time.perf_counter() - t0
+    for cl in clients:
+        await cl.disconnect()
+    out = _stats(list(done.values()), wall, errors + (posts - errors - len(done)))
+    out["subscribers"] = subscribers
+    return out
+
+
+async def run_target(name: str, cmd: str, args, ner_url: str, workdir: str) -> Dict[str, dict]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = spawn(name, cmd, port, ner_url, workdir)
+    try:
+        if not await wait_ready(base, proc):
+            print(f"[{name}] server did not become ready (see {os.path.join(workdir, name + '.log')})")
+            return {}
+        res = {"stt": await load_stt(base, f"bench-{name}", args.requests, args.concurrency)}
+        if args.subscribers > 0:
+            res["broadcast"] = await load_broadcast(base, f"bench-{name}-ws", args.subscribers, args.posts)
+        return res
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Flask vs ASGI entry point load comparison")
+    ap.add_argument("--only", choices=sorted(DEFAULT_CMDS), help="한 진입점만 측정")
+    ap.add_argument("--requests", type=int, default=500, help="/stt 요청 수")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--ner-delay-ms", type=float, default=50.0, help="가짜 NER 응답 지연")
+    ap.add_argument("--subscribers", type=int, default=50, help="WS 구독자 수 (0 = 브로드캐스트 측정 생략)")
+    ap.add_argument("--posts", type=int, default=100, help="/terms POST 수")
+    ap.add_argument("--flask-cmd", default=DEFAULT_CMDS["flask"])
+    ap.add_argument("--asgi-cmd", default=DEFAULT_CMDS["asgi"])
+    ap.add_argument("--json", help="결과를 JSON으로 저장")
+    args = ap.parse_args()
+
+    fake = start_fake_ner(args.ner_delay_ms)
+    ner_url = f"http://127.0.0.1:{fake.server_address[1]}"
+    workdir = tempfile.mkdtemp(prefix="glossify_bench_srv_")
+    cmds = {"flask": args.flask_cmd, "asgi": args.asgi_cmd}
+    names = [args.only] if args.only else ["flask", "asgi"]
+
+    results = {}
+    for name in names:
+        print(f"== {name}: {cmds[name].format(port='<port>')}")
+        results[name] = asyncio.run(run_target(name, cmds[name], args, ner_url, workdir))
+        for kind, r in results[name].items():
+            print(f"   {kind:<10} {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  "
+                  f"p99 {r['p99_ms']:7.1f} ms  errors {r['errors']}")
+    fake.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent=2)
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# bench_startup.py
+# 진입점 import 시간 예산 검사 (오토스케일 인스턴스 콜드 스타트 회귀 방지)
+# - 새 인터프리터에서 `python -X importtime -c "import <module>"` 를 --runs회 실행 → 대상 모듈 cumulative의 median
+# - 예산: median이 --budget-ms(기본 STARTUP_BUDGET_MS, 1500ms) 넘으면 exit 1
+# - lazy import 검사: --forbid 패키지(기본 azure, watchdog, psycopg2)가 import 중 로드되면 exit 1
+#     (Azure SDK/watchdog은 glossify_agent 첫 사용, psycopg2는 Cosmos upsert 때 import 되어야 함)
+# - 루트 패키지별 self 시간 합계 상위 --top개 출력 → 어떤 의존성이 느려졌는지 바로 확인
+# - LANGUAGE_KEY/LANGUAGE_ENDPOINT 없이 실행 (설정 확인은 import가 아니라 create_app/lifespan에서)
+#
+# 사용 예:
+#   python bench_startup.py                                  # server, asgi_server
+#   python bench_startup.py --modules server --runs 7 --budget-ms 800
+#   python bench_startup.py --json startup.json
+# 주의: 첫 실행은 .pyc 생성 때문에 느릴 수 있어 첫 회는 버리고(warm-up) 측정
+
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+DEFAULT_FORBID = "azure,watchdog,psycopg2"
+
+# "import time:       123 |        456 |   package.module"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """-X importtime 출력 → [(module, self_us, cumulative_us, depth)]"""
+    out = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            out.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3))))
+    return out
+
+
+def run_once(module: str, workdir: str) -> Tuple[int, List[Tuple[str, int, int, int]], str]:
+    env = {k: v for k, v in os.environ.items() if k not in {"LANGUAGE_KEY", "LANGUAGE_ENDPOINT"}}
+    env.update({
+        "NER_RESULTS_DIR": os.path.join(workdir, "ner_results"),
+        "STT_RESULTS_DIR": os.path.join(workdir, "stt_results"),
+        "AGENT_RESULTS_DIR": os.path.join(workdir, "agent_results"),
+    })
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                       capture_output=True, text=True, timeout=300)
+    return p.returncode, parse_importtime(p.stderr), p.stderr
+
+
+def measure(module: str, runs: int, workdir: str) -> Dict[str, object]:
+    rc, rows, err = run_once(module, workdir)          # warm-up (.pyc 생성)
+    if rc != 0:
+        tail = [ln for ln in err.splitlines() if not ln.startswith("import time:")][-8:]
+        return {"error": "\n".join(tail) or f"exit {rc}"}
+    totals: List[float] = []
+    for _ in range(runs):
+        rc, rows, err = run_once(module, workdir)
+        cum = [c for name, _s, c, _d in rows if name == module]
+        totals.append((cum[-1] if cum else 0) / 1000.0)
+    by_pkg: Dict[str, int] = {}
+    for name, self_us, _c, _d in rows:
+        root = name.split(".")[0]
+        by_pkg[root] = by_pkg.get(root, 0) + self_us
+    return {
+        "median_ms": statistics.median(totals),
+        "min_ms": min(totals),
+        "modules": sorted({name for name, *_ in rows}),
+        "by_package_ms": {k: v / 1000.0 for k, v in sorted(by_pkg.items(), key=lambda kv: -kv[1])},
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Entry point import-time budget (-X importtime)")
+    ap.add_argument("--modules", default="server,asgi_server", help="측정할 모듈 (쉼표 구분)")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="모듈별 import 시간 상한 (median)")
+    ap.add_argument("--forbid", default=DEFAULT_FORBID, help="import 중 로드되면 실패할 패키지 (쉼표 구분, 빈 값 = 검사 안 함)")
+    ap.add_argument("--top", type=int, default=10, help="self 시간 상위 패키지 출력 수")
+    ap.add_argument("--json", help="결과를 JSON으로 저장")
+    args = ap.parse_args()
+
+    forbid = [f.strip() for f in args.forbid.split(",") if f.strip()]
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+    results: Dict[str, dict] = {}
+    failures: List[str] = []
+    # 측정 중 생기는 로그 디렉토리는 임시 workdir에 → 끝나면 삭제
+    with tempfile.TemporaryDirectory(prefix="glossify_bench_startup_") as workdir:
+        for module in modules:
+            results[module] = measure(module, max(1, args.runs), workdir)
+    for module in modules:
+        r = results[module]
+        if "error" in r:
+            print(f"== {module}: import failed\n{r['error']}")
+            failures.append(f"{module}: import failed")
+            continue
+        mark = "" if r["median_ms"] <= args.budget_ms else " !"
+        print(f"== {module}: median {r['median_ms']:8.1f} ms  min {r['min_ms']:8.1f} ms  "
+              f"budget {args.budget_ms:.0f} ms{mark}")
+        for pkg, ms in list(r["by_package_ms"].items())[:args.top]:
+            print(f"   {pkg:<32} {ms:8.1f} ms")
+        if mark:
+            failures.append(f"{module}: {r['median_ms']:.1f} ms > {args.budget_ms:.0f} ms")
+        loaded = [f for f in forbid if any(m == f or m.startswith(f + ".") for m in r["modules"])]
+        if loaded:
+            failures.append(f"{module}: eagerly imports {', '.join(loaded)}")
+        r.pop("modules")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent=2)
+    if failures:
+        print(f"❌ {len(failures)} startup budget failure(s):")
+        for msg in failures:
+            print(f"   - {msg}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
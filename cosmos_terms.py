@@ -5,9 +5,7 @@ from typing import Dict, Tuple, Optional
 from dataclasses import dataclass
 
 from dotenv import load_dotenv
-import psycopg2
-from psycopg2 import pool
-from psycopg2.extras import execute_values, register_uuid
+# psycopg2는 실제 upsert 시점에 import (canonicalize_term/CSV 헬퍼만 쓰는 서버/에이전트 기동을 가볍게)
 
 load_dotenv()
 
@@ -111,6 +109,7 @@ def ensure_table_and_indexes(conn):
 def upsert_terms(conn, rows: Dict[Tuple[uuid.UUID, str], Tuple[str, str]]) -> int:
     if not rows:
         return 0
+    from psycopg2.extras import execute_values
     values = [(tid, term, expl, domain) for (tid, domain), (term, expl) in rows.items()]
     with conn.cursor() as cur:
         execute_values(cur, """
@@ -128,13 +127,15 @@ class CosmosTermStore:
     """Reusable store with connection pool (thread-safe)."""
     def __init__(self, cfg: Optional[DBConfig] = None, minconn: int = 1, maxconn: int = 10):
         self.cfg = cfg or DBConfig.from_env()
-        self.pool: Optional[pool.SimpleConnectionPool] = None
+        self.pool = None        # psycopg2.pool.SimpleConnectionPool
         self.minconn = minconn
         self.maxconn = maxconn
 
     def start(self):
         if self.pool:
             return
+        import psycopg2.pool
+        from psycopg2.extras import register_uuid
         register_uuid()  # global (idempotent)
         # psycopg2 풀 생성
         self.pool = psycopg2.pool.SimpleConnectionPool(self.minconn, self.maxconn, _build_conn_string(self.cfg))
@@ -158,6 +159,7 @@ class CosmosTermStore:
         """Load CSV and upsert. Returns upserted row count."""
         if not self.pool:
             self.start()
+        from psycopg2.extras import register_uuid
         conn = self.pool.getconn()
         try:
             register_uuid(conn_or_curs=conn)  # idempotent
@@ -0,0 +1,199 @@
+# foundry_client.py
+# 프로세스 전역 Azure AI Foundry 클라이언트 (여러 meeting의 AgentService가 공유)
+# - DefaultAzureCredential / AIProjectClient는 (endpoint, agent_id)당 1개 → meeting마다 새로 만들지 않음
+# - 에이전트 유효성(get_agent): 처음 1회만 동기 확인, 이후 FOUNDRY_REVALIDATE_SEC마다 관리 스레드가 재확인
+#     401/403/404 → 무효 표시, 다음 호출에서 동기 재확인(실패 시 RuntimeError). 연결/5xx 등 일시 오류는 경고만
+# - 토큰 prefetch: 만료 FOUNDRY_TOKEN_REFRESH_SEC 전에 get_token 재호출 → 요청 경로에서 토큰 발급을 기다리지 않음
+#     (azure-identity는 만료 5분 전부터 갱신 대상으로 보므로 기본값 240초면 실제로 새 토큰을 받음)
+# - warm Thread 풀: 빈 Foundry Thread를 FOUNDRY_THREAD_POOL개 미리 만들어 둠
+#     워커는 꺼내 쓰기만 하고 반납하지 않음 (회의 간 대화 이력 공유 없음), 관리 스레드가 다시 채움
+# - warm(): 부팅 시 1회 → client/credential/검증/Thread 생성을 첫 회의의 첫 용어 전에 끝냄
+# azure.identity / azure.ai.projects는 client() 첫 호출 때 import
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from metrics_registry import FOUNDRY_EVENTS, FOUNDRY_POOL_DEPTH
+
+FOUNDRY_PREWARM           = (os.getenv("FOUNDRY_PREWARM") or "1").lower() in {"1", "true", "y"}
+FOUNDRY_REVALIDATE_SEC    = float(os.getenv("FOUNDRY_REVALIDATE_SEC", "600"))     # 0 = 재확인 안 함
+FOUNDRY_TOKEN_SCOPE       = os.getenv("FOUNDRY_TOKEN_SCOPE", "https://ai.azure.com/.default")
+FOUNDRY_TOKEN_REFRESH_SEC = float(os.getenv("FOUNDRY_TOKEN_REFRESH_SEC", "240"))  # 0 = prefetch 안 함
+FOUNDRY_THREAD_POOL       = int(os.getenv("FOUNDRY_THREAD_POOL", os.getenv("MAX_WORKERS", "5")))
+
+_INVALID_STATUS = {401, 403, 404}
+_RETRY_SEC = 30.0       # 일시 오류 후 재시도 간격
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+class FoundryClient:
+    def __init__(self, endpoint: str, agent_id: str, pool_size: int = FOUNDRY_THREAD_POOL):
+        self.endpoint = endpoint
+        self.agent_id = agent_id
+        self.pool_size = max(0, pool_size)
+        self.cred = None        # azure.identity.DefaultAzureCredential
+        self._client = None     # azure.ai.projects.AIProjectClient
+        self._client_lock = threading.Lock()
+        self._validate_lock = threading.Lock()
+        self._validated = False
+        self._threads: List[str] = []
+        self._threads_lock = threading.Lock()
+        self._fill_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._maint: Optional[threading.Thread] = None
+
+    # ---------- client / 검증 ----------
+    def client(self):
+        if self._client is not None:
+            return self._client
+        with self._client_lock:
+            if self._client is None:
+                from azure.identity import DefaultAzureCredential
+                from azure.ai.projects import AIProjectClient
+                self.cred = DefaultAzureCredential()
+                self._client = AIProjectClient(endpoint=self.endpoint, credential=self.cred)
+                print("[foundry] ✅ AIProjectClient ready (shared)")
+            return self._client
+
+    def ensure_agent(self):
+        """검증된 상태면 네트워크 호출 없이 반환. 아니면 get_agent 동기 호출 (실패 시 RuntimeError, 절대 새로 만들지 않음)"""
+        if self._validated:
+            return
+        client = self.client()
+        with self._validate_lock:
+            if self._validated:
+                return
+            try:
+                if hasattr(client.agents, "get_agent"):
+                    client.agents.get_agent(self.agent_id)
+            except Exception as e:
+                FOUNDRY_EVENTS.labels("validate_fail").inc()
+                raise RuntimeError(
+                    f"Configured AGENT_ID seems invalid or inaccessible: {self.agent_id} ({e})"
+                ) from e
+            self._validated = True
+            FOUNDRY_EVENTS.labels("validate").inc()
+            print(f"[foundry] ✅ Using existing Agent: {self.agent_id}")
+        self._start_maintenance()
+
+    # ---------- warm Thread 풀 ----------
+    def acquire_thread(self) -> str:
+        """미리 만든 빈 Thread를 꺼냄 (풀이 비었으면 바로 생성). 관리 스레드가 풀을 다시 채움"""
+        with self._threads_lock:
+            tid = self._threads.pop() if self._threads else None
+            FOUNDRY_POOL_DEPTH.labels().set(len(self._threads))
+        if tid:
+            FOUNDRY_EVENTS.labels("thread_warm").inc()
+        else:
+            tid = self.client().agents.threads.create().id
+            FOUNDRY_EVENTS.labels("thread_cold").inc()
+        self._wake.set()
+        return tid
+
+    def pooled_threads(self) -> int:
+        with self._threads_lock:
+            return len(self._threads)
+
+    def _fill_threads(self):
+        client = self.client()
+        with self._fill_lock:       # warm()과 관리 스레드가 동시에 채워 상한을 넘지 않도록
+            while self.pooled_threads() < self.pool_size:
+                tid = client.agents.threads.create().id
+                with self._threads_lock:
+                    self._threads.append(tid)
+                    FOUNDRY_POOL_DEPTH.labels().set(len(self._threads))
+
+    # ---------- 관리 스레드: 토큰 prefetch / 재검증 / 풀 보충 ----------
+    def _start_maintenance(self):
+        with self._client_lock:
+            if self._maint is not None:
+                return
+            self._maint = threading.Thread(target=self._maintenance_loop, name="foundry-maint", daemon=True)
+            self._maint.start()
+
+    def _refresh_token(self) -> float:
+        """토큰을 미리 받아 두고 다음 갱신까지 남은 초를 반환"""
+        try:
+            tok = self.cred.get_token(FOUNDRY_TOKEN_SCOPE)
+        except Exception as e:
+            print(f"[foundry] token prefetch failed: {e}")
+            return _RETRY_SEC
+        FOUNDRY_EVENTS.labels("token_refresh").inc()
+        # SDK가 캐시된 토큰을 그대로 돌려준 경우에도 바쁜 루프가 되지 않도록 하한
+        return max(_RETRY_SEC, float(tok.expires_on) - time.time() - FOUNDRY_TOKEN_REFRESH_SEC)
+
+    def _revalidate(self) -> float:
+        try:
+            self.client().agents.get_agent(self.agent_id)
+        except Exception as e:
+            status = _status_of(e)
+            if status in _INVALID_STATUS:
+                self._validated = False
+                FOUNDRY_EVENTS.labels("validate_fail").inc()
+                print(f"[foundry] ❌ agent {self.agent_id} no longer accessible ({status}) → next call re-checks")
+                return FOUNDRY_REVALIDATE_SEC
+            print(f"[foundry] revalidate error (kept previous result): {e}")
+            return _RETRY_SEC
+        FOUNDRY_EVENTS.labels("revalidate").inc()
+        return FOUNDRY_REVALIDATE_SEC
+
+    def _maintenance_loop(self):
+        now = time.monotonic()
+        next_token = now if FOUNDRY_TOKEN_REFRESH_SEC > 0 else float("inf")
+        next_validate = now + FOUNDRY_REVALIDATE_SEC if FOUNDRY_REVALIDATE_SEC > 0 else float("inf")
+        next_fill = now
+        while True:
+            self._wake.clear()
+            now = time.monotonic()
+            if now >= next_token:
+                next_token = now + self._refresh_token()
+            if now >= next_validate:
+                next_validate = now + self._revalidate()
+            if now >= next_fill:
+                try:
+                    self._fill_threads()
+                    next_fill = float("inf")      # 다음 보충은 acquire_thread()가 깨울 때
+                except Exception as e:
+                    print(f"[foundry] thread pool refill failed: {e}")
+                    next_fill = now + _RETRY_SEC
+            wait = min(next_token, next_validate, next_fill) - time.monotonic()
+            if self._wake.wait(timeout=min(max(wait, 1.0), 3600.0)):
+                next_fill = min(next_fill, time.monotonic())
+
+    # ---------- 부팅 시 예열 ----------
+    def warm(self) -> bool:
+        """client/credential 생성 + 에이전트 검증(첫 토큰 발급 포함) + Thread 풀 채우기"""
+        t0 = time.monotonic()
+        try:
+            self.ensure_agent()
+            self._fill_threads()
+        except Exception as e:
+            print(f"[foundry] warm-up failed: {e}")
+            return False
+        print(f"[foundry] warm in {time.monotonic() - t0:.2f}s (threads={self.pooled_threads()})")
+        return True
+
+    def snapshot(self) -> dict:
+        return {"agent_id": self.agent_id, "validated": self._validated,
+                "pooled_threads": self.pooled_threads(), "pool_size": self.pool_size}
+
+
+_CLIENTS: Dict[Tuple[str, str], FoundryClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_foundry_client(endpoint: str, agent_id: str) -> FoundryClient:
+    """(endpoint, agent_id)별 프로세스 전역 클라이언트 (lazy)"""
+    key = (endpoint, agent_id)
+    with _CLIENTS_LOCK:
+        fc = _CLIENTS.get(key)
+        if fc is None:
+            fc = _CLIENTS[key] = FoundryClient(endpoint, agent_id)
+        return fc
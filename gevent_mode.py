@@ -0,0 +1,116 @@
+# gevent_mode.py
+# gevent 협조 모드: monkey-patch + 허브 블로킹 감지
+# - server.py 맨 위에서 patch()를 다른 import보다 먼저 호출 (socket/ssl/threading/time 교체 순서 보장)
+#     GEVENT_PATCH=auto(기본): SOCKETIO_ASYNC_MODE가 비었거나 gevent 계열이고 gevent가 설치돼 있으면 patch
+#     GEVENT_PATCH=1 강제, 0 비활성 (gunicorn gevent 워커가 이미 patch 했으면 그대로 인정)
+# - patch 후 threading.Thread/Lock/queue/time.sleep/requests(소켓)는 greenlet 협조형으로 동작
+#   → AgentService 워커/락은 코드 변경 없이 greenlet-aware
+# - 허브를 막는 C 확장/파일 I/O(psycopg2 upsert, CSV append)는 run_blocking()/spawn_blocking()으로 네이티브 스레드풀에 위임
+# - 블로킹 감지: GEVENT_BLOCK_WARN_MS 이상 허브가 막히면 경고 + 스택 (gevent monitor thread),
+#   heartbeat greenlet으로 허브 지연 히스토그램(glossify_hub_lag_seconds) 기록
+#
+# 이 모듈은 patch 전에 import 되므로 최상위에서 os 외 모듈을 import 하지 않는다.
+
+import os
+
+GEVENT_PATCH          = (os.getenv("GEVENT_PATCH") or "auto").strip().lower()
+GEVENT_BLOCK_WARN_MS  = float(os.getenv("GEVENT_BLOCK_WARN_MS", "100"))    # 0 = 감지 비활성
+GEVENT_HEARTBEAT_MS   = float(os.getenv("GEVENT_HEARTBEAT_MS", "50"))
+
+_patched = False
+
+
+def _wants_gevent() -> bool:
+    if GEVENT_PATCH in {"0", "false", "n", "off"}:
+        return False
+    if GEVENT_PATCH in {"1", "true", "y", "on"}:
+        return True
+    mode = (os.getenv("SOCKETIO_ASYNC_MODE") or "").strip().lower()
+    return mode in {"", "gevent", "gevent_uwsgi"}
+
+
+def patch() -> bool:
+    """필요하면 gevent monkey-patch. 반환: 현재 프로세스가 patch 상태인지"""
+    global _patched
+    if _patched:
+        return True
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    if monkey.is_module_patched("socket"):      # gunicorn gevent 워커 등이 이미 patch
+        _patched = True
+    elif _wants_gevent():
+        monkey.patch_all()
+        _patched = True
+        try:
+            from psycogreen.gevent import patch_psycopg  # 선택 의존성: psycopg2 대기를 협조형으로
+            patch_psycopg()
+        except ImportError:
+            pass
+    if _patched:
+        print(f"[gevent] monkey-patched (block warn={GEVENT_BLOCK_WARN_MS:g}ms)")
+    return _patched
+
+
+def is_patched() -> bool:
+    return _patched
+
+
+# ---------------- 블로킹 작업 위임 ----------------
+def run_blocking(fn, *args, **kw):
+    """patch 상태면 허브 스레드풀(네이티브 스레드)에서 실행하고 협조적으로 대기, 아니면 바로 실행"""
+    if not _patched:
+        return fn(*args, **kw)
+    import gevent
+    return gevent.get_hub().threadpool.apply(fn, args, kw)
+
+
+def spawn_blocking(fn, name: str = ""):
+    """
+    오래 걸리는 블로킹 작업을 백그라운드로. patch 상태면 네이티브 스레드풀, 아니면 일반 daemon 스레드.
+    (patch 후 threading.Thread는 greenlet이라 C 확장 블로킹이 허브를 막음)
+    """
+    if _patched:
+        import gevent
+        return gevent.get_hub().threadpool.spawn(fn)
+    import threading
+    t = threading.Thread(target=fn, name=name or None, daemon=True)
+    t.start()
+    return t
+
+
+# ---------------- 허브 블로킹 감지 ----------------
+def _on_event(event):
+    from gevent.events import EventLoopBlocked
+    if isinstance(event, EventLoopBlocked):
+        from metrics_registry import HUB_BLOCKED
+        HUB_BLOCKED.inc()
+        print(f"[gevent] ⚠️ hub blocked > {event.blocking_time * 1000:.0f}ms by {event.greenlet!r}\n"
+              + "".join(event.info[-12:]))
+
+
+def _heartbeat():
+    import time
+    import gevent
+    from metrics_registry import HUB_LAG
+    interval = GEVENT_HEARTBEAT_MS / 1000.0
+    while True:
+        t0 = time.monotonic()
+        gevent.sleep(interval)
+        HUB_LAG.observe(max(0.0, time.monotonic() - t0 - interval))
+
+
+def start_block_detector():
+    """patch 상태에서 1회 호출: 블로킹 경고(monitor thread) + heartbeat 지연 측정 greenlet"""
+    if not _patched or GEVENT_BLOCK_WARN_MS <= 0:
+        return False
+    import gevent
+    from gevent import events
+    gevent.config.monitor_thread = True
+    gevent.config.max_blocking_time = GEVENT_BLOCK_WARN_MS / 1000.0
+    if _on_event not in events.subscribers:
+        events.subscribers.append(_on_event)
+    gevent.get_hub().start_periodic_monitoring_thread()
+    gevent.spawn(_heartbeat)
+    return True
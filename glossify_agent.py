@@ -1,6 +1,8 @@
 # glossify_agent.py
 # - ner_results/ner_entities_*.csv 실시간 tail → 작업큐 적재
+#   엔티티는 alias_index로 표준 키로 바꿔 negative cache/중복 제거/in-flight coalescing (철자 변형도 한 번만 설명)
 # - 워커 스레드: 각자 Foundry Thread 사용, Azure Agent 호출(재시도/타임아웃)
+#   client/credential/에이전트 검증/빈 Thread 풀은 foundry_client가 프로세스 전역으로 공유 (prewarm_foundry로 부팅 시 예열)
 # - 결과 CSV 저장(락), 그리고 서버 /meeting/<MEETING_ID>/terms 로 REST POST
 # - 콘솔 로그/파일 로그 선택(SILENT, LOG_TO_FILE)
 # - 임포트 친화적: AgentService.start() 호출 전까지 부작용 없음
@@ -13,26 +15,44 @@ import glob
 import time
 import json
 import queue
+import uuid
 import random
 import threading
+import functools
 import logging
 import requests
 from logging.handlers import RotatingFileHandler
-from collections import deque
-from typing import Optional, Tuple
+from collections import OrderedDict, deque
+from typing import Callable, Optional, Tuple
 
 from dotenv import load_dotenv
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 
+from skip_classifier import (
+    DECISION_HEADER, OUTCOME_EXPLAIN, OUTCOME_MODEL_SKIP, OUTCOME_SKIP, SkipClassifier, context_window,
+)
+from term_cache import get_negative_cache
+from alias_index import get_alias_index
+from log_writer import flush_logs, write_rows
+from foundry_client import FOUNDRY_PREWARM, get_foundry_client
+from tracing import current_traceparent, span, trace_id_of
+from metrics_registry import (
+    AGENT_EVENTS, AGENT_RUN_LATENCY, DELIVERY_LATENCY, OVERFLOW_DEPTH, QUEUE_DEPTH, QUEUE_WAIT,
+)
+
 # Azure AI Foundry SDK
-from azure.identity import DefaultAzureCredential
 from azure.ai.projects import AIProjectClient
-from azure.ai.agents.models import ListSortOrder, MessageRole
+from azure.ai.agents.models import (
+    AgentStreamEvent, ListSortOrder, MessageDeltaChunk, MessageRole, RunStatus, ThreadRun,
+)
 
 load_dotenv()
 
 # ---------------------- 환경설정 ----------------------
+# gevent patch 상태에선 inotify 네이티브 observer가 허브를 막으므로 polling observer 사용 (WATCH_POLLING=1로 강제)
+WATCH_POLLING = (os.getenv("WATCH_POLLING") or "0").lower() in {"1", "true", "y"}
 PROJECT_ENDPOINT      = os.getenv("PROJECT_ENDPOINT", "").strip()
 MODEL_DEPLOYMENT_NAME = os.getenv("MODEL_DEPLOYMENT_NAME", "gpt-4o").strip()
 
@@ -45,12 +65,15 @@ BACKEND_BASE_URL = (os.getenv("BACKEND_BASE_URL", "http://localhost:5000").rstri
 MEETING_ID       = os.getenv("MEETING_ID", "demo123")
 
 START_FROM_BEGINNING = (os.getenv("START_FROM_BEGINNING", "false").lower() in {"1","true","y"})
+NER_UTT_CACHE        = int(os.getenv("NER_UTT_CACHE", "2048"))   # v2 NER 로그: tail이 기억하는 최근 발화 수
 
 # 카테고리/토큰 규칙
 ALLOWED_CATS = {c.strip() for c in (os.getenv("ALLOWED_CATS",
                     "Person,PersonType,Organization,Event,Product,Skill").split(",")) if c.strip()}
 MIN_TERM_TOKENS              = int(os.getenv("MIN_TERM_TOKENS", "2"))
 DEDUP_IN_TIMESTAMP           = (os.getenv("DEDUP_IN_TIMESTAMP", "true").lower() == "true")
+# 같은 (alias 키, 카테고리)가 이미 큐/처리 중이면 다시 넣지 않음 (철자 변형 포함)
+INFLIGHT_COALESCE            = (os.getenv("INFLIGHT_COALESCE", "1").lower() in {"1","true","y"})
 ALLOW_ONE_TOKEN_IF_CONF_GE   = float(os.getenv("ALLOW_ONE_TOKEN_IF_CONF_GE", "0.92"))
 ALLOW_ACRONYM_LEN_LE         = int(os.getenv("ALLOW_ACRONYM_LEN_LE", "3"))
 
@@ -61,9 +84,26 @@ AGENT_RETRY_MAX        = int(os.getenv("AGENT_RETRY_MAX", "3"))
 AGENT_RETRY_BASE_SEC   = float(os.getenv("AGENT_RETRY_BASE_SEC", "0.8"))
 AGENT_RUN_TIMEOUT_SEC  = float(os.getenv("AGENT_RUN_TIMEOUT_SEC", "25"))  # 1회 run 예산
 AGENT_TOTAL_TIMEOUT_SEC= float(os.getenv("AGENT_TOTAL_TIMEOUT_SEC","60"))  # 재시도 포함 총 예산
+
+# 프롬프트 맥락: 엔티티가 있는 문장 ± AGENT_CONTEXT_SENTENCES 문장, 토큰 예산 안에서만 (0 = source_text 전체)
+AGENT_CONTEXT_SENTENCES       = int(os.getenv("AGENT_CONTEXT_SENTENCES", "1"))
+AGENT_CONTEXT_TOKENS          = int(os.getenv("AGENT_CONTEXT_TOKENS", "160"))
+AGENT_CONTEXT_CHARS_PER_TOKEN = float(os.getenv("AGENT_CONTEXT_CHARS_PER_TOKEN", "2.0"))  # 한국어 위주 대략치
+AGENT_RUN_POLL_SEC     = float(os.getenv("AGENT_RUN_POLL_SEC", "0.25"))    # run 상태 폴링 간격
+TASK_FRESHNESS_SEC     = float(os.getenv("TASK_FRESHNESS_SEC", "60"))      # 큐 대기 허용 시간(초과 시 폐기, 0=무제한)
+
+# 스트리밍: runs.stream으로 받은 토큰을 terms_delta 이벤트로 즉시 전달
+AGENT_STREAMING        = (os.getenv("AGENT_STREAMING", "0").lower() in {"1","true","y"})
+STREAM_HOLD_CHARS      = int(os.getenv("STREAM_HOLD_CHARS", "16"))  # __SKIP__/도메인 판별 전까지 보류할 글자 수
 HTTP_POST_CONNECT_TO   = float(os.getenv("HTTP_POST_CONNECT_TIMEOUT_SEC", "3"))
 HTTP_POST_READ_TO      = float(os.getenv("HTTP_POST_READ_TIMEOUT_SEC", "7"))
 REFEED_BATCH           = int(os.getenv("REFEED_BATCH", "256"))
+AGENT_STOP_DRAIN_SEC   = float(os.getenv("AGENT_STOP_DRAIN_SEC", "10"))  # stop() 시 남은 task 처리 대기 상한 (넘으면 버림)
+
+# 사전 skip 분류기 (skip_classifier.py로 학습) / 학습용 결정 로그
+SKIP_MODEL_PATH        = os.getenv("SKIP_MODEL_PATH", "skip_model.json")
+SKIP_MODEL_THRESHOLD   = os.getenv("SKIP_MODEL_THRESHOLD")  # 비우면 모델 파일의 threshold 사용
+DECISION_LOG           = (os.getenv("DECISION_LOG", "1").lower() in {"1","true","y"})
 
 # 로깅
 SILENT      = (os.getenv("SILENT","0").lower() in {"1","true","y"})
@@ -72,15 +112,25 @@ LOG_LEVEL   = os.getenv("LOG_LEVEL","INFO").upper()
 
 logger = logging.getLogger("glossify_agent")
 logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
-if LOG_TO_FILE:
-    os.makedirs("logs", exist_ok=True)
-    fh = RotatingFileHandler("logs/glossify_agent.log", maxBytes=2_000_000, backupCount=3, encoding="utf-8")
-    fh.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-    logger.addHandler(fh)
-if not SILENT:
-    ch = logging.StreamHandler()
-    ch.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-    logger.addHandler(ch)
+_LOG_INIT_LOCK = threading.Lock()
+_log_ready = False
+
+def _init_logging():
+    """핸들러(파일/콘솔)는 첫 AgentService/예열 때 1회만 붙임 (import만으로는 logs/ 파일을 만들지 않음)"""
+    global _log_ready
+    with _LOG_INIT_LOCK:
+        if _log_ready:
+            return
+        _log_ready = True
+        if LOG_TO_FILE:
+            os.makedirs("logs", exist_ok=True)
+            fh = RotatingFileHandler("logs/glossify_agent.log", maxBytes=2_000_000, backupCount=3, encoding="utf-8")
+            fh.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+            logger.addHandler(fh)
+        if not SILENT:
+            ch = logging.StreamHandler()
+            ch.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+            logger.addHandler(ch)
 
 def _log_info(msg): logger.info(msg)
 def _log_warn(msg): logger.warning(msg)
@@ -94,24 +144,105 @@ CONTEXT_PREFIX_RE = re.compile(
 )
 _SENT_ITER_RE = re.compile(r'[^.!?。！？…]+(?:[.!?。！？…]+|$)')
 
+def _make_observer():
+    """gevent monkey-patch 상태(greenlet 워커)면 협조형 PollingObserver, 아니면 네이티브 Observer"""
+    try:
+        from gevent import monkey
+        patched = monkey.is_module_patched("threading")
+    except ImportError:
+        patched = False
+    return PollingObserver(timeout=0.25) if (patched or WATCH_POLLING) else Observer()
+
 def newest_csv(dirpath: str) -> Optional[str]:
     paths = sorted(glob.glob(os.path.join(dirpath, "ner_entities_*.csv")),
                    key=os.path.getmtime, reverse=True)
     return paths[0] if paths else None
 
-def parse_csv_line(line: str) -> Optional[dict]:
+class UtteranceCache:
+    """v2 NER 로그의 발화(U) 행: utt_id → (timestamp, trace, source_text). 최근 maxlen개만 유지"""
+
+    def __init__(self, maxlen: int = NER_UTT_CACHE):
+        self.maxlen = maxlen
+        self._d: OrderedDict = OrderedDict()
+
+    def put(self, utt_id: str, rec: Tuple[str, str, str]):
+        self._d[utt_id] = rec
+        if len(self._d) > self.maxlen:
+            self._d.popitem(last=False)
+
+    def get(self, utt_id: str) -> Optional[Tuple[str, str, str]]:
+        return self._d.get(utt_id)
+
+    def clear(self):
+        self._d.clear()
+
+
+def _to_conf(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0      # 잘못된 confidence → filtered_conf
+
+
+class AgentTask:
+    """
+    큐/overflow에 쌓이는 task 1건. dict 대신 __slots__ (필드 dict·키 해시 테이블 없음)
+    같은 발화의 엔티티들은 source_text 문자열 객체를 공유 (AgentService._intern_source)
+    """
+    __slots__ = ("timestamp", "category", "entity", "confidence", "source_text", "trace",
+                 "utt_id", "offset", "length", "enq_at", "key")
+
+    def __init__(self, timestamp: str, category: str, entity: str, confidence: float, source_text: str,
+                 trace: str = "", utt_id: str = "", offset: int = -1, length: int = 0):
+        self.timestamp = timestamp
+        self.category = category
+        self.entity = entity
+        self.confidence = confidence
+        self.source_text = source_text
+        self.trace = trace
+        self.utt_id = utt_id
+        self.offset = offset
+        self.length = length
+        self.enq_at = 0.0
+        self.key = ""           # alias 키 (_enqueue_if_pass에서 채움)
+
+    @classmethod
+    def from_item(cls, item: dict) -> "AgentTask":
+        """server._publish_to_pool(IPC) 등 dict item → task"""
+        return cls((item.get("timestamp") or "").strip(), (item.get("category") or "").strip(),
+                   (item.get("entity") or "").strip(), _to_conf(item.get("confidence")),
+                   item.get("source_text") or "", item.get("trace") or "", item.get("utt_id") or "",
+                   item.get("offset", -1), item.get("length", 0))
+
+
+def parse_csv_line(line: str, utterances: Optional[UtteranceCache] = None) -> Optional[AgentTask]:
+    """
+    NER 로그 레코드 1개 → AgentTask (중간 dict 없음). v1(엔티티 행마다 source_text)과 v2(U/E 행) 모두 처리.
+    v2: U 행은 utterances에 기록만 하고 None, E 행은 utt_id로 발화를 찾아 source_text를 참조(복사/재파싱 없음)
+    """
     f = io.StringIO(line)
     r = csv.reader(f)
     row = next(r, None)
     if not row or len(row) < 5:
         return None
-    return {
-        "timestamp":   (row[0] or "").strip(),
-        "category":    (row[1] or "").strip(),
-        "entity":      (row[2] or "").strip(),
-        "confidence":  (row[3] or "").strip(),
-        "source_text": row[4] if len(row) > 4 else ""
-    }
+    kind = row[0]
+    if kind == "U":
+        if utterances is not None:
+            utterances.put(row[1], ((row[2] or "").strip(), (row[3] or "").strip(), row[4]))
+        return None
+    if kind == "E":
+        utt = utterances.get(row[1]) if utterances is not None else None
+        if utt is None:          # 발화 행을 못 봄 (tail 시작 위치 이전) → 맥락 없이 처리하지 않음
+            return None
+        try:
+            offset, length = int(row[5]), int(row[6])
+        except (IndexError, ValueError):
+            offset, length = -1, 0
+        return AgentTask(utt[0], (row[2] or "").strip(), (row[3] or "").strip(), _to_conf(row[4]),
+                         utt[2], utt[1], row[1], offset, length)
+    return AgentTask((row[0] or "").strip(), (row[1] or "").strip(), (row[2] or "").strip(), _to_conf(row[3]),
+                     row[4],
+                     (row[5] or "").strip() if len(row) > 5 else "")    # W3C traceparent (상관관계 ID)
 
 def split_domain_and_body(text: str) -> Tuple[str, str]:
     if not text:
@@ -129,6 +260,117 @@ def split_sentences_with_spans(text: str):
             for m in _SENT_ITER_RE.finditer(text or "")
             if m.group(0).strip()]
 
+# 맥락용 문장 경계: 종결부호 뒤에 공백/끝이 올 때만 (7.3%, 2.5D 같은 숫자 안의 '.'에서 자르지 않음)
+_CTX_SENT_RE = re.compile(r'\S.*?(?:[.!?。！？…]+(?=\s|$)|$)', re.S)
+
+@functools.lru_cache(maxsize=64)
+def _sentence_spans(text: str) -> Tuple[Tuple[int, int], ...]:
+    """같은 발화의 엔티티들이 문장 분리를 공유 (발화 문자열 해시는 캐시됨)"""
+    return tuple((m.start(), m.end()) for m in _CTX_SENT_RE.finditer(text))
+
+def entity_context(source_text: str, entity: str, offset: int = -1, length: int = 0,
+                   neighbors: int = AGENT_CONTEXT_SENTENCES, max_tokens: int = AGENT_CONTEXT_TOKENS) -> str:
+    """
+    에이전트 프롬프트용 엔티티 주변 맥락: 엔티티가 든 문장 → 앞뒤 문장을 neighbors개까지, 토큰 예산(max_tokens) 안에서 확장.
+    문장 하나가 예산보다 길면 엔티티 중심으로 글자 수를 잘라냄. offset은 NER 응답 기준(어긋나면 첫 등장 위치)
+    """
+    src = source_text or ""
+    if max_tokens <= 0:
+        return src
+    budget = int(max_tokens * AGENT_CONTEXT_CHARS_PER_TOKEN)
+    if len(src) <= budget:
+        return src
+    if not (isinstance(offset, int) and offset >= 0 and src[offset:offset + length] == entity):
+        offset = src.find(entity) if entity else -1
+        length = len(entity or "")
+    if offset < 0:
+        return src[:budget].strip()
+
+    spans = _sentence_spans(src)
+    i = next((k for k, (a, b) in enumerate(spans) if a <= offset < b), None)
+    if i is None:
+        lo, hi = offset, offset + length
+    else:
+        lo, hi = spans[i]
+        for d in range(1, neighbors + 1):
+            grew = False
+            if i - d >= 0 and hi - spans[i - d][0] <= budget:
+                lo, grew = spans[i - d][0], True
+            if i + d < len(spans) and spans[i + d][1] - lo <= budget:
+                hi, grew = spans[i + d][1], True
+            if not grew:
+                break
+    if hi - lo > budget:
+        # 엔티티 중심으로 budget 글자
+        lo = max(0, min(offset + length // 2 - budget // 2, len(src) - budget))
+        hi = lo + budget
+    return src[lo:hi].strip()
+
+def _status_str(status) -> str:
+    return (getattr(status, "value", status) or "").lower()
+
+_RUN_TERMINAL = {_status_str(s) for s in (RunStatus.COMPLETED, RunStatus.FAILED,
+                                          RunStatus.CANCELLED, RunStatus.EXPIRED)}
+
+class _DeltaEmitter:
+    """
+    스트리밍 토큰 → terms_delta payload.
+    앞부분은 STREAM_HOLD_CHARS 만큼 보류해서 '__SKIP__' 응답은 내보내지 않고,
+    도메인 프리픽스(Finance: ...)는 떼어 첫 delta의 domain 필드로 보낸다.
+    """
+    def __init__(self, sink: Callable[[dict], None], base: dict):
+        self.sink = sink
+        self.base = base
+        self._buf = ""
+        self._released = False
+        self._suppressed = False
+        self._seq = 0
+
+    def _emit(self, **kw):
+        self._seq += 1
+        try:
+            self.sink({**self.base, "seq": self._seq, **kw})
+        except Exception as e:
+            _log_warn(f"[stream] delta emit failed: {e}")
+
+    def reset(self):
+        """재시도 시작: 이미 내보낸 조각이 있으면 클라이언트가 비우도록 알림"""
+        if self._released and not self._suppressed:
+            self._emit(delta="", reset=True)
+        self._buf, self._released, self._suppressed = "", False, False
+
+    def feed(self, text: str):
+        if not text or self._suppressed:
+            return
+        if self._released:
+            self._emit(delta=text)
+            return
+        self._buf += text
+        head = self._buf.lstrip()
+        if head.startswith("__SKIP__"):
+            self._suppressed = True
+        elif len(head) >= STREAM_HOLD_CHARS and not "__SKIP__".startswith(head):
+            self._release()
+
+    def _release(self):
+        self._released = True
+        head = self._buf.lstrip()
+        m = DOMAIN_PREFIX_RE.match(head)
+        if m:
+            self._emit(delta=m.group(2), domain=m.group(1))
+        else:
+            self._emit(delta=head)
+        self._buf = ""
+
+    def finish(self, skipped: bool = False, error: bool = False):
+        if not self._released and not self._suppressed and not skipped and not error and self._buf.strip():
+            self._release()
+        if self._released and error:
+            # 에이전트 실패: 이미 내보낸 조각을 클라이언트가 버리도록 종료 + 에러 표시 (최종 terms는 오지 않음)
+            self._emit(delta="", done=True, reset=True, error=True)
+        elif self._released:
+            self._emit(delta="", done=True, skipped=skipped)
+
 def drop_trailing_context_sentence(body: str) -> Tuple[str, bool]:
     if not body:
         return body, False
@@ -143,7 +385,6 @@ def drop_trailing_context_sentence(body: str) -> Tuple[str, bool]:
 # ---------------------- AgentService ----------------------
 AGENT_STATE_PATH = os.getenv("AGENT_STATE_PATH", "foundry_agent.json")
 AGENT_STATE_LOCK = threading.Lock()        # 파일 IO 락
-AGENT_INIT_LOCK  = threading.Lock()        # 클라이언트/에이전트 초기화 단일화
 
 def _load_agent_state(path: str = AGENT_STATE_PATH) -> dict:
     with AGENT_STATE_LOCK:
@@ -184,63 +425,130 @@ def _save_agent_state(agent_id: str, name: str, endpoint: str, model: str, path:
             _log_warn(f"[agent-state] save fail: {e}")
 
 
+def resolve_agent_id() -> Tuple[Optional[str], str]:
+    """사용할 기존 에이전트 ID와 출처 (ENV AGENT_ID 우선, 다음 foundry_agent.json)"""
+    env_agent_id = (os.getenv("AGENT_ID") or "").strip()
+    if env_agent_id:
+        return env_agent_id, "ENV AGENT_ID"
+    state = _load_agent_state()
+    if state.get("agent_id"):
+        return state["agent_id"], AGENT_STATE_PATH
+    return None, ""
+
+
+def prewarm_foundry(project_endpoint: str = PROJECT_ENDPOINT) -> bool:
+    """
+    부팅 시 백그라운드로 공유 Foundry client 예열 (credential/토큰, 에이전트 검증, 빈 Thread 풀)
+    → 새 회의의 첫 용어가 초기화 비용을 내지 않음. FOUNDRY_PREWARM=0 이면 첫 사용 시 lazy 초기화.
+    """
+    _init_logging()
+    agent_id, _ = resolve_agent_id()
+    if not FOUNDRY_PREWARM or not project_endpoint or not agent_id:
+        return False
+    fc = get_foundry_client(project_endpoint, agent_id)
+    threading.Thread(target=fc.warm, name="foundry-warm", daemon=True).start()
+    return True
+
+
 class AgentService:
     def __init__(self,
                  project_endpoint: str,
                  model_deployment: str,
                  backend_base_url: str,
-                 meeting_id: str):
+                 meeting_id: str,
+                 freshness_sec: Optional[float] = None,
+                 delta_sink: Optional[Callable[[dict], None]] = None,
+                 term_sink: Optional[Callable[[dict, str], None]] = None):
 
         if not project_endpoint or not model_deployment:
             raise RuntimeError("PROJECT_ENDPOINT / MODEL_DEPLOYMENT_NAME 필요")
+        _init_logging()
 
         self.project_endpoint = project_endpoint
         self.model_deployment = model_deployment
         self.backend_base_url = backend_base_url.rstrip("/")
         self.meeting_id = meeting_id
+        # 이 시간보다 오래 큐에 머문 task는 설명해도 의미가 없으므로 폐기 (0 이하 = 무제한)
+        self.freshness_sec = TASK_FRESHNESS_SEC if freshness_sec is None else float(freshness_sec)
+        # 스트리밍 delta를 받을 콜백(서버가 같은 프로세스에서 WS emit). 없으면 스트리밍 안 함
+        self.delta_sink = delta_sink
+        self.streaming = AGENT_STREAMING and delta_sink is not None
+        # 최종 용어 전달 콜백(payload, traceparent). 없으면 REST POST /terms (agent_pool 워커 프로세스는 IPC로 반환)
+        self.term_sink = term_sink
 
         self.cred = None
         self.project_client: Optional[AIProjectClient] = None
         self.agent_id: Optional[str] = None
+        self.foundry = None     # foundry_client.FoundryClient (프로세스 전역 공유)
 
-        self._q: "queue.Queue[dict]" = queue.Queue(MAX_QUEUE)
+        self._q: "queue.Queue[AgentTask]" = queue.Queue(MAX_QUEUE)
         self._overflow = deque(maxlen=5000)
+        self._last_src = ""     # _intern_source
         self._workers: list[threading.Thread] = []
         self._observer: Optional[Observer] = None
         self._stop_event = threading.Event()
+        self._closing = threading.Event()    # stop() 시작: 새 task 거부 (drain 중)
 
         self.metrics = {
             "read": 0, "enq": 0, "overflow": 0,
             "filtered_empty_ent": 0, "filtered_dup": 0, "filtered_cat": 0,
-            "filtered_conf": 0, "filtered_tokens": 0
+            "filtered_conf": 0, "filtered_tokens": 0,
+            "stale_dropped": 0, "run_timeout": 0, "run_cancelled": 0,
+            "filtered_model_skip": 0, "filtered_neg_cache": 0,
+            "filtered_inflight": 0, "alias_merged": 0, "stop_dropped": 0
         }
+        # 여러 스레드(watchdog/워커)가 동시에 갱신 → 락 + 전역 레지스트리(/metrics)에 함께 반영
+        self._metrics_lock = threading.Lock()
+        self._overflow_depth = lambda: len(self._overflow)
+        QUEUE_DEPTH.labels(self.meeting_id).set_function(self._q.qsize)
+        OVERFLOW_DEPTH.labels(self.meeting_id).set_function(self._overflow_depth)
 
         # dedup in timestamp-group
         self._ts_lock = threading.Lock()
         self._last_ts = None
         self._seen_in_ts: set = set()
 
-        # result csv
-        self._write_lock = threading.Lock()
+        # in-flight coalescing: 큐/overflow/워커에 있는 (alias 키, 카테고리)
+        self._inflight_lock = threading.Lock()
+        self._inflight: set = set()
+
+        # result csv (행 추가는 log_writer group commit)
         ts = time.strftime("%Y%m%d_%H%M%S")
         self.explain_csv = os.path.join(AGENT_RESULTS_DIR, f"glossify_{ts}.csv")
         with open(self.explain_csv, "w", encoding="utf-8-sig", newline="") as f:
             csv.writer(f).writerow(["timestamp", "entity", "explanation", "domain"])
         _log_info(f"[ExplainLog] {self.explain_csv}")
 
+        # explain/skip 결정 로그 (skip 분류기 학습 데이터)
+        self.decisions_csv = None
+        if DECISION_LOG:
+            self.decisions_csv = os.path.join(AGENT_RESULTS_DIR, f"decisions_{ts}.csv")
+            with open(self.decisions_csv, "w", encoding="utf-8-sig", newline="") as f:
+                csv.writer(f).writerow(DECISION_HEADER)
+
+        # 에이전트가 거절한 용어 캐시 (프로세스 전역 공유)
+        self.neg_cache = get_negative_cache()
+        # 철자 변형 → 표준 키 (프로세스 전역 공유, 설명 결과로 학습)
+        self.aliases = get_alias_index()
+
+        # 사전 skip 분류기: 모델 파일이 있을 때만 사용
+        self.skip_model: Optional[SkipClassifier] = None
+        if SKIP_MODEL_PATH and os.path.exists(SKIP_MODEL_PATH):
+            try:
+                thr = float(SKIP_MODEL_THRESHOLD) if SKIP_MODEL_THRESHOLD else None
+                self.skip_model = SkipClassifier.load(SKIP_MODEL_PATH, threshold=thr)
+                _log_info(f"[SkipModel] {SKIP_MODEL_PATH} (threshold={self.skip_model.threshold})")
+            except Exception as e:
+                _log_warn(f"[SkipModel] load fail: {e}")
+
         # thread-local for Foundry Thread id
         self._tls = threading.local()
 
         # --- 기존 에이전트 상태 재사용 (ENV 우선) ---
-        state = _load_agent_state()
-        env_agent_id = (os.getenv("AGENT_ID") or "").strip()
-
-        if env_agent_id:
-            self.agent_id = env_agent_id
-            _log_info(f"🔁 Using existing agent from ENV AGENT_ID: {self.agent_id}")
-        elif state.get("agent_id"):
-            self.agent_id = state["agent_id"]
-            _log_info(f"🔁 Using existing agent from {AGENT_STATE_PATH}: {self.agent_id}")
+        self.agent_id, source = resolve_agent_id()
+        if self.agent_id:
+            _log_info(f"🔁 Using existing agent from {source}: {self.agent_id}")
+            self.foundry = get_foundry_client(self.project_endpoint, self.agent_id)
         else:
             # 여기서 바로 에러로 멈추게 해도 되고, _ensure_client_and_agent에서 한 번 더 체크해도 됨
             _log_err(
@@ -250,41 +558,41 @@ class AgentService:
             # 계속 진행하더라도 _ensure_client_and_agent에서 반드시 RuntimeError로 막힘
 
 
+    def _count(self, key: str, n: int = 1):
+        with self._metrics_lock:
+            self.metrics[key] = self.metrics.get(key, 0) + n
+        AGENT_EVENTS.labels(self.meeting_id, key).inc(n)
+
+    def metrics_snapshot(self) -> dict:
+        with self._metrics_lock:
+            return dict(self.metrics)
+
     # ---------- Azure Agent ----------
     def _ensure_client_and_agent(self):
         """기존 agent만 사용. 없거나 무효면 절대 생성하지 않고 에러."""
-        # 1) Client 준비
-        if not self.project_client:
-            self.cred = DefaultAzureCredential()
-            self.project_client = AIProjectClient(endpoint=self.project_endpoint, credential=self.cred)
-            _log_info("✅ AIProjectClient ready")
-
-        # 2) agent_id 필수
+        # 1) agent_id 필수
         if not self.agent_id:
             raise RuntimeError(
                 "Agent ID is required but missing. "
                 "Set AGENT_ID env or create foundry_agent.json with a valid 'agent_id'."
             )
 
-        # 3) (가볍게) 유효성 점검: SDK에 get_agent가 있으면 호출해봄
-        try:
-            if hasattr(self.project_client.agents, "get_agent"):
-                _ = self.project_client.agents.get_agent(self.agent_id)
-            _log_info(f"✅ Using existing Agent: {self.agent_id}")
-        except Exception as e:
-            # 절대 새로 만들지 않음
-            raise RuntimeError(
-                f"Configured AGENT_ID seems invalid or inaccessible: {self.agent_id} ({e})"
-            ) from e
+        # 2) 공유 Client (프로세스 전역 1개)
+        if self.project_client is None:
+            self.project_client = self.foundry.client()
+            self.cred = self.foundry.cred
+
+        # 3) 유효성: 검증 결과가 캐시돼 있으면 네트워크 호출 없음 (재검증은 foundry_client 관리 스레드)
+        self.foundry.ensure_agent()
 
 
     def _get_worker_thread_id(self) -> str:
         tid = getattr(self._tls, "thread_id", None)
         if tid: return tid
-        th = self.project_client.agents.threads.create()
-        self._tls.thread_id = th.id
-        _log_info(f"🧵 Worker {threading.current_thread().name} uses Thread: {th.id}")
-        return th.id
+        tid = self.foundry.acquire_thread()     # 부팅 때 만들어 둔 빈 Thread (없으면 바로 생성)
+        self._tls.thread_id = tid
+        _log_info(f"🧵 Worker {threading.current_thread().name} uses Thread: {tid}")
+        return tid
 
     def _get_last_agent_text(self, thread_id: str) -> Optional[str]:
         try:
@@ -309,33 +617,122 @@ class AgentService:
             pass
         return None
 
-    def _explain_with_agent(self, term: str, category: str, context: str) -> str:
+    def _cancel_run(self, thread_id: str, run_id: str, reset_thread: bool = True):
+        """deadline 초과 run을 원격에서 취소 (실패해도 무시)"""
+        try:
+            self.project_client.agents.runs.cancel(thread_id=thread_id, run_id=run_id)
+            self._count("run_cancelled")
+        except Exception as e:
+            _log_warn(f"[run-cancel] {run_id} cancel failed: {e}")
+        # 취소 중인 run이 남은 Thread에는 새 메시지를 넣을 수 없으므로 다음 호출은 새 Thread 사용
+        # (_tls는 워커 스레드별 → watchdog 스레드에서 부를 때는 호출한 워커가 직접 비움)
+        if reset_thread:
+            self._tls.thread_id = None
+
+    def _run_until(self, thread_id: str, deadline: float):
+        """run 생성 후 deadline(time.monotonic 기준)까지만 폴링. 초과 시 원격 run 취소."""
+        run = self.project_client.agents.runs.create(thread_id=thread_id, agent_id=self.agent_id)
+        while _status_str(run.status) not in _RUN_TERMINAL:
+            remain = deadline - time.monotonic()
+            if remain <= 0:
+                self._count("run_timeout")
+                self._cancel_run(thread_id, run.id)
+                raise TimeoutError("agent run timeout")
+            time.sleep(min(AGENT_RUN_POLL_SEC, remain))
+            run = self.project_client.agents.runs.get(thread_id=thread_id, run_id=run.id)
+        if _status_str(run.status) != _status_str(RunStatus.COMPLETED):
+            raise RuntimeError(f"agent run {_status_str(run.status)}: {getattr(run, 'last_error', None)}")
+        return run
+
+    def _stream_until(self, thread_id: str, deadline: float, emitter: _DeltaEmitter) -> str:
+        """
+        runs.stream으로 토큰을 받아 emitter로 흘려보내고 전체 텍스트 반환.
+        deadline 검사는 이벤트 도착에 의존하지 않음: watchdog 타이머가 마감 시각에 run을 취소하고
+        스트림을 닫아, 토큰이 멈춘 채 블로킹된 읽기도 깨운다.
+        """
+        parts: list[str] = []
+        run_ids: list[str] = []
+        expired = threading.Event()
+
+        with self.project_client.agents.runs.stream(thread_id=thread_id, agent_id=self.agent_id) as stream:
+            def _watchdog():
+                expired.set()
+                if run_ids:
+                    self._cancel_run(thread_id, run_ids[-1], reset_thread=False)
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+
+            timer = threading.Timer(max(0.0, deadline - time.monotonic()), _watchdog)
+            timer.daemon = True
+            timer.start()
+            try:
+                for event_type, event_data, _ in stream:
+                    if expired.is_set():
+                        break
+                    if isinstance(event_data, ThreadRun):
+                        run_ids.append(event_data.id)
+                        status = _status_str(event_data.status)
+                        if status in _RUN_TERMINAL and status != _status_str(RunStatus.COMPLETED):
+                            raise RuntimeError(f"agent run {status}: {getattr(event_data, 'last_error', None)}")
+                    elif isinstance(event_data, MessageDeltaChunk):
+                        text = event_data.text
+                        if text:
+                            parts.append(text)
+                            emitter.feed(text)
+                    elif event_type == AgentStreamEvent.ERROR:
+                        raise RuntimeError(f"agent stream error: {event_data}")
+                    elif event_type == AgentStreamEvent.DONE:
+                        break
+            except Exception:
+                if not expired.is_set():
+                    raise
+            finally:
+                timer.cancel()
+
+        if expired.is_set():
+            self._count("run_timeout")
+            self._tls.thread_id = None
+            raise TimeoutError("agent run timeout")
+        return "".join(parts).strip()
+
+    def _explain_with_agent(self, term: str, category: str, context: str,
+                            deadline: Optional[float] = None,
+                            emitter: Optional[_DeltaEmitter] = None) -> str:
+        """
+        deadline: time.monotonic() 기준 절대 마감(보통 task 신선도 한계). None이면 총 예산만 적용.
+        emitter: 주어지면 스트리밍 run으로 토큰을 중계.
+        """
         self._ensure_client_and_agent()
-        thread_id = self._get_worker_thread_id()
 
-        start_overall = time.time()
+        start_overall = time.monotonic()
+        overall_deadline = start_overall + AGENT_TOTAL_TIMEOUT_SEC
+        if deadline is not None:
+            overall_deadline = min(overall_deadline, deadline)
         attempt = 0
-        recreated_once = False
 
         while True:
             attempt += 1
             try:
-                remain = AGENT_TOTAL_TIMEOUT_SEC - (time.time() - start_overall)
-                if remain <= 0:
+                if overall_deadline - time.monotonic() <= 0:
                     raise TimeoutError("agent overall timeout")
 
+                thread_id = self._get_worker_thread_id()
                 self.project_client.agents.messages.create(
                     thread_id=thread_id, role="user",
                     content=f"term: {term};\ncategory: {category};\nsource_text: {context}"
                 )
-                t0 = time.time()
-                self.project_client.agents.runs.create_and_process(
-                    thread_id=thread_id, agent_id=self.agent_id
-                )
-                if (time.time() - t0) > AGENT_RUN_TIMEOUT_SEC:
-                    raise TimeoutError("agent run timeout")
-
-                text = self._get_last_agent_text(thread_id)
+                run_deadline = min(time.monotonic() + AGENT_RUN_TIMEOUT_SEC, overall_deadline)
+                with span("agent.run", attempt=attempt, thread_id=thread_id, streaming=emitter is not None):
+                    if emitter is not None:
+                        emitter.reset()
+                        text = self._stream_until(thread_id, run_deadline, emitter)
+                    else:
+                        self._run_until(thread_id, run_deadline)
+                        text = None
+                    if not text:
+                        text = self._get_last_agent_text(thread_id)
                 return (text or "__SKIP__").strip()
 
             except Exception as e:
@@ -349,24 +746,39 @@ class AgentService:
                     )
                     raise
 
-                # 그 외(네트워크/일시적 5xx 등)는 제한적 재시도
+                # 그 외(네트워크/일시적 5xx/run 타임아웃 등)는 남은 예산 안에서 제한적 재시도
                 if attempt >= AGENT_RETRY_MAX:
                     raise
                 backoff = AGENT_RETRY_BASE_SEC * (2 ** (attempt - 1)) * (1.0 + random.random()*0.2)
+                if time.monotonic() + backoff >= overall_deadline:
+                    raise
                 _log_warn(f"[Retry {attempt}/{AGENT_RETRY_MAX}] agent call failed: {e} → sleep {backoff:.2f}s")
                 time.sleep(backoff)
 
     # ---------- 결과 저장/전송 ----------
     def _append_explain_row(self, ts: str, ent: str, explanation: str, domain: str):
-        with self._write_lock:
-            with open(self.explain_csv, "a", encoding="utf-8-sig", newline="") as f:
-                csv.writer(f).writerow([ts, ent, explanation, domain])
-                f.flush()
+        write_rows(self.explain_csv, [[ts, ent, explanation, domain]])
+
+    def _append_decision_row(self, task: AgentTask, outcome: str, ctx: Optional[str] = None):
+        if not self.decisions_csv:
+            return
+        if ctx is None:
+            ctx = context_window(task.entity, task.source_text)
+        write_rows(self.decisions_csv, [[task.timestamp, task.category, task.entity,
+                                         task.confidence, ctx, outcome]])
 
-    def _post_term_to_server(self, ts: str, ent: str, domain: str, body: str):
+    def _post_term_to_server(self, ts: str, ent: str, domain: str, body: str,
+                             stream_id: Optional[str] = None, trace: str = ""):
         url = f"{self.backend_base_url}/meeting/{self.meeting_id}/terms"
         payload = {"timestamp": ts, "entity": ent, "domain": domain or "-", "body": body}
-        r = requests.post(url, json=payload, timeout=(HTTP_POST_CONNECT_TO, HTTP_POST_READ_TO))
+        if stream_id:
+            payload["stream_id"] = stream_id  # 앞서 보낸 terms_delta 조각을 이 최종본으로 교체
+        # 현재(agent.task) span을 부모로 서버의 브로드캐스트 span이 이어지도록 traceparent 전달
+        if self.term_sink is not None:
+            self.term_sink(payload, current_traceparent(trace))
+            return
+        headers = {"traceparent": current_traceparent(trace)}
+        r = requests.post(url, json=payload, headers=headers, timeout=(HTTP_POST_CONNECT_TO, HTTP_POST_READ_TO))
 
         if r.ok:
             _log_info(f"[Glossify] Term posted successfully: {payload}")
@@ -382,13 +794,10 @@ class AgentService:
             self._last_ts = None
             self._seen_in_ts.clear()
 
-    def _pass_filters(self, item: dict) -> bool:
-        ts, cat, ent, conf, src = (
-            item["timestamp"], item["category"], item["entity"],
-            float(item["confidence"]), (item["source_text"] or "")
-        )
+    def _pass_filters(self, task: AgentTask) -> bool:
+        ts, cat, ent, conf, src = task.timestamp, task.category, task.entity, task.confidence, task.source_text
         if not ent:
-            self.metrics["filtered_empty_ent"] += 1
+            self._count("filtered_empty_ent")
             return False
 
         if DEDUP_IN_TIMESTAMP:
@@ -396,17 +805,17 @@ class AgentService:
                 if ts != self._last_ts:
                     self._last_ts = ts
                     self._seen_in_ts.clear()
-                key = (cat, ent, src)
+                key = (cat, task.key or ent, task.utt_id or src)
                 if key in self._seen_in_ts:
-                    self.metrics["filtered_dup"] += 1
+                    self._count("filtered_dup")
                     return False
                 self._seen_in_ts.add(key)
 
         if cat not in ALLOWED_CATS:
-            self.metrics["filtered_cat"] += 1
+            self._count("filtered_cat")
             return False
         if conf < 0.5:
-            self.metrics["filtered_conf"] += 1
+            self._count("filtered_conf")
             return False
 
         toks = len(ent.replace('-', ' ').replace('/', ' ').split())
@@ -415,27 +824,68 @@ class AgentService:
                         (ent.isupper() and len(ent) <= 6) or \
                         (len(ent) <= ALLOW_ACRONYM_LEN_LE)
             if not allow_one:
-                self.metrics["filtered_tokens"] += 1
+                self._count("filtered_tokens")
                 return False
         return True
 
-    def _enqueue_if_pass(self, item: dict):
-        self.metrics["read"] += 1
-        if not self._pass_filters(item):
+    def _intern_source(self, task: AgentTask):
+        """
+        같은 발화의 엔티티가 연속으로 들어오므로 직전 source_text와 같으면 그 객체를 공유
+        (v1 로그/IPC item은 행마다 새 문자열 → overflow에 발화 전문이 엔티티 수만큼 복제되지 않도록)
+        경합 시 최악의 경우 공유만 안 될 뿐이라 락 없음
+        """
+        last = self._last_src
+        if task.source_text is not last and task.source_text == last:
+            task.source_text = last
+        else:
+            self._last_src = task.source_text
+
+    def _enqueue_if_pass(self, item):
+        """item: AgentTask(parse_csv_line) 또는 dict(server._publish_to_pool IPC) — 통과하면 그 task 객체를 그대로 적재"""
+        if self._closing.is_set():
             return
-        task = {
-            "timestamp": item["timestamp"],
-            "category": item["category"],
-            "entity": item["entity"],
-            "confidence": float(item["confidence"]),
-            "source_text": item["source_text"] or ""
-        }
+        self._count("read")
+        task = item if isinstance(item, AgentTask) else AgentTask.from_item(item)
+        self._intern_source(task)
+        task.key, merged_by = self.aliases.resolve_with_source(task.entity)
+        if merged_by:
+            self._count("alias_merged")
+        if not self._pass_filters(task):
+            return
+        # 이미 에이전트가 거절한 용어는 큐 슬롯을 차지하지 않음
+        if self.neg_cache.contains(task.key, task.category):
+            self._count("filtered_neg_cache")
+            return
+        if self.skip_model is not None:
+            ctx = context_window(task.entity, task.source_text)
+            if self.skip_model.should_skip(task.entity, task.category, task.confidence, ctx):
+                self._count("filtered_model_skip")
+                self._append_decision_row(task, OUTCOME_MODEL_SKIP, ctx)
+                return
+        if INFLIGHT_COALESCE:
+            with self._inflight_lock:
+                if (task.key, task.category) in self._inflight:
+                    self._count("filtered_inflight")
+                    return
+                self._inflight.add((task.key, task.category))
+        self.aliases.observe(task.key)
+        task.enq_at = time.monotonic()
         try:
             self._q.put_nowait(task)
-            self.metrics["enq"] += 1
+            self._count("enq")
         except queue.Full:
+            if len(self._overflow) == self._overflow.maxlen:
+                try:
+                    self._release_inflight(self._overflow[0])   # append가 밀어낼 가장 오래된 task
+                except IndexError:
+                    pass
             self._overflow.append(task)
-            self.metrics["overflow"] += 1
+            self._count("overflow")
+
+    def _release_inflight(self, task: AgentTask):
+        if INFLIGHT_COALESCE:
+            with self._inflight_lock:
+                self._inflight.discard((task.key, task.category))
 
     def _refeed_overflow(self):
         n = 0
@@ -443,7 +893,7 @@ class AgentService:
             try:
                 self._q.put_nowait(self._overflow.popleft())
                 n += 1
-                self.metrics["enq"] += 1
+                self._count("enq")
             except queue.Full:
                 break
 
@@ -479,6 +929,7 @@ class AgentService:
             self.pattern = pattern
             self.active_path = newest_csv(self.dir)
             self.f = None
+            self.utterances = UtteranceCache()   # 파일별 (v2 U 행)
             if self.active_path:
                 self._open_active(self.active_path)
 
@@ -489,6 +940,7 @@ class AgentService:
             self.active_path = path
             self.f = open(self.active_path, "r", encoding="utf-8-sig", newline="")
             self.f.readline()  # skip header
+            self.utterances.clear()
             if not START_FROM_BEGINNING:
                 self.f.seek(0, os.SEEK_END)
             _log_info(f"[Watcher] Active → {path} (from_beginning={START_FROM_BEGINNING})")
@@ -508,7 +960,7 @@ class AgentService:
                 if line is None:
                     self.f.seek(pos)
                     break
-                item = parse_csv_line(line)
+                item = parse_csv_line(line, self.utterances)
                 if not item: 
                     continue
                 self.svc._enqueue_if_pass(item)
@@ -526,6 +978,79 @@ class AgentService:
                 self._drain()
 
     # ---------- 워커 ----------
+    def _process_task(self, idx: int, item: AgentTask, trace: str = ""):
+        """큐에서 꺼낸 task 1건: 신선도 확인 → 에이전트 → 전송/저장. (agent.task span 안에서 실행)"""
+        ts  = item.timestamp
+        cat = item.category
+        ent = item.entity
+        # 프롬프트에는 발화 전체 대신 엔티티 주변 문장만 (토큰/지연이 발화 길이에 비례하지 않도록)
+        ctx = entity_context(item.source_text, ent, item.offset, item.length)
+        tid = trace_id_of(trace)[:8]
+
+        QUEUE_WAIT.labels(self.meeting_id).observe(time.monotonic() - item.enq_at)
+
+        # 신선도: 너무 오래 대기한 task는 에이전트 호출 없이 폐기
+        deadline = None
+        if self.freshness_sec > 0:
+            deadline = item.enq_at + self.freshness_sec
+            if time.monotonic() >= deadline:
+                self._count("stale_dropped")
+                _log_info(f"STALE [{idx}] {ent} (waited {time.monotonic() - item.enq_at:.1f}s) trace={tid}")
+                return
+
+        emitter = stream_id = None
+        if self.streaming:
+            stream_id = uuid.uuid4().hex[:16]
+            emitter = _DeltaEmitter(self.delta_sink, {
+                "type": "terms_delta", "meeting_id": self.meeting_id,
+                "stream_id": stream_id, "timestamp": ts, "entity": ent,
+            })
+
+        t_run = time.perf_counter()
+        try:
+            raw = self._explain_with_agent(ent, cat, ctx, deadline=deadline, emitter=emitter)
+        except Exception:
+            AGENT_RUN_LATENCY.labels(self.meeting_id, "error").observe(time.perf_counter() - t_run)
+            if emitter: emitter.finish(error=True)
+            raise
+        AGENT_RUN_LATENCY.labels(self.meeting_id, "skip" if raw == "__SKIP__" else "ok") \
+            .observe(time.perf_counter() - t_run)
+        if raw == "__SKIP__":
+            _log_info(f"SKIP  [{idx}] {ent} trace={tid}")
+            if emitter: emitter.finish(skipped=True)
+            self._append_decision_row(item, OUTCOME_SKIP)
+            self.neg_cache.add(item.key or ent, cat)
+            return
+
+        domain, body = split_domain_and_body(raw)
+        if not body:
+            _log_info(f"SKIP  [{idx}] {ent} (no body, domain='{domain or '-'}') trace={tid}")
+            if emitter: emitter.finish(skipped=True)
+            self._append_decision_row(item, OUTCOME_SKIP)
+            self.neg_cache.add(item.key or ent, cat)
+            return
+        self._append_decision_row(item, OUTCOME_EXPLAIN)
+        if emitter: emitter.finish()
+        # 에이전트가 표준 표기로 정규화한 본문 주어 → 이후 같은 변형은 그 키로 합쳐짐
+        learned = self.aliases.learn(ent, body, cat)
+        if learned:
+            _log_info(f"ALIAS [{idx}] {ent} → {learned} trace={tid}")
+
+        # 프론트로 전달 (REST) — 최종 terms 이벤트에 파싱된 domain/body
+        t_post = time.perf_counter()
+        try:
+            self._post_term_to_server(ts, ent, domain or "-", body, stream_id=stream_id, trace=trace)
+            DELIVERY_LATENCY.labels(self.meeting_id, "ok").observe(time.perf_counter() - t_post)
+        except Exception as e:
+            DELIVERY_LATENCY.labels(self.meeting_id, "error").observe(time.perf_counter() - t_post)
+            _log_warn(f"[POST terms] fail: {e}")
+
+        # 저장(마지막 문맥문장 제거본)
+        cosmos_body, removed = drop_trailing_context_sentence(body)
+        preview = (cosmos_body[:60] + "…") if len(cosmos_body) > 60 else cosmos_body
+        _log_info(f"WRITE [{idx}] {ent} (domain={domain or '-'}, ctx-removed={removed}) trace={tid} → {preview}")
+        self._append_explain_row(ts, ent, cosmos_body, domain)
+
     def _worker_loop(self, idx: int):
         # ensure per-worker Foundry Thread
         self._ensure_client_and_agent()
@@ -541,99 +1066,152 @@ class AgentService:
                 continue
 
             try:
-                ts  = item["timestamp"]
-                cat = item["category"]
-                ent = item["entity"]
-                src = item["source_text"]
-
-                raw = self._explain_with_agent(ent, cat, src)
-                if raw == "__SKIP__":
-                    _log_info(f"SKIP  [{idx}] {ent}")
-                    continue
-
-                domain, body = split_domain_and_body(raw)
-                if not body:
-                    _log_info(f"SKIP  [{idx}] {ent} (no body, domain='{domain or '-'}')")
-                    continue
-
-                # 프론트로 전달 (REST)
-                try:
-                    self._post_term_to_server(ts, ent, domain or "-", body)
-                except Exception as e:
-                    _log_warn(f"[POST terms] fail: {e}")
-
-                # 저장(마지막 문맥문장 제거본)
-                cosmos_body, removed = drop_trailing_context_sentence(body)
-                preview = (cosmos_body[:60] + "…") if len(cosmos_body) > 60 else cosmos_body
-                _log_info(f"WRITE [{idx}] {ent} (domain={domain or '-'}, ctx-removed={removed}) → {preview}")
-                self._append_explain_row(ts, ent, cosmos_body, domain)
-
+                trace = item.trace
+                with span("agent.task", parent=trace, meeting=self.meeting_id,
+                          entity=item.entity, category=item.category, worker=idx):
+                    self._process_task(idx, item, trace)
             except Exception as e:
-                _log_err(f"ERR   [worker {idx}] {e}")
+                _log_err(f"ERR   [worker {idx}] {e} trace={trace_id_of(trace)[:8]}")
             finally:
+                self._release_inflight(item)
                 self._q.task_done()
                 if self._q.qsize() < max(1, MAX_QUEUE//2) and self._overflow:
                     self._refeed_overflow()
 
     # ---------- 시작/정지 ----------
-    def start(self):
-        """watchdog + workers 시작 (동일 프로세스 내 백그라운드 실행)"""
-        if self._observer:
+    def start(self, watch: bool = True):
+        """
+        watchdog + workers 시작 (동일 프로세스 내 백그라운드 실행)
+        watch=False: CSV tail 없이 워커만 (task는 _enqueue_if_pass로 직접 투입 — agent_pool 워커 프로세스)
+        """
+        if self._workers:
             return
 
         # 워커
         for i in range(MAX_WORKERS):
-            t = threading.Thread(target=self._worker_loop, args=(i+1,), name=f"worker-{i+1}", daemon=True)
+            t = threading.Thread(target=self._worker_loop, args=(i+1,),
+                                 name=f"worker-{self.meeting_id}-{i+1}", daemon=True)
             t.start()
             self._workers.append(t)
         _log_info(f"🚀 Workers: {MAX_WORKERS} (queue max={MAX_QUEUE})")
 
         # tail
-        handler = self._CsvTailHandler(self, NER_RESULTS_DIR, pattern="ner_entities_")
-        self._observer = Observer()
-        self._observer.schedule(handler, NER_RESULTS_DIR, recursive=False)
-        self._observer.start()
-        _log_info(f"[Glossify] Watching: {NER_RESULTS_DIR}")
+        if watch:
+            handler = self._CsvTailHandler(self, NER_RESULTS_DIR, pattern="ner_entities_")
+            self._observer = _make_observer()
+            self._observer.schedule(handler, NER_RESULTS_DIR, recursive=False)
+            self._observer.start()
+            _log_info(f"[Glossify] Watching: {NER_RESULTS_DIR}")
 
         # 메트릭 루프(백그라운드)
-        threading.Thread(target=self._metrics_loop, name="metrics", daemon=True).start()
+        self._metrics_thread = threading.Thread(target=self._metrics_loop,
+                                                name=f"metrics-{self.meeting_id}", daemon=True)
+        self._metrics_thread.start()
+
+    def threads(self) -> list:
+        """이 서비스가 띄운 스레드 (워커 + watchdog + 메트릭) — /debug/threads 용"""
+        out = list(self._workers)
+        if self._observer is not None:
+            out.append(self._observer)
+        if getattr(self, "_metrics_thread", None) is not None:
+            out.append(self._metrics_thread)
+        return out
 
     def _metrics_loop(self):
-        last = time.time()
+        last = last_save = time.time()
         while not self._stop_event.is_set():
             time.sleep(0.2)
             if time.time() - last >= 2.0:
+                m = self.metrics_snapshot()
                 _log_info(
-                    f"[METRICS] read={self.metrics['read']} enq={self.metrics['enq']} "
-                    f"overflow={self.metrics['overflow']} qsize={self._q.qsize()} of={len(self._overflow)} "
-                    f"filtered(cat={self.metrics['filtered_cat']}, conf={self.metrics['filtered_conf']}, "
-                    f"tokens={self.metrics['filtered_tokens']}, dup={self.metrics['filtered_dup']}, "
-                    f"empty={self.metrics['filtered_empty_ent']})"
+                    f"[METRICS] read={m['read']} enq={m['enq']} "
+                    f"overflow={m['overflow']} qsize={self._q.qsize()} of={len(self._overflow)} "
+                    f"filtered(cat={m['filtered_cat']}, conf={m['filtered_conf']}, "
+                    f"tokens={m['filtered_tokens']}, dup={m['filtered_dup']}, "
+                    f"empty={m['filtered_empty_ent']}, model={m['filtered_model_skip']}) "
+                    f"stale={m['stale_dropped']} run_timeout={m['run_timeout']} "
+                    f"run_cancelled={m['run_cancelled']} "
+                    f"neg_cache(hit={m['filtered_neg_cache']}, "
+                    f"rate={self.neg_cache.hit_rate():.2%}, size={self.neg_cache.stats()['size']}) "
+                    f"alias_merged={m['alias_merged']} inflight_coalesced={m['filtered_inflight']}"
                 )
                 last = time.time()
-
-    def stop(self):
-        self._stop_event.set()
-        if self._observer:
-            self._observer.stop()
-            self._observer.join()
-            self._observer = None
-        # 큐 drain 기다림
+                if time.time() - last_save >= 30.0:
+                    self.neg_cache.save()
+                    self.aliases.save()
+                    last_save = time.time()
+
+    def stop(self, timeout: float = AGENT_STOP_DRAIN_SEC) -> int:
+        """
+        새 task 거부 → 큐/overflow를 최대 timeout초 처리 → 워커 정지, 남은 task는 버림(task_done 처리).
+        항상 유한 시간 안에 반환 (워커가 에이전트 호출 중이면 그 호출은 daemon 스레드에서 마저 끝남).
+        반환: 버린 task 수
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        dropped = 0
         try:
-            self._q.join()
-        except Exception:
-            pass
+            self._closing.set()
+            if self._observer:
+                self._observer.stop()
+                self._observer.join(max(0.1, deadline - time.monotonic()))
+                self._observer = None
+            # 남은 task drain (워커가 살아 있을 때만 의미 있음)
+            while (self._q.unfinished_tasks or self._overflow) and time.monotonic() < deadline \
+                    and any(t.is_alive() for t in self._workers):
+                time.sleep(0.05)
+            self._stop_event.set()
+            dropped = self._cancel_pending()
+            for t in self._workers:
+                t.join(max(0.0, deadline - time.monotonic()))
+            if dropped:
+                self._count("stop_dropped", dropped)
+                _log_warn(f"[stop] {self.meeting_id}: {dropped} queued task(s) dropped after {timeout:.0f}s drain")
+        finally:
+            self._stop_event.set()
+            # scrape 클로저가 정지한 서비스를 붙잡지 않도록 (같은 meeting의 새 서비스가 등록한 gauge는 유지)
+            QUEUE_DEPTH.remove_function(self._q.qsize, self.meeting_id)
+            OVERFLOW_DEPTH.remove_function(self._overflow_depth, self.meeting_id)
+            flush_logs()   # 설명 CSV를 읽는 쪽(Cosmos upsert)이 마지막 행까지 보도록
+            self.neg_cache.save()
+            self.aliases.save()
+        return dropped
+
+    def _cancel_pending(self) -> int:
+        """stop 이후 남은 overflow/큐 task 폐기 (큐는 task_done까지 → join 대기자가 걸리지 않게)"""
+        n = 0
+        while self._overflow:
+            try:
+                self._release_inflight(self._overflow.popleft())
+                n += 1
+            except IndexError:
+                break
+        while True:
+            try:
+                task = self._q.get_nowait()
+            except queue.Empty:
+                break
+            self._release_inflight(task)
+            self._q.task_done()
+            n += 1
+        return n
 
 # 편의 함수: 서버에서 쉽게 호출
-def start_agent_in_background(meeting_id: Optional[str] = None) -> AgentService:
+def start_agent_in_background(meeting_id: Optional[str] = None,
+                              freshness_sec: Optional[float] = None,
+                              delta_sink: Optional[Callable[[dict], None]] = None,
+                              term_sink: Optional[Callable[[dict, str], None]] = None,
+                              watch: bool = True) -> AgentService:
     svc = AgentService(
         project_endpoint=PROJECT_ENDPOINT,
         model_deployment=MODEL_DEPLOYMENT_NAME,
         backend_base_url=BACKEND_BASE_URL,
-        meeting_id=meeting_id or MEETING_ID
+        meeting_id=meeting_id or MEETING_ID,
+        freshness_sec=freshness_sec,
+        delta_sink=delta_sink,
+        term_sink=term_sink,
     )
     print(f"[Glossify] Starting agent (backend_base_url={BACKEND_BASE_URL}, meeting_id={meeting_id})")
-    svc.start()
+    svc.start(watch=watch)
     return svc
 
 if __name__ == "__main__":
@@ -13,6 +13,11 @@ def connect():
 def on_terms(data):
     print("[WS][terms]", data)
 
+@sio.on("terms_delta")
+def on_terms_delta(data):
+    print("[WS][terms_delta]", data.get("entity"), repr(data.get("delta")),
+          "(done)" if data.get("done") else "")
+
 @sio.on("ack")
 def on_ack(data):
     print("[WS][ack]", data)
@@ -0,0 +1,185 @@
+# log_writer.py
+# 공용 로그 writer: NER/STT 로그, glossify 설명 CSV를 백그라운드 스레드 1개가 group commit
+# - 생산자(요청/에이전트 워커 스레드)는 포맷한 문자열을 버퍼에 넣고 바로 반환 (파일 I/O·전역 락 대기 없음)
+# - writer 스레드: 파일 핸들을 열어 둔 채, 모인 항목을 파일별로 이어 붙여 write 1회 + flush
+#     LOG_FLUSH_MS(기본 50ms): 첫 항목 이후 최대 대기, LOG_FLUSH_BYTES(기본 256KB) 넘으면 즉시 commit
+#     LOG_FSYNC: off(기본, OS 캐시까지) | interval(LOG_FSYNC_SEC마다) | always(commit마다)
+#     LOG_IDLE_CLOSE_SEC 동안 쓰지 않은 파일 핸들은 닫음 (회의별 CSV 누적 방지)
+# - flush(): 지금까지 들어온 항목이 파일에 쓰일 때까지 대기 (CSV를 읽기 전: Cosmos upsert 등)
+# - 종료 시 atexit로 남은 항목 commit 후 핸들 닫음
+# - LOG_GROUP_COMMIT=0: 호출 스레드에서 바로 open/write/close (기존 방식)
+# gevent patch 상태에선 commit(파일 write/fsync)을 gevent_mode.run_blocking으로 네이티브 스레드풀에 위임
+
+import io
+import os
+import csv
+import time
+import atexit
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import gevent_mode
+
+LOG_GROUP_COMMIT   = (os.getenv("LOG_GROUP_COMMIT") or "1").lower() in {"1", "true", "y"}
+LOG_FLUSH_MS       = float(os.getenv("LOG_FLUSH_MS", "50"))
+LOG_FLUSH_BYTES    = int(os.getenv("LOG_FLUSH_BYTES", str(256 * 1024)))
+LOG_FSYNC          = (os.getenv("LOG_FSYNC") or "off").strip().lower()     # off | interval | always
+LOG_FSYNC_SEC      = float(os.getenv("LOG_FSYNC_SEC", "1.0"))
+LOG_IDLE_CLOSE_SEC = float(os.getenv("LOG_IDLE_CLOSE_SEC", "60"))
+
+
+class LogWriter:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._buf: List[Tuple[str, str, str]] = []     # (path, encoding, data)
+        self._bytes = 0
+        self._first_at = 0.0
+        self._seq = 0           # 접수한 항목 수
+        self._done = 0          # 파일에 쓴 항목 수
+        self._flush_req = False
+        self._closing = False
+        self._thread = None
+        # writer 스레드 전용 (락 불필요)
+        self._files: Dict[str, object] = {}
+        self._last_used: Dict[str, float] = {}
+        self._dirty: set = set()
+        self._last_fsync = time.monotonic()
+        # LOG_GROUP_COMMIT=0 경로
+        self._sync_locks: Dict[str, threading.Lock] = {}
+        self._sync_guard = threading.Lock()
+
+    # ---------- 생산자 ----------
+    def write(self, path: str, data: str, encoding: str = "utf-8"):
+        if not data:
+            return
+        if not LOG_GROUP_COMMIT or self._closing:
+            self._write_now(path, data, encoding)
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+            if not self._buf:
+                self._first_at = time.monotonic()
+            self._buf.append((path, encoding, data))
+            self._bytes += len(data)
+            self._seq += 1
+            if len(self._buf) == 1 or self._bytes >= LOG_FLUSH_BYTES:
+                self._cond.notify()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """지금까지 write()한 항목이 파일에 쓰일 때까지 대기"""
+        with self._cond:
+            if self._thread is None or self._done >= self._seq:
+                return True
+            target = self._seq
+            self._flush_req = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+
+    def close(self, timeout: float = 5.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _write_now(self, path: str, data: str, encoding: str):
+        with self._sync_guard:
+            lock = self._sync_locks.setdefault(path, threading.Lock())
+        with lock:
+            with open(path, "a", encoding=encoding, newline="") as f:
+                f.write(data)
+
+    # ---------- writer 스레드 ----------
+    def _run(self):
+        flush_s = LOG_FLUSH_MS / 1000.0
+        while True:
+            with self._cond:
+                if not self._buf and not self._closing:
+                    self._cond.wait(timeout=1.0)
+                # group commit: 첫 항목 후 flush_s 까지 더 모음 (크기 초과/flush 요청/종료 시 즉시)
+                while self._buf and not (self._closing or self._flush_req or self._bytes >= LOG_FLUSH_BYTES):
+                    remaining = self._first_at + flush_s - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._buf = self._buf, []
+                self._bytes = 0
+                self._flush_req = False
+                upto = self._seq
+                closing = self._closing
+            if not batch and not closing and not self._last_used:
+                continue
+            try:
+                gevent_mode.run_blocking(self._commit, batch, closing)
+            except Exception as e:
+                print(f"[log-writer] commit error: {e}")
+            with self._cond:
+                self._done = upto
+                self._cond.notify_all()
+            if closing:
+                return
+
+    def _commit(self, batch: Iterable[Tuple[str, str, str]], closing: bool = False):
+        grouped: Dict[Tuple[str, str], List[str]] = {}
+        for path, enc, data in batch:
+            grouped.setdefault((path, enc), []).append(data)
+        now = time.monotonic()
+        for (path, enc), parts in grouped.items():
+            try:
+                f = self._files.get(path)
+                if f is None:
+                    f = self._files[path] = open(path, "a", encoding=enc, newline="")
+                f.write("".join(parts))
+                f.flush()
+                self._last_used[path] = now
+                if LOG_FSYNC == "always":
+                    os.fsync(f.fileno())
+                else:
+                    self._dirty.add(path)
+            except OSError as e:
+                print(f"[log-writer] {path}: {e}")
+                self._close_file(path)
+        if LOG_FSYNC == "interval" and (closing or now - self._last_fsync >= LOG_FSYNC_SEC):
+            for path in list(self._dirty):
+                f = self._files.get(path)
+                if f is not None:
+                    try:
+                        os.fsync(f.fileno())
+                    except OSError as e:
+                        print(f"[log-writer] fsync {path}: {e}")
+            self._dirty.clear()
+            self._last_fsync = now
+        for path in [p for p, t in self._last_used.items() if closing or now - t >= LOG_IDLE_CLOSE_SEC]:
+            self._close_file(path)
+
+    def _close_file(self, path: str):
+        f = self._files.pop(path, None)
+        self._last_used.pop(path, None)
+        self._dirty.discard(path)
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+
+
+WRITER = LogWriter()
+atexit.register(WRITER.close)
+
+
+def write_text(path: str, data: str, encoding: str = "utf-8"):
+    WRITER.write(path, data, encoding)
+
+
+def write_rows(path: str, rows: Iterable[list], encoding: str = "utf-8-sig"):
+    """CSV 행을 호출 스레드에서 포맷해 writer에 넘김 (utf-8-sig BOM은 파일 생성 시점에만 기록됨)"""
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    WRITER.write(path, buf.getvalue(), encoding)
+
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    return WRITER.flush(timeout)
@@ -0,0 +1,294 @@
+# metrics_registry.py
+# 프로세스 전역 메트릭 레지스트리 (thread-safe) + Prometheus text exposition
+# - Counter / Gauge / Histogram, 라벨 지원 (meeting 등)
+# - server.py의 GET /metrics 가 REGISTRY.render() 결과를 그대로 반환
+# - 끝난 meeting의 시계열은 remove_meeting_metrics()로 삭제 (라벨이 무한히 쌓이지 않도록)
+# - 외부 의존성 없음 (prometheus_client 미사용)
+
+import abc
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0)
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_str(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric(abc.ABC):
+    """라벨별 child 관리 + 공통 렌더링. 하위 클래스는 child 생성/child 1개 렌더링만 구현"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """라벨 조합 1개의 값 보관 객체"""
+
+    @abc.abstractmethod
+    def _render_child(self, key: Tuple[str, ...], child) -> List[str]:
+        """child 1개 → exposition 줄 목록"""
+
+    def labels(self, *values, **kw):
+        if kw:
+            values = tuple(kw[n] for n in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {key}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def remove_matching(self, label: str, value) -> int:
+        """라벨 label == value 인 child 전부 삭제 (나머지 라벨 값과 무관). 반환: 삭제 수"""
+        if label not in self.labelnames:
+            return 0
+        i, value = self.labelnames.index(label), str(value)
+        with self._lock:
+            keys = [k for k in self._children if k[i] == value]
+            for k in keys:
+                del self._children[k]
+        return len(keys)
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._items():
+            out.extend(self._render_child(key, child))
+        return out
+
+
+# ---------------- Counter ----------------
+class _CounterChild:
+    __slots__ = ("_v", "_lock")
+
+    def __init__(self):
+        self._v = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1.0):
+        with self._lock:
+            self._v += n
+
+    def get(self) -> float:
+        return self._v
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _render_child(self, key, child):
+        return [f"{self.name}_total{_label_str(self.labelnames, key)} {_fmt(child.get())}"]
+
+
+# ---------------- Gauge ----------------
+class _GaugeChild:
+    __slots__ = ("_v", "_fn", "_lock")
+
+    def __init__(self):
+        self._v = 0.0
+        self._fn: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, v: float):
+        with self._lock:
+            self._v = float(v)
+
+    def inc(self, n: float = 1.0):
+        with self._lock:
+            self._v += n
+
+    def dec(self, n: float = 1.0):
+        with self._lock:
+            self._v -= n
+
+    def set_function(self, fn: Callable[[], float]):
+        """scrape 시점에 값을 읽어옴 (예: queue.qsize)"""
+        self._fn = fn
+
+    def get(self) -> float:
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return math.nan
+        return self._v
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def remove_function(self, fn: Callable[[], float], *values):
+        """set_function(fn)로 등록된 child만 삭제 (같은 라벨을 다른 소유자가 다시 등록했으면 유지)"""
+        key = tuple(str(v) for v in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is not None and child._fn == fn:
+                del self._children[key]
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_label_str(self.labelnames, key)} {_fmt(child.get())}"]
+
+
+# ---------------- Histogram ----------------
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * len(bounds)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, v: float):
+        with self._lock:
+            for i, b in enumerate(self._bounds):
+                if v <= b:
+                    self._counts[i] += 1
+                    break
+            self._sum += v
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, key, child):
+        counts, total, n = child.snapshot()
+        out, acc = [], 0
+        for b, c in zip(self.buckets, counts):
+            acc += c
+            le = 'le="%s"' % _fmt(b)
+            out.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {acc}")
+        out.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {_fmt(total)}")
+        out.append(f"{self.name}_count{_label_str(self.labelnames, key)} {n}")
+        return out
+
+
+# ---------------- Registry ----------------
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing   # 모듈 재import 시 중복 등록 방지
+            self._metrics[metric.name] = metric
+            return metric
+
+    def remove_label(self, label: str, value) -> int:
+        """모든 메트릭에서 라벨 label == value 인 시계열 삭제"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return sum(m.remove_matching(label, value) for m in metrics)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def remove_meeting_metrics(meeting_id: str) -> int:
+    """meeting 종료/이관 시 해당 meeting 라벨의 시계열 전부 삭제"""
+    return REGISTRY.remove_label("meeting", meeting_id)
+
+def counter(name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+def gauge(name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames))
+
+def histogram(name: str, help: str, labelnames: Iterable[str] = (),
+              buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+# ---------------- Glossify 파이프라인 메트릭 ----------------
+STT_REQUESTS      = counter("glossify_stt_requests", "STT requests received", ("meeting", "kind"))
+STT_DUPLICATES    = counter("glossify_stt_duplicates", "STT items answered without NER (seq retransmit, stale seq, repeated final text)", ("meeting", "reason"))
+NER_LATENCY       = histogram("glossify_ner_latency_seconds", "Azure Language NER call latency", ("meeting", "outcome"))
+QUEUE_WAIT        = histogram("glossify_queue_wait_seconds", "Time a task waited in the agent work queue", ("meeting",))
+AGENT_RUN_LATENCY = histogram("glossify_agent_run_latency_seconds", "Agent explanation latency incl. retries", ("meeting", "outcome"))
+DELIVERY_LATENCY  = histogram("glossify_delivery_latency_seconds", "Agent → server /terms POST latency", ("meeting", "outcome"))
+E2E_LATENCY       = histogram("glossify_stt_to_broadcast_seconds", "STT timestamp → WebSocket broadcast latency", ("meeting",),
+                              buckets=(0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0, 120.0))
+AGENT_EVENTS      = counter("glossify_agent_events", "AgentService pipeline events (filters, enqueue, timeouts, ...)", ("meeting", "event"))
+QUEUE_DEPTH       = gauge("glossify_queue_depth", "Agent work queue size", ("meeting",))
+OVERFLOW_DEPTH    = gauge("glossify_overflow_depth", "Agent overflow deque size", ("meeting",))
+BROADCASTS        = counter("glossify_ws_broadcasts", "WebSocket term broadcasts", ("meeting", "outcome"))
+WS_BATCH_ITEMS    = histogram("glossify_ws_batch_items", "Terms coalesced into one WebSocket 'terms' event", ("meeting",),
+                              buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55))
+WS_LAGGARD_SKIPS  = counter("glossify_ws_laggard_skips", "Events not sent to a client whose outbound buffer is over the cap", ("meeting",))
+WS_LAGGARD_KICKS  = counter("glossify_ws_laggard_disconnects", "Clients disconnected for a persistently full outbound buffer", ("meeting",))
+HUB_LAG           = histogram("glossify_hub_lag_seconds", "gevent hub scheduling delay measured by a heartbeat greenlet",
+                              buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+HUB_BLOCKED       = counter("glossify_hub_blocked", "Times the gevent hub was blocked longer than GEVENT_BLOCK_WARN_MS")
+AGENT_POOL_ALIVE  = gauge("glossify_agent_pool_alive", "Agent pool worker process is alive (1/0)", ("worker",))
+AGENT_POOL_RESTARTS = counter("glossify_agent_pool_restarts", "Agent pool worker restarts (exit or missed heartbeats)", ("worker",))
+BREAKER_STATE     = gauge("glossify_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("name",))
+JOURNAL_DEPTH     = gauge("glossify_retry_journal_depth", "Records waiting in the retry journal", ("name",))
+NER_DEFERRED      = counter("glossify_ner_deferred", "STT texts journaled during an NER outage / replayed later", ("meeting", "outcome"))
+FOUNDRY_EVENTS    = counter("glossify_foundry_events", "Shared Foundry client events (validate, revalidate, token_refresh, thread_warm/cold)", ("event",))
+FOUNDRY_POOL_DEPTH = gauge("glossify_foundry_thread_pool", "Pre-created Foundry threads waiting in the warm pool")
@@ -1,11 +1,13 @@
 # ner_core.py
-import os, csv
+import os, re, csv, socket, itertools
 from datetime import datetime
-from threading import Lock
 from collections import defaultdict
 from dotenv import load_dotenv
 import requests
 
+from ner_resilience import CircuitBreaker, RetryJournal
+from log_writer import write_rows, write_text
+
 # -----------------------------
 # 0) 환경 & 경로
 # -----------------------------
@@ -14,20 +16,69 @@ load_dotenv()
 
 language_key      = os.getenv("LANGUAGE_KEY")
 language_endpoint = os.getenv("LANGUAGE_ENDPOINT")
-if not all([language_key, language_endpoint]):
-    raise RuntimeError("환경 변수를 확인하세요: LANGUAGE_KEY, LANGUAGE_ENDPOINT")
+
+
+def check_ner_config():
+    """필수 설정 확인. import 시점이 아니라 서버 app factory(기동)에서 호출 → 도구/벤치는 키 없이 import 가능"""
+    if not all([language_key, language_endpoint]):
+        raise RuntimeError("환경 변수를 확인하세요: LANGUAGE_KEY, LANGUAGE_ENDPOINT")
+
 
 LOG_FORMAT = (os.getenv("NER_LOG_FORMAT") or "csv").strip().lower()  # csv | txt
+# csv 스키마: v2 = 발화(U) 1행 + 엔티티(E) 행은 utt_id/offset만 참조, v1 = 엔티티 행마다 source_text (기존)
+NER_LOG_SCHEMA = (os.getenv("NER_LOG_SCHEMA") or "v2").strip().lower()
 
-stt_results_dir = os.path.join(script_dir, "stt_results")
-ner_results_dir = os.path.join(script_dir, "ner_results")
+# 멀티 프로세스 배포 시 프로세스별 디렉토리 지정 가능 (glossify_agent도 NER_RESULTS_DIR를 tail)
+stt_results_dir = os.getenv("STT_RESULTS_DIR", os.path.join(script_dir, "stt_results"))
+ner_results_dir = os.getenv("NER_RESULTS_DIR", os.path.join(script_dir, "ner_results"))
 os.makedirs(stt_results_dir, exist_ok=True)
 os.makedirs(ner_results_dir, exist_ok=True)
 
 NER_LOG_PATH = None
 STT_LOG_PATH = None
-NER_LOG_LOCK = Lock()
-STT_LOG_LOCK = Lock()
+
+# analyze-text 동기 NER 요청당 최대 문서 수 (서비스 한도 5)
+NER_BATCH_DOCS = max(1, min(5, int(os.getenv("NER_BATCH_DOCS", "5"))))
+
+NER_TIMEOUT_SEC = float(os.getenv("NER_TIMEOUT_SEC", "15"))
+
+# 엔드포인트 장애 시 빠른 실패 + NER 못 한 문장 재처리 저널 (ner_resilience.py)
+NER_BREAKER = CircuitBreaker("ner")
+# 저널은 프로세스별 파일: 여러 워커가 NER_RESULTS_DIR를 공유해도 offset/비우기가 서로 엇갈리지 않게
+# WORKER_URL(= meeting 소유자 ID, 재기동해도 동일)로 구분 → 재시작 후 같은 워커가 이어서 재처리
+def _journal_name(worker_id: str) -> str:
+    return os.path.join(ner_results_dir,
+                        f"ner_retry_journal.{re.sub(r'[^A-Za-z0-9]+', '_', worker_id).strip('_')}.jsonl")
+
+_JOURNAL_LOCK = None   # 기본 이름 저널의 소유 잠금 (프로세스 수명 동안 유지)
+
+def _default_journal_path() -> str:
+    """
+    WORKER_URL 미설정: 기본 ID(BACKEND_BASE_URL/localhost)는 같은 호스트의 모든 프로세스가 같음
+    → 기본 이름 파일은 잠금(flock)을 잡은 프로세스 1개가 쓰고(재시작 후 이어서 재처리),
+      나머지 프로세스는 hostname-pid 접미사 파일 사용
+    """
+    global _JOURNAL_LOCK
+    base_id = (os.getenv("BACKEND_BASE_URL") or "http://localhost:5000").rstrip("/")
+    path = _journal_name(base_id)
+    try:
+        import fcntl
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock = open(path + ".lock", "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            _JOURNAL_LOCK = lock
+            return path
+        except OSError:
+            lock.close()
+    except (ImportError, OSError):
+        pass
+    return _journal_name(f"{base_id}.{socket.gethostname()}-{os.getpid()}")
+
+NER_JOURNAL_PATH = (os.getenv("NER_JOURNAL_PATH")
+                    or (_journal_name(os.environ["WORKER_URL"].rstrip("/")) if os.getenv("WORKER_URL") else None)
+                    or _default_journal_path())
+NER_JOURNAL = RetryJournal(NER_JOURNAL_PATH)
 
 NER_URL = f"{language_endpoint}/language/:analyze-text?api-version=2024-11-01"
 HEADERS = {
@@ -38,22 +89,23 @@ HEADERS = {
 # -----------------------------
 # 1) NER
 # -----------------------------
-def analyze_ner(text: str):
-    """
-    Azure Language NER 호출 -> (entities, grouped)
-    """
-    payload = {
+def _ner_payload(text: str) -> dict:
+    return _ner_batch_payload([text])
+
+def _ner_batch_payload(texts) -> dict:
+    return {
         "kind": "EntityRecognition",
-        "parameters": {"modelVersion": "latest"},
+        # offset/length를 파이썬 str 인덱스(코드 포인트)와 맞춤 → 로그의 offset으로 바로 슬라이스
+        "parameters": {"modelVersion": "latest", "stringIndexType": "UnicodeCodePoint"},
         "analysisInput": {
-            "documents": [{"id": "1", "language": "ko", "text": text}]
+            "documents": [{"id": str(i + 1), "language": "ko", "text": t} for i, t in enumerate(texts)]
         },
     }
-    resp = requests.post(NER_URL, headers=HEADERS, json=payload, timeout=15)
-    resp.raise_for_status()
-    data = resp.json()
-    entities = data["results"]["documents"][0]["entities"]
 
+def _parse_ner_response(data: dict):
+    return _group_entities(data["results"]["documents"][0]["entities"])
+
+def _group_entities(entities):
     grouped = defaultdict(list)
     for e in entities:
         cat = e.get("category", "Unknown")
@@ -63,6 +115,40 @@ def analyze_ner(text: str):
             grouped[cat].append((txt, score))
     return entities, grouped
 
+def analyze_ner(text: str):
+    """
+    Azure Language NER 호출 -> (entities, grouped)
+    """
+    with NER_BREAKER.guard():
+        resp = requests.post(NER_URL, headers=HEADERS, json=_ner_payload(text), timeout=NER_TIMEOUT_SEC)
+        resp.raise_for_status()
+    return _parse_ner_response(resp.json())
+
+def analyze_ner_batch(texts):
+    """
+    여러 문장을 한 번의 호출로 NER (len(texts) <= NER_BATCH_DOCS) -> [(entities, grouped)] (입력 순서)
+    문서 단위 오류는 빈 결과로 채움
+    """
+    if not texts:
+        return []
+    with NER_BREAKER.guard():
+        resp = requests.post(NER_URL, headers=HEADERS, json=_ner_batch_payload(texts), timeout=NER_TIMEOUT_SEC)
+        resp.raise_for_status()
+    results = resp.json()["results"]
+    by_id = {d["id"]: d.get("entities") or [] for d in results.get("documents") or []}
+    for err in results.get("errors") or []:
+        print(f"[NER] doc {err.get('id')} error: {err.get('error', {}).get('message')}")
+    return [_group_entities(by_id.get(str(i + 1), [])) for i in range(len(texts))]
+
+async def analyze_ner_async(text: str, client):
+    """
+    analyze_ner의 비동기 버전 (asgi_server.py). client: 커넥션 풀을 공유하는 httpx.AsyncClient
+    """
+    with NER_BREAKER.guard():
+        resp = await client.post(NER_URL, headers=HEADERS, json=_ner_payload(text), timeout=NER_TIMEOUT_SEC)
+        resp.raise_for_status()
+    return _parse_ner_response(resp.json())
+
 def print_ner(grouped):
     """콘솔 출력(가독성)"""
     if not grouped:
@@ -89,34 +175,71 @@ def init_ner_log():
     if NER_LOG_PATH:
         return
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    fname = f"ner_entities_{ts}.{'csv' if LOG_FORMAT=='csv' else 'txt'}"
+    # pid: 같은 디렉토리를 쓰는 여러 프로세스가 같은 초에 기동해도 서로의 파일을 덮어쓰지(w) 않게
+    fname = f"ner_entities_{ts}_{os.getpid()}.{'csv' if LOG_FORMAT=='csv' else 'txt'}"
     NER_LOG_PATH = os.path.join(ner_results_dir, fname)
 
-    if LOG_FORMAT == "csv":
+    if LOG_FORMAT == "csv" and NER_LOG_SCHEMA == "v2":
         with open(NER_LOG_PATH, "w", encoding="utf-8-sig", newline="") as f:
-            csv.writer(f).writerow(["timestamp", "category", "entity", "confidence", "source_text"])
+            # U,utt_id,timestamp,trace,source_text / E,utt_id,category,entity,confidence,offset,length
+            csv.writer(f).writerow(["kind", "utt_id", "timestamp|category", "trace|entity",
+                                    "source_text|confidence", "offset", "length"])
+    elif LOG_FORMAT == "csv":
+        with open(NER_LOG_PATH, "w", encoding="utf-8-sig", newline="") as f:
+            csv.writer(f).writerow(["timestamp", "category", "entity", "confidence", "source_text", "trace"])
     else:
         with open(NER_LOG_PATH, "w", encoding="utf-8") as f:
-            f.write("# timestamp | category | entity | confidence | source_text\n")
+            f.write("# timestamp | category | entity | confidence | source_text | trace\n")
 
     print(f"[NER LOG] Writing to {NER_LOG_PATH}")
 
-def append_ner_rows(entities, full_text, ts):
+def append_ner_rows(entities, full_text, ts, trace: str = ""):
+    """trace: STT 요청의 traceparent (에이전트 워커가 이어받아 span 연결)"""
     if not entities:
         return
-    if LOG_FORMAT == "csv":
-        rows = [[ts, e.get("category"), e.get("text"), e.get("confidenceScore"), full_text] for e in entities]
-        with NER_LOG_LOCK:
-            with open(NER_LOG_PATH, "a", encoding="utf-8-sig", newline="") as f:
-                csv.writer(f).writerows(rows)
+    append_ner_batch([(entities, full_text, ts, trace)])
+
+_UTT_IDS = itertools.count(1)
+_UTT_PREFIX = f"{os.getpid():x}."   # 발화 ID = pid(hex).순번 → 여러 프로세스의 로그를 합쳐도 유일
+
+def entity_span(e: dict, text: str):
+    """엔티티의 (offset, length). 응답 offset이 원문과 안 맞으면 첫 등장 위치, 없으면 (-1, 0)"""
+    ent = e.get("text") or ""
+    off, n = e.get("offset"), e.get("length")
+    if isinstance(off, int) and isinstance(n, int) and text[off:off + n] == ent:
+        return off, n
+    off = text.find(ent) if ent else -1
+    return off, (len(ent) if off >= 0 else 0)
+
+def _v2_rows(records):
+    rows = []
+    for entities, full_text, ts, trace in records:
+        if not entities:
+            continue
+        uid = f"{_UTT_PREFIX}{next(_UTT_IDS)}"
+        rows.append(["U", uid, ts, trace, full_text])
+        for e in entities:
+            off, n = entity_span(e, full_text)
+            rows.append(["E", uid, e.get("category"), e.get("text"), e.get("confidenceScore"), off, n])
+    return rows
+
+def append_ner_batch(records):
+    """records: [(entities, full_text, ts, trace)] → 한 번에 log_writer로 넘김 (group commit, 호출 스레드는 I/O 없음)"""
+    if LOG_FORMAT == "csv" and NER_LOG_SCHEMA == "v2":
+        # 발화 1행 + 엔티티 행 → 같은 write 안에 연속 (tail 쪽에서 U 행이 항상 E 행보다 먼저)
+        rows = _v2_rows(records)
+        if rows:
+            write_rows(NER_LOG_PATH, rows)
+    elif LOG_FORMAT == "csv":
+        rows = [[ts, e.get("category"), e.get("text"), e.get("confidenceScore"), full_text, trace]
+                for entities, full_text, ts, trace in records for e in entities]
+        if rows:
+            write_rows(NER_LOG_PATH, rows)
     else:
-        lines = [
-            f"{ts} | {e.get('category')} | {e.get('text')} | {e.get('confidenceScore')} | {full_text}\n"
-            for e in entities
-        ]
-        with NER_LOG_LOCK:
-            with open(NER_LOG_PATH, "a", encoding="utf-8") as f:
-                f.writelines(lines)
+        write_text(NER_LOG_PATH, "".join(
+            f"{ts} | {e.get('category')} | {e.get('text')} | {e.get('confidenceScore')} | {full_text} | {trace}\n"
+            for entities, full_text, ts, trace in records for e in entities
+        ))
 
 def init_stt_log():
     global STT_LOG_PATH
@@ -130,10 +253,13 @@ def init_stt_log():
     print(f"[STT LOG] Writing to {STT_LOG_PATH}")
 
 def append_stt_line(text: str, ts: str):
-    if not text:
+    append_stt_lines([(text, ts)])
+
+def append_stt_lines(rows):
+    """rows: [(text, ts)] → log_writer로 넘김"""
+    data = "".join(f"{ts} | {text}\n" for text, ts in rows if text)
+    if not data:
         return
     if not STT_LOG_PATH:
         init_stt_log()
-    with STT_LOG_LOCK:
-        with open(STT_LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(f"{ts} | {text}\n")
+    write_text(STT_LOG_PATH, data)
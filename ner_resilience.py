@@ -0,0 +1,205 @@
+# ner_resilience.py
+# Azure Language(NER) 장애 대응: 서킷 브레이커 + 로컬 재처리 저널
+# - CircuitBreaker: 연속 장애 NER_BREAKER_FAILURES회 → open (NER_BREAKER_OPEN_SEC 동안 호출 없이 즉시 NerUnavailable)
+#     → half-open (probe 1건만 통과) → 성공 시 closed, 실패 시 다시 open
+#     장애로 세는 것: 연결/타임아웃 오류, HTTP 5xx/429 (400 등 요청 자체 문제는 세지 않음)
+# - RetryJournal: NER 못 한 STT 문장을 JSONL로 적재, 소비 위치는 .offset 파일 (재시작해도 이어서 재처리)
+# - replay_once(): 저널 앞쪽 몇 건을 재처리 콜백에 넘김. 서버가 NER_REPLAY_RATE(docs/s)로 호출 간격 조절
+# 외부 의존성 없음 (requests/httpx 예외는 response.status_code 유무로만 판별)
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Tuple
+
+from metrics_registry import BREAKER_STATE, JOURNAL_DEPTH
+
+NER_BREAKER_FAILURES    = int(os.getenv("NER_BREAKER_FAILURES", "5"))
+NER_BREAKER_OPEN_SEC    = float(os.getenv("NER_BREAKER_OPEN_SEC", "30"))
+NER_REPLAY_RATE         = float(os.getenv("NER_REPLAY_RATE", "2"))            # 재처리 문서/초
+NER_REPLAY_INTERVAL_SEC = float(os.getenv("NER_REPLAY_INTERVAL_SEC", "5"))    # 저널 확인 주기
+
+_STATE_CODE = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class NerUnavailable(RuntimeError):
+    """브레이커 open 상태: NER 호출을 시도하지 않음"""
+
+
+def is_outage(exc: BaseException) -> bool:
+    """엔드포인트 장애로 볼 예외인지 (브레이커 카운트/저널 적재 대상)"""
+    if isinstance(exc, NerUnavailable):
+        return True
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status >= 500 or status == 429
+    # 응답 파싱 오류(KeyError/ValueError)는 장애가 아님, 그 외(연결/타임아웃/OSError)는 장애
+    return not isinstance(exc, (KeyError, ValueError, TypeError))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failures: int = NER_BREAKER_FAILURES, open_sec: float = NER_BREAKER_OPEN_SEC):
+        self.name = name
+        self.failures = failures
+        self.open_sec = open_sec
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._fails = 0
+        self._opened_at = 0.0
+        self._probing = False
+        BREAKER_STATE.labels(name).set(0)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.open_sec:
+                return "half_open"
+            return self._state
+
+    def _set(self, state: str):
+        if state != self._state:
+            print(f"[breaker:{self.name}] {self._state} -> {state}")
+        self._state = state
+        BREAKER_STATE.labels(self.name).set(_STATE_CODE[state])
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.open_sec:
+                    return False
+                self._set("half_open")
+            if self._state == "half_open":
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._fails = 0
+            self._probing = False
+            self._set("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self._fails += 1
+            self._probing = False
+            if self._state == "half_open" or self._fails >= self.failures:
+                self._opened_at = time.monotonic()
+                self._set("open")
+
+    @contextmanager
+    def guard(self):
+        """with breaker.guard(): <NER 호출>  — open이면 NerUnavailable, 결과에 따라 상태 갱신"""
+        if not self.allow():
+            raise NerUnavailable(f"{self.name} circuit open")
+        try:
+            yield
+        except Exception as e:
+            if is_outage(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:      # 취소 등: 상태 변경 없이 probe만 반납
+            with self._lock:
+                self._probing = False
+            raise
+        else:
+            self.record_success()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            fails = self._fails
+        return {"state": self.state, "consecutive_failures": fails}
+
+
+class RetryJournal:
+    """append-only JSONL + 소비 offset. 다 소비하면 파일을 비움"""
+
+    def __init__(self, path: str, name: str = "ner"):
+        self.path = path
+        self.name = name
+        self._off_path = path + ".offset"
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._pending = 0
+        try:
+            with open(self._off_path, encoding="utf-8") as f:
+                self._offset = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            self._offset = 0
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                self._pending = sum(1 for line in f if line.strip())
+        except OSError:
+            self._offset = 0
+        JOURNAL_DEPTH.labels(name).set(self._pending)
+
+    def pending(self) -> int:
+        return self._pending
+
+    def append(self, records: List[dict]):
+        if not records:
+            return
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+            self._pending += len(records)
+            JOURNAL_DEPTH.labels(self.name).set(self._pending)
+
+    def peek(self, n: int) -> Tuple[List[dict], int]:
+        """앞쪽 최대 n건과 그 다음 offset (commit에 전달)"""
+        out: List[dict] = []
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(self._offset)
+                    while len(out) < n:
+                        line = f.readline()
+                        if not line:
+                            break
+                        if line.strip():
+                            try:
+                                out.append(json.loads(line))
+                            except ValueError:
+                                out.append({})      # 깨진 줄: 빈 레코드로 넘겨 건너뛰게
+                    return out, f.tell()
+            except OSError:
+                return [], self._offset
+
+    def commit(self, next_offset: int, count: int):
+        with self._lock:
+            self._offset = next_offset
+            self._pending = max(0, self._pending - count)
+            if self._pending == 0:
+                # 다 소비: 파일 비우고 offset 0
+                open(self.path, "w").close()
+                self._offset = 0
+            with open(self._off_path, "w", encoding="utf-8") as f:
+                f.write(str(self._offset))
+            JOURNAL_DEPTH.labels(self.name).set(self._pending)
+
+
+def replay_once(journal: RetryJournal, process: Callable[[List[dict]], None], max_docs: int) -> int:
+    """
+    저널 앞쪽 최대 max_docs건을 process(records)로 재처리. 반환: 소비한 건수 (장애로 중단 시 0)
+    장애가 아닌 오류(잘못된 문서 등)는 로그만 남기고 버림 (저널이 막히지 않도록)
+    """
+    records, nxt = journal.peek(max_docs)
+    if not records:
+        return 0
+    valid = [r for r in records if r.get("text")]
+    try:
+        if valid:
+            process(valid)
+    except Exception as e:
+        if is_outage(e):
+            return 0
+        print(f"[replay:{journal.name}] dropping {len(valid)} record(s): {e}")
+    journal.commit(nxt, len(records))
+    return len(records)
@@ -0,0 +1,149 @@
+# profiler.py
+# 운영 서버용 저오버헤드 샘플링 프로파일러 (/debug/profile, /debug/threads 에서 사용)
+# - 별도 스레드가 interval마다 sys._current_frames()로 모든 스레드 스택을 샘플링
+# - greenlet 패키지가 있으면 (gevent 모드) 살아있는 greenlet 스택도 함께 샘플링
+# - 결과: collapsed stack 텍스트 (flamegraph.pl / speedscope 호환) 또는 speedscope JSON
+# - 표준 라이브러리만 사용, 프로파일링하지 않을 때는 비용 0
+
+import gc
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import greenlet as _greenlet  # 선택 의존성 (gevent 설치 시 존재)
+except ImportError:
+    _greenlet = None
+
+PROFILE_INTERVAL_SEC = float(os.getenv("DEBUG_PROFILE_INTERVAL_SEC", "0.005"))
+PROFILE_MAX_SEC      = float(os.getenv("DEBUG_PROFILE_MAX_SEC", "60"))
+MAX_STACK_DEPTH      = 128
+
+_PROFILE_LOCK = threading.Lock()   # 동시에 1개만 실행
+
+
+def _frame_label(frame) -> str:
+    co = frame.f_code
+    return f"{co.co_name} ({os.path.basename(co.co_filename)}:{frame.f_lineno})"
+
+def _stack(frame) -> Tuple[str, ...]:
+    """leaf frame → root→leaf 라벨 튜플"""
+    out: List[str] = []
+    while frame is not None and len(out) < MAX_STACK_DEPTH:
+        out.append(_frame_label(frame))
+        frame = frame.f_back
+    out.reverse()
+    return tuple(out)
+
+def _greenlet_frames() -> Iterable[Tuple[str, object]]:
+    """실행 중이 아닌(대기 중) greenlet들의 최상위 frame. 활성 greenlet은 스레드 frame에 이미 포함됨."""
+    if _greenlet is None:
+        return []
+    out = []
+    for obj in gc.get_objects():
+        if isinstance(obj, _greenlet.greenlet) and not obj.dead and obj.gr_frame is not None:
+            name = getattr(obj, "name", None) or type(obj).__name__
+            out.append((f"greenlet:{name}", obj.gr_frame))
+    return out
+
+
+def sample(seconds: float, interval: float = PROFILE_INTERVAL_SEC,
+           include_greenlets: bool = True, include_idle: bool = False) -> Tuple[Counter, int]:
+    """
+    seconds 동안 샘플링 → (Counter[(thread, frame...)] , 샘플 라운드 수)
+    include_idle=False 면 큐 대기/sleep 중인 스택(threading.wait, select 등)을 제외.
+    """
+    seconds = max(0.1, min(float(seconds), PROFILE_MAX_SEC))
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    rounds = 0
+    end = time.monotonic() + seconds
+    greenlet_every = max(1, int(0.05 / interval))   # gc 스캔은 비싸므로 50ms마다만
+    while time.monotonic() < end:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            st = _stack(frame)
+            if not include_idle and _is_idle(st):
+                continue
+            stacks[(f"thread:{names.get(ident, ident)}",) + st] += 1
+        if include_greenlets and rounds % greenlet_every == 0:
+            for label, frame in _greenlet_frames():
+                st = _stack(frame)
+                if not include_idle and _is_idle(st):
+                    continue
+                stacks[(label,) + st] += greenlet_every
+        rounds += 1
+        time.sleep(interval)
+    return stacks, rounds
+
+_IDLE_LEAVES = ("wait (threading.py", "_wait_for_tstate_lock", "select (", "poll (",
+                "sleep (", "get (queue.py", "accept (", "readinto (socket.py")
+
+def _is_idle(stack: Tuple[str, ...]) -> bool:
+    return bool(stack) and stack[-1].startswith(_IDLE_LEAVES)
+
+
+def collapsed(stacks: Counter) -> str:
+    """Brendan Gregg collapsed 포맷: 'root;child;leaf count' (speedscope/flamegraph.pl import 가능)"""
+    return "\n".join(f"{';'.join(k)} {v}" for k, v in stacks.most_common()) + "\n"
+
+def speedscope(stacks: Counter, interval: float, name: str = "glossify") -> dict:
+    frames: List[dict] = []
+    index: Dict[str, int] = {}
+    samples, weights = [], []
+    for st, n in stacks.items():
+        idxs = []
+        for label in st:
+            i = index.get(label)
+            if i is None:
+                i = index[label] = len(frames)
+                fn, _, loc = label.partition(" (")
+                frames.append({"name": fn, "file": loc.rstrip(")")} if loc else {"name": fn})
+            idxs.append(i)
+        samples.append(idxs)
+        weights.append(n * interval)
+    total = sum(weights)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": name, "unit": "seconds",
+            "startValue": 0, "endValue": total, "samples": samples, "weights": weights,
+        }],
+        "exporter": "glossify-profiler",
+    }
+
+
+def profile(seconds: float, fmt: str = "collapsed", interval: float = PROFILE_INTERVAL_SEC,
+            include_idle: bool = False) -> Optional[object]:
+    """동시 실행 방지 래퍼. 이미 실행 중이면 None."""
+    if not _PROFILE_LOCK.acquire(blocking=False):
+        return None
+    try:
+        stacks, _ = sample(seconds, interval=interval, include_idle=include_idle)
+    finally:
+        _PROFILE_LOCK.release()
+    if fmt == "speedscope":
+        return speedscope(stacks, interval)
+    return collapsed(stacks)
+
+
+def thread_stacks(threads: Optional[Iterable[threading.Thread]] = None) -> List[dict]:
+    """지정한 스레드(기본: 전체)의 현재 스택 덤프"""
+    frames = sys._current_frames()
+    out = []
+    for t in (threads if threads is not None else threading.enumerate()):
+        fr = frames.get(t.ident)
+        out.append({
+            "name": t.name,
+            "ident": t.ident,
+            "alive": t.is_alive(),
+            "daemon": t.daemon,
+            "stack": list(_stack(fr)) if fr is not None else [],
+        })
+    return out
@@ -0,0 +1,458 @@
+# replay.py
+# 오프라인 회의 리플레이: 기록된 STT 전사/NER 로그를 파이프라인에 다시 흘려 처리량·단계별 지연·출력 회귀 측정
+# - 입력
+#     --stt   stt_results/stt_transcripts_*.txt  ("timestamp | text" 줄) → NER 단계부터
+#     --ner-log ner_results/ner_entities_*.csv  (v1/v2) → --stt 없으면 기록된 엔티티로 필터/에이전트 단계부터,
+#               --stt와 함께 주면 mock NER의 응답(문장 텍스트로 조회)으로 사용
+# - 속도: --speed 1 실시간(기록된 timestamp 간격), N = N배속, 0 = 최대 속도 (timestamp 없는 줄은 --gap-ms 간격)
+# - 백엔드
+#     local(기본): 프로세스 안에서 NER(--ner mock|real) → AgentService 필터/큐/워커 → 에이전트(--agent mock|real)
+#         mock 에이전트는 --mock-agent-ms 지연 후 결정적인 설명을 반환 (Azure 없이 큐/워커 용량 측정)
+#         real은 PROJECT_ENDPOINT/AGENT_ID, LANGUAGE_KEY/ENDPOINT 등 운영 설정 그대로 사용
+#     http: --target 서버에 POST /meeting/<mid>/stt, --ws면 Socket.IO 'terms' 수신까지 측정
+# - 리포트: 처리량(utterances/entities/terms per s), 단계별 지연 p50/p95/p99
+#     local: ner, enqueue(필터+적재), queue_wait, agent(설명+전달), e2e(발화 투입 → 용어 전달)
+#     http : ingest(POST /stt 왕복, 서버 내 NER 포함), e2e(--ws)
+# - --out run.json 으로 결과/출력 저장, --diff prev.json 으로 이전 실행과 출력(timestamp+entity 기준)·지표 비교
+#     terms/s 감소나 e2e p95 증가가 --threshold(기본 25%)를 넘거나, --fail-on-diff에서 출력이 다르면 exit 1
+#
+# 사용 예:
+#   python replay.py --stt stt_results/stt_transcripts_20250915_*.txt --ner-log ner_results/ner_entities_20250915_*.csv --speed 0
+#   python replay.py --ner-log ner_results/ner_entities_*.csv --speed 10 --mock-agent-ms 1500 --out base.json
+#   python replay.py --ner-log ner_results/ner_entities_*.csv --speed 10 --mock-agent-ms 1500 --diff base.json
+#   python replay.py --stt stt_results/stt_transcripts_*.txt --backend http --target http://127.0.0.1:5000 --ws --speed 4
+
+import os
+import csv
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+csv.field_size_limit(1 << 24)
+
+
+# ---------------- 입력 ----------------
+def _expand(patterns: List[str]) -> List[str]:
+    out: List[str] = []
+    for p in patterns or []:
+        out.extend(sorted(glob.glob(p)) or [p])
+    return out
+
+
+def _epoch(ts: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(ts.strip().replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _norm(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def read_transcripts(paths: List[str]) -> List[dict]:
+    """'timestamp | text' 줄 → [{ts, text, entities: None}] (entities=None → NER 단계 필요)"""
+    events = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#") or " | " not in line:
+                    continue
+                ts, text = line.rstrip("\n").split(" | ", 1)
+                if text.strip():
+                    events.append({"ts": ts.strip(), "text": text, "trace": "", "entities": None})
+    return events
+
+
+def read_ner_log(paths: List[str]) -> List[dict]:
+    """NER CSV(v1/v2) → 발화 단위 [{ts, text, trace, entities: [NER 응답 형태]}]"""
+    events = []
+    for path in paths:
+        utts: Dict[str, dict] = {}
+        last = None
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.reader(f):
+                if not row or row[0] in {"kind", "timestamp"}:
+                    continue
+                if row[0] == "U" and len(row) >= 5:
+                    ev = utts[row[1]] = {"ts": row[2], "text": row[4], "trace": row[3], "entities": []}
+                    events.append(ev)
+                elif row[0] == "E" and len(row) >= 7:
+                    ev = utts.get(row[1])
+                    if ev is not None:
+                        ev["entities"].append({"category": row[2], "text": row[3], "confidenceScore": _float(row[4]),
+                                               "offset": _int(row[5]), "length": _int(row[6])})
+                elif len(row) >= 5:
+                    # v1: 같은 (timestamp, source_text)가 연속된 행 = 한 발화
+                    if last is None or (last["ts"], last["text"]) != (row[0], row[4]):
+                        last = {"ts": row[0], "text": row[4], "trace": row[5] if len(row) > 5 else "", "entities": []}
+                        events.append(last)
+                    last["entities"].append({"category": row[1], "text": row[2], "confidenceScore": _float(row[3])})
+    return events
+
+
+def _float(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _int(v) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return -1
+
+
+def schedule(events: List[dict], speed: float, gap_ms: float) -> List[float]:
+    """발화별 투입 시각(리플레이 시작 기준 초). speed<=0 → 전부 0 (최대 속도)"""
+    if speed <= 0:
+        return [0.0] * len(events)
+    out, t, prev = [], 0.0, None
+    for ev in events:
+        cur = _epoch(ev["ts"])
+        if prev is not None:
+            t += max(0.0, cur - prev) if cur is not None else gap_ms / 1000.0
+        out.append(t / speed)
+        prev = cur if cur is not None else (prev + gap_ms / 1000.0 if prev is not None else None)
+    return out
+
+
+# ---------------- 지표 ----------------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lat: Dict[str, List[float]] = {}
+        self.counts: Dict[str, int] = {}
+        self.outputs: List[dict] = []
+        self._sent: Dict[tuple, float] = {}
+
+    def stage(self, name: str, sec: float):
+        with self._lock:
+            self.lat.setdefault(name, []).append(sec)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def sent(self, ts: str, entity: str, t: float):
+        with self._lock:
+            self._sent.setdefault((ts, entity), t)
+
+    def output(self, payload: dict):
+        now = time.monotonic()
+        with self._lock:
+            t0 = self._sent.get((payload.get("timestamp"), payload.get("entity")))
+            self.outputs.append({k: payload.get(k) for k in ("timestamp", "entity", "domain", "body")})
+            self.counts["terms"] = self.counts.get("terms", 0) + 1
+            if t0 is not None:
+                self.lat.setdefault("e2e", []).append(now - t0)
+
+    def summary(self, wall: float) -> dict:
+        def q(xs, p):
+            return xs[min(len(xs) - 1, int(p * len(xs)))]
+        stages = {}
+        for name, xs in self.lat.items():
+            xs = sorted(xs)
+            stages[name] = {"count": len(xs), "p50_ms": q(xs, 0.50) * 1e3, "p95_ms": q(xs, 0.95) * 1e3,
+                            "p99_ms": q(xs, 0.99) * 1e3, "mean_ms": statistics.fmean(xs) * 1e3,
+                            "max_ms": xs[-1] * 1e3}
+        rate = {f"{k}_per_sec": (v / wall if wall > 0 else 0.0)
+                for k, v in self.counts.items() if k in {"utterances", "entities", "terms"}}
+        return {"wall_sec": wall, "counts": dict(self.counts), "throughput": rate, "stages": stages}
+
+
+# ---------------- local 백엔드 ----------------
+class LocalPipeline:
+    """NER → AgentService(_enqueue_if_pass → 큐 → 워커 → term_sink) 를 한 프로세스에서 실행"""
+
+    def __init__(self, args, rec: Recorder, recorded: Dict[str, list]):
+        import glossify_agent as ga
+        from ner_core import entity_span
+
+        self.args = args
+        self.rec = rec
+        self.recorded = recorded
+        self.entity_span = entity_span
+        self.AgentTask = ga.AgentTask
+        if args.ner == "real":
+            from ner_core import analyze_ner_batch, check_ner_config
+            check_ner_config()
+            self.analyze = analyze_ner_batch
+
+        class _Timed(ga.AgentService):
+            def _process_task(self, idx, item, trace=""):
+                rec.stage("queue_wait", time.monotonic() - item.enq_at)
+                t0 = time.perf_counter()
+                try:
+                    super()._process_task(idx, item, trace)
+                finally:
+                    rec.stage("agent", time.perf_counter() - t0)
+
+        class _Mock(_Timed):
+            def _ensure_client_and_agent(self):
+                pass
+
+            def _get_worker_thread_id(self):
+                return "replay"
+
+            def _explain_with_agent(self, term, category, context, deadline=None, emitter=None):
+                time.sleep(args.mock_agent_ms / 1000.0)
+                # "도메인 본문" 형식 → split_domain_and_body/전달/CSV 경로를 그대로 탐 (출력은 입력에 대해 결정적)
+                return f"EnterpriseIT {term}({category}): replay explanation, {len(context)} chars of context."
+
+        if args.agent == "real":
+            cls, endpoint, model = _Timed, ga.PROJECT_ENDPOINT, ga.MODEL_DEPLOYMENT_NAME
+        else:
+            cls, endpoint, model = _Mock, "mock://replay", "mock"
+        self.svc = cls(project_endpoint=endpoint, model_deployment=model, backend_base_url="http://replay.invalid",
+                       meeting_id=args.meeting_id, term_sink=lambda payload, _trace: rec.output(payload))
+        self.svc.start(watch=False)
+
+    def ingest(self, ev: dict):
+        t0 = time.monotonic()
+        entities = ev["entities"]
+        if entities is None:
+            t_ner = time.perf_counter()
+            try:
+                if self.args.ner == "real":
+                    entities = self.analyze([ev["text"]])[0][0]
+                else:
+                    if self.args.mock_ner_ms > 0:
+                        time.sleep(self.args.mock_ner_ms / 1000.0)
+                    entities = self.recorded.get(_norm(ev["text"]), [])
+            except Exception as e:
+                self.rec.count("ner_errors")
+                print(f"[replay] NER error: {e}")
+                return
+            self.rec.stage("ner", time.perf_counter() - t_ner)
+        self.rec.count("utterances")
+        self.rec.count("entities", len(entities))
+
+        t_enq = time.perf_counter()
+        for e in entities:
+            offset, length = self.entity_span(e, ev["text"])
+            task = self.AgentTask(ev["ts"], (e.get("category") or "").strip(), (e.get("text") or "").strip(),
+                                  e.get("confidenceScore") or 0.0, ev["text"], ev.get("trace") or "",
+                                  offset=offset, length=length)
+            self.rec.sent(task.timestamp, task.entity, t0)
+            self.svc._enqueue_if_pass(task)
+        self.rec.stage("enqueue", time.perf_counter() - t_enq)
+
+    def drain(self, timeout: float):
+        end = time.monotonic() + timeout
+        while time.monotonic() < end and (self.svc._q.unfinished_tasks or self.svc._overflow):
+            time.sleep(0.05)
+        pending = self.svc._q.unfinished_tasks + len(self.svc._overflow)
+        if pending:
+            print(f"[replay] drain timeout: {pending} task(s) still queued")
+            self.rec.count("undrained", pending)
+        self.svc.stop(timeout=0)            # 이미 drain을 기다렸으므로 남은 task는 바로 버림
+
+    def extra(self) -> dict:
+        return {"agent_service": self.svc.metrics_snapshot()}
+
+
+# ---------------- http 백엔드 ----------------
+class HttpPipeline:
+    """실행 중인 서버(server.py/asgi_server.py)에 STT를 POST. --ws면 룸의 'terms'를 받아 e2e 측정"""
+
+    def __init__(self, args, rec: Recorder):
+        import requests
+
+        self.args = args
+        self.rec = rec
+        self.base = args.target.rstrip("/")
+        self.http = requests.Session()
+        self.sio = None
+        if args.ws:
+            import socketio  # python-socketio[client]
+            self.sio = socketio.Client(reconnection=False)
+
+            @self.sio.on("terms")
+            def _on_terms(payload):
+                if payload.get("replay"):
+                    return
+                for it in payload.get("items") or []:
+                    rec.output(it)
+
+            self.sio.connect(self.base, transports=["websocket"])
+            self.sio.emit("join", {"meeting_id": args.meeting_id, "replay": False})
+            time.sleep(0.3)
+
+    def ingest(self, ev: dict):
+        t0 = time.monotonic()
+        if ev["entities"] is not None:
+            for e in ev["entities"]:
+                self.rec.sent(ev["ts"], (e.get("text") or "").strip(), t0)
+        try:
+            r = self.http.post(f"{self.base}/meeting/{self.args.meeting_id}/stt",
+                               json={"text": ev["text"], "is_final": True, "timestamp": ev["ts"]}, timeout=60)
+            r.raise_for_status()
+        except Exception as e:
+            self.rec.count("http_errors")
+            print(f"[replay] POST /stt failed: {e}")
+            return
+        self.rec.stage("ingest", time.monotonic() - t0)
+        self.rec.count("utterances")
+        if ev["entities"] is not None:
+            self.rec.count("entities", len(ev["entities"]))
+        if r.json().get("deferred"):
+            self.rec.count("ner_deferred")
+
+    def drain(self, timeout: float):
+        if self.sio is None:
+            return
+        # 마지막 용어가 도착할 때까지: timeout 동안 새 출력이 없으면 종료
+        end = time.monotonic() + timeout
+        last = -1
+        while time.monotonic() < end:
+            n = self.rec.counts.get("terms", 0)
+            if n == last:
+                break
+            last = n
+            time.sleep(min(self.args.quiet_sec, max(0.0, end - time.monotonic())))
+        self.sio.disconnect()
+
+    def extra(self) -> dict:
+        return {}
+
+
+# ---------------- 비교 ----------------
+def diff_runs(prev: dict, cur: dict, threshold: float) -> dict:
+    key = lambda o: (o.get("timestamp"), o.get("entity"))
+    a = {key(o): o for o in prev.get("outputs") or []}
+    b = {key(o): o for o in cur.get("outputs") or []}
+    changed = [k for k in a.keys() & b.keys()
+               if (a[k].get("domain"), a[k].get("body")) != (b[k].get("domain"), b[k].get("body"))]
+    out = {"added": sorted(b.keys() - a.keys()), "removed": sorted(a.keys() - b.keys()), "changed": sorted(changed),
+           "regressions": []}
+    pt = prev.get("summary", {}).get("throughput", {}).get("terms_per_sec")
+    ct = cur["summary"]["throughput"].get("terms_per_sec")
+    if pt and ct is not None and ct < pt * (1.0 - threshold):
+        out["regressions"].append(f"terms/s {pt:.2f} → {ct:.2f}")
+    pe = prev.get("summary", {}).get("stages", {}).get("e2e", {}).get("p95_ms")
+    ce = cur["summary"]["stages"].get("e2e", {}).get("p95_ms")
+    if pe and ce is not None and ce > pe * (1.0 + threshold):
+        out["regressions"].append(f"e2e p95 {pe:.0f} ms → {ce:.0f} ms")
+    return out
+
+
+def _print_summary(s: dict):
+    c = s["counts"]
+    print(f"== {c.get('utterances', 0)} utterances, {c.get('entities', 0)} entities, {c.get('terms', 0)} terms "
+          f"in {s['wall_sec']:.1f}s")
+    for k, v in s["throughput"].items():
+        print(f"   {k:<24} {v:10.2f}")
+    print(f"   {'stage':<12} {'count':>7} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    for name, st in s["stages"].items():
+        print(f"   {name:<12} {st['count']:>7} {st['p50_ms']:8.1f}ms {st['p95_ms']:8.1f}ms "
+              f"{st['p99_ms']:8.1f}ms {st['max_ms']:8.1f}ms")
+    other = {k: v for k, v in c.items() if k not in {"utterances", "entities", "terms"}}
+    if other:
+        print(f"   other: {other}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay recorded STT transcripts / NER logs through the pipeline")
+    ap.add_argument("--stt", nargs="*", default=[], help="stt_transcripts_*.txt (glob 가능)")
+    ap.add_argument("--ner-log", nargs="*", default=[], help="ner_entities_*.csv (glob 가능)")
+    ap.add_argument("--speed", type=float, default=1.0, help="1 = 실시간, N = N배속, 0 = 최대 속도")
+    ap.add_argument("--gap-ms", type=float, default=1000.0, help="timestamp를 해석 못한 줄의 간격")
+    ap.add_argument("--limit", type=int, default=0, help="앞쪽 N개 발화만 (0 = 전체)")
+    ap.add_argument("--backend", choices=["local", "http"], default="local")
+    ap.add_argument("--ner", choices=["mock", "real"], default="mock", help="local: --stt 입력의 NER 단계")
+    ap.add_argument("--mock-ner-ms", type=float, default=80.0)
+    ap.add_argument("--agent", choices=["mock", "real"], default="mock", help="local: 에이전트 단계")
+    ap.add_argument("--mock-agent-ms", type=float, default=1500.0)
+    ap.add_argument("--ingest-workers", type=int, default=4, help="동시에 처리하는 발화 수 (STT 요청 동시성)")
+    ap.add_argument("--target", default="http://127.0.0.1:5000", help="http 백엔드 서버 주소")
+    ap.add_argument("--ws", action="store_true", help="http: Socket.IO로 'terms' 수신 (python-socketio[client])")
+    ap.add_argument("--meeting-id", default=f"replay-{int(time.time())}")
+    ap.add_argument("--drain-timeout", type=float, default=120.0, help="투입 후 남은 task/용어를 기다리는 최대 초")
+    ap.add_argument("--quiet-sec", type=float, default=5.0, help="http --ws: 이만큼 새 용어가 없으면 종료")
+    ap.add_argument("--workdir", help="local: NER/에이전트 결과 디렉터리 (기본 임시 디렉터리)")
+    ap.add_argument("--verbose", action="store_true", help="glossify_agent 로그 출력")
+    ap.add_argument("--out", help="결과/출력을 JSON으로 저장")
+    ap.add_argument("--diff", help="이전 --out 결과와 비교")
+    ap.add_argument("--threshold", type=float, default=0.25, help="terms/s 감소·e2e p95 증가 허용 비율")
+    ap.add_argument("--fail-on-diff", action="store_true", help="출력이 이전 실행과 다르면 exit 1")
+    args = ap.parse_args()
+
+    stt_paths, ner_paths = _expand(args.stt), _expand(args.ner_log)
+    if not stt_paths and not ner_paths:
+        ap.error("--stt 또는 --ner-log 필요")
+    recorded_events = read_ner_log(ner_paths)
+    events = read_transcripts(stt_paths) if stt_paths else recorded_events
+    recorded = {_norm(ev["text"]): ev["entities"] for ev in recorded_events}
+    if stt_paths and args.backend == "local" and args.ner == "mock" and not recorded:
+        print("[replay] ⚠️ mock NER without --ner-log: no entities will be produced")
+    if args.limit > 0:
+        events = events[:args.limit]
+    if not events:
+        ap.error("입력에 발화가 없음")
+
+    # local: 결과 CSV/저널/negative cache/alias 테이블이 운영 디렉터리를 건드리지 않도록 (glossify_agent/ner_core import 전에)
+    if args.backend == "local":
+        workdir = args.workdir or tempfile.mkdtemp(prefix="glossify_replay_")
+        for k, sub in (("NER_RESULTS_DIR", "ner_results"), ("STT_RESULTS_DIR", "stt_results"),
+                       ("AGENT_RESULTS_DIR", "agent_results")):
+            os.environ[k] = os.path.join(workdir, sub)
+        os.environ["NEG_CACHE_PATH"] = ""
+        os.environ["ALIAS_TABLE_PATH"] = ""
+        if args.agent == "mock":
+            os.environ["AGENT_ID"] = "replay-mock"     # mock 에이전트는 Foundry를 쓰지 않음
+        if not args.verbose:
+            os.environ.setdefault("SILENT", "1")
+            os.environ.setdefault("LOG_TO_FILE", "0")
+        print(f"[replay] workdir: {workdir}")
+
+    rec = Recorder()
+    pipe = LocalPipeline(args, rec, recorded) if args.backend == "local" else HttpPipeline(args, rec)
+    at = schedule(events, args.speed, args.gap_ms)
+    print(f"[replay] {len(events)} utterances, span {at[-1]:.1f}s at speed={args.speed:g} → {args.backend}")
+
+    t_start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, args.ingest_workers), thread_name_prefix="replay-ingest") as pool:
+        for ev, t in zip(events, at):
+            delay = t_start + t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(pipe.ingest, ev)
+    pipe.drain(args.drain_timeout)
+    wall = time.monotonic() - t_start
+
+    result = {"params": vars(args), "summary": rec.summary(wall), **pipe.extra(),
+              "outputs": sorted(rec.outputs, key=lambda o: (o.get("timestamp") or "", o.get("entity") or ""))}
+    _print_summary(result["summary"])
+
+    rc = 0
+    if args.diff:
+        with open(args.diff, encoding="utf-8") as f:
+            d = diff_runs(json.load(f), result, args.threshold)
+        print(f"== diff vs {args.diff}: +{len(d['added'])} -{len(d['removed'])} ~{len(d['changed'])}")
+        for tag, keys in (("+", d["added"]), ("-", d["removed"]), ("~", d["changed"])):
+            for ts, ent in keys[:20]:
+                print(f"   {tag} {ts} {ent}")
+        for msg in d["regressions"]:
+            print(f"   ❌ {msg}")
+        if d["regressions"] or (args.fail_on_diff and (d["added"] or d["removed"] or d["changed"])):
+            rc = 1
+        result["diff"] = {k: [list(x) for x in v] if k != "regressions" else v for k, v in d.items()}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ from datetime import datetime, timezone
 import urllib.request
 
 BASE = "http://localhost:5000"
+EPOCH = str(int(time.time()))   # 실행마다 바뀜 → 재실행 시 seq를 1부터 다시 매겨도 새 윈도로 처리
 
 def post(meeting_id, text, is_final=True, seq=None, speaker=None):
     url = f"{BASE}/meeting/{meeting_id}/stt"
@@ -18,6 +19,7 @@ def post(meeting_id, text, is_final=True, seq=None, speaker=None):
         "is_final": is_final,
         "seq": seq,
         "speaker": speaker,
+        "epoch": EPOCH,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
     data = json.dumps(payload).encode("utf-8")
@@ -1,26 +1,50 @@
 # server.py
-import os, importlib
-import sys, io, json
+# import만으로는 로그 파일/백그라운드 태스크/Azure SDK를 건드리지 않음 → create_app()(또는 첫 요청)에서 초기화
+#   gunicorn ... 'server:create_app()' 권장, 기존 'server:app'도 첫 요청 때 같은 초기화 수행
+#   Azure AI Projects/identity, watchdog(glossify_agent)은 에이전트 첫 기동/예열 시점에 import
+import gevent_mode
+gevent_mode.patch()   # gevent 모드면 다른 모든 import보다 먼저 monkey-patch (socket/ssl/threading)
+
+import os, hmac, importlib
+import sys, io, json, time
 from datetime import datetime, timezone
-from collections import defaultdict, deque
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO, join_room, leave_room, emit  # 프론트 push용
 
 from ner_core import (
-    analyze_ner,
+    analyze_ner_batch,
+    check_ner_config,
     init_ner_log,
     init_stt_log,
-    append_ner_rows,
-    append_stt_line,
+    append_ner_batch,
+    append_stt_lines,
     print_ner,
+    NER_BATCH_DOCS,
+    NER_BREAKER,
+    entity_span,
+    NER_JOURNAL,
 )
-
-from glossify_agent import start_agent_in_background
+from log_writer import flush_logs
+from ner_resilience import NER_REPLAY_INTERVAL_SEC, NER_REPLAY_RATE, is_outage, replay_once
 
 import threading
 from cosmos_terms import CosmosTermStore, newest_glossify_csv
+from metrics_registry import (
+    REGISTRY, BROADCASTS, NER_LATENCY, STT_REQUESTS, STT_DUPLICATES, NER_DEFERRED,
+    WS_BATCH_ITEMS, WS_LAGGARD_KICKS, WS_LAGGARD_SKIPS, remove_meeting_metrics,
+)
+from tracing import current_traceparent, init_tracing, span, trace_id_of
+import profiler
+import requests
+from state_backend import make_backend, MemoryBackend, OWNER_TTL_SEC
+from server_common import (
+    WS_BATCH_WINDOW_MS, WS_CLIENT_MAX_QUEUE,
+    as_bool, batch_chunks, classify_laggards, normalize_terms, now_iso_z, observe_e2e, parse_payload,
+    resolve_worker_url, stt_fields, terms_from_payload,
+)
+from agent_pool import AGENT_POOL_WORKERS, AgentPool
 
 # ----------------- Flask & Socket.IO -----------------
 app = Flask(__name__)
@@ -42,8 +66,27 @@ def _pick_async_mode() -> str:
     # Azure VM에서 서버 구동 시 gevent 사용 권장
     return "gevent"
 
+def _pick_serializer() -> str:
+    """SOCKETIO_SERIALIZER=msgpack 이면 바이너리 패킹 (클라이언트도 msgpack parser 필요)"""
+    pref = (os.getenv("SOCKETIO_SERIALIZER") or "default").strip().lower()
+    if pref == "msgpack":
+        try:
+            importlib.import_module("msgpack")
+            return pref
+        except Exception:
+            print("[socketio] serializer='msgpack' requested but package missing → fallback to 'default'")
+    return "default"
+
+# 압축: polling 응답은 http_compression, 그 이상 크기만 압축 (websocket permessage-deflate는 워커/프록시 설정에 따름)
+WS_COMPRESSION_THRESHOLD = int(os.getenv("WS_COMPRESSION_THRESHOLD", "1024"))
+
+# 멀티 프로세스/노드: 다른 워커에 붙은 클라이언트에게도 emit이 전달되도록 메시지 큐 공유 (예: redis://...)
+SOCKETIO_MESSAGE_QUEUE = (os.getenv("SOCKETIO_MESSAGE_QUEUE") or "").strip() or None
+
 ASYNC_MODE = _pick_async_mode()
-sio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE)
+sio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE,
+               http_compression=True, compression_threshold=WS_COMPRESSION_THRESHOLD,
+               serializer=_pick_serializer(), message_queue=SOCKETIO_MESSAGE_QUEUE)
 print(f"[socketio] using async_mode = {sio.async_mode}")
 
 # sio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
@@ -56,46 +99,114 @@ def home():
     })
 
 # ----------------- Helper: WS broadcast -----------------
-def broadcast_to_meeting(meeting_id: str, payload: dict) -> bool:
-    """특정 meeting_id 룸으로 payload 브로드캐스트"""
+# 룸별 coalescing(WS_BATCH_*) / 느린 클라이언트 보호(WS_CLIENT_*) 설정은 server_common.py
+
+_ROOM_BUF: dict[str, list] = {}          # meeting_id -> [(item, trace)]
+# 공유 상태: 최종문 중복/stop 상태/용어 링버퍼/meeting 소유권 (STATE_BACKEND_URL: memory 기본, redis://…)
+STATE = make_backend()
+_ROOM_BUF_LOCK = threading.Lock()
+
+def _laggards(meeting_id: str) -> list:
+    """룸 참가자 중 송신 큐가 상한을 넘은 sid 목록 (상한의 DISCONNECT배 이상이면 연결 종료)"""
     try:
-        sio.emit("terms", payload, to=meeting_id)
+        kick, skip = classify_laggards(sio.server.manager.get_participants("/", meeting_id), sio.server.eio.sockets)
+        for sid, backlog in kick:
+            WS_LAGGARD_KICKS.labels(meeting_id).inc()
+            print(f"[WS] disconnect laggard {sid} (backlog={backlog})")
+            sio.server.disconnect(sid)
+        return skip
+    except Exception as e:
+        print(f"[WS] backlog check failed: {e}")
+        return []
+
+def _emit_room(event: str, meeting_id: str, payload: dict):
+    skip = _laggards(meeting_id) if WS_CLIENT_MAX_QUEUE > 0 else []
+    if skip:
+        WS_LAGGARD_SKIPS.labels(meeting_id).inc(len(skip))
+    sio.emit(event, payload, to=meeting_id, skip_sid=skip or None)
+
+def _emit_terms(meeting_id: str, items: list, traces: list) -> bool:
+    parent = next((t for t in traces if t), None)
+    items = STATE.history_append(meeting_id, items)   # seq(커서) 부여 + 링버퍼 보관
+    with span("ws.broadcast", parent=parent, meeting=meeting_id, items=len(items)) as sp:
+        try:
+            _emit_room("terms", meeting_id, {"type": "terms", "meeting_id": meeting_id,
+                                             "items": items, "cursor": items[-1]["seq"] if items else None})
+            BROADCASTS.labels(meeting_id, "ok").inc()
+            WS_BATCH_ITEMS.labels(meeting_id).observe(len(items))
+        except Exception as e:
+            BROADCASTS.labels(meeting_id, "error").inc()
+            sp.record_exception(e)
+            print(f"[WS] broadcast error: {e}")
+            return False
+    observe_e2e(meeting_id, items)
+    return True
+
+def _flush_room(meeting_id: str) -> bool:
+    with _ROOM_BUF_LOCK:
+        buf = _ROOM_BUF.pop(meeting_id, None)
+    if not buf:
+        return True
+    ok = True
+    for items, traces in batch_chunks(buf):
+        ok = _emit_terms(meeting_id, items, traces) and ok
+    return ok
+
+def _flush_room_later(meeting_id: str):
+    sio.sleep(WS_BATCH_WINDOW_MS / 1000.0)
+    _flush_room(meeting_id)
+
+def broadcast_to_meeting(meeting_id: str, payload: dict, trace: str | None = None) -> bool:
+    """
+    특정 meeting_id 룸으로 payload["items"] 브로드캐스트 (trace: 부모 traceparent).
+    batching 활성 시 룸 버퍼에 넣고 첫 항목 기준 window 뒤 한 번에 전송 → 항상 True(접수됨).
+    """
+    items = list(payload.get("items") or [])
+    if WS_BATCH_WINDOW_MS <= 0:
+        return _emit_terms(meeting_id, items, [trace])
+    with _ROOM_BUF_LOCK:
+        buf = _ROOM_BUF.get(meeting_id)
+        first = buf is None
+        if first:
+            buf = _ROOM_BUF[meeting_id] = []
+        buf.extend((it, trace) for it in items)
+    if first:
+        sio.start_background_task(_flush_room_later, meeting_id)
+    return True
+
+def broadcast_delta_to_meeting(meeting_id: str, payload: dict) -> bool:
+    """스트리밍 중인 용어 설명 조각(terms_delta)을 룸으로 전달 (에이전트 워커에서 직접 호출, batching 없음)"""
+    try:
+        _emit_room("terms_delta", meeting_id, payload)
         return True
     except Exception as e:
-        print(f"[WS] broadcast error: {e}")
+        print(f"[WS] delta broadcast error: {e}")
         return False
 
 # ----------------- ENV toggles -----------------
 # 옵션: partial(임시 인식)에도 NER 수행할지
 RUN_NER_ON_PARTIAL = (os.getenv("RUN_NER_ON_PARTIAL") or "0").lower() in {"1", "true", "y"}
-
-# ----------------- Logs init -----------------
-# 초기 로그 파일 준비 (reloader 중복 생성 방지하려면 app.run(use_reloader=False) 권장)
-init_ner_log()
-init_stt_log()
+# /stt 수신 시 meeting 에이전트 자동 기동 (0이면 /start 로만 기동; 부하 테스트/리플레이용)
+AGENT_AUTOSTART = (os.getenv("AGENT_AUTOSTART") or "1").lower() in {"1", "true", "y"}
 
 # ----------------- Per-meeting state -----------------
-# 중복 최종문 방지(회의별 LRU)
-LAST_FINAL = defaultdict(lambda: deque(maxlen=32))
+# 중복 최종문 방지 / stop 상태는 STATE 백엔드(state_backend.py)에 보관
+# AgentService 인스턴스는 프로세스 로컬: meeting 소유 워커에서만 기동
 
-_AGENTS: dict[str, object] = {}                      # meeting_id -> AgentService
+_AGENTS: dict[str, object] = {}                      # meeting_id -> AgentService (풀 모드: agent_pool.PoolHandle)
 _AGENTS_LOCK = threading.Lock()
 
-#_agent_handle = None  # 백그라운드 에이전트 핸들(중복 기동 방지)
+# 프로세스 외부 에이전트 워커 풀 (AGENT_POOL_WORKERS > 0): 웹 프로세스는 task 게시 + 결과 브로드캐스트만
+AGENT_POOL = AgentPool(AGENT_POOL_WORKERS) if AGENT_POOL_WORKERS > 0 else None
+AGENT_POOL_POLL_SEC = float(os.getenv("AGENT_POOL_POLL_SEC", "0.02"))
 
-# helper functions
-def _as_bool(v, default=False):
-    if isinstance(v, bool):
-        return v
-    if isinstance(v, (int, float)):
-        return v != 0
-    if isinstance(v, str):
-        return v.strip().lower() in {"1", "true", "t", "y", "yes"}
-    return default
+# 이 프로세스를 다른 워커가 찾아올 수 있는 주소 (= meeting 소유자 ID). 공유 상태 백엔드면 WORKER_URL 필수
+WORKER_URL = resolve_worker_url(shared_state=not isinstance(STATE, MemoryBackend))
+FORWARD_HEADER = "X-Glossify-Forwarded"
 
-def _now_iso_z():
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+#_agent_handle = None  # 백그라운드 에이전트 핸들(중복 기동 방지)
 
+# helper functions (프레임워크 무관 파싱은 server_common.py)
 def _read_payload():
     """
     JSON 우선, 실패 시 raw(JSON 재시도) -> form 순으로 파싱
@@ -107,29 +218,85 @@ def _read_payload():
     raw = request.get_data(cache=False, as_text=True)
     # 디버그용: 실제 들어온 원문을 1회 확인해보고 싶을 때 주석 해제
     # print(f"[DEBUG] Content-Type={request.headers.get('Content-Type')} raw={raw!r}")
+    return parse_payload(raw, request.form.to_dict(flat=True))
 
-    if raw:
-        try:
-            parsed = json.loads(raw)
-            if isinstance(parsed, dict):
-                return parsed
-        except Exception:
-            pass
+def _meeting_owner(meeting_id: str) -> str:
+    """meeting 소유 워커 URL (비어 있으면 이 프로세스가 점유)"""
+    if FORWARD_HEADER in request.headers:
+        return WORKER_URL        # 이미 다른 워커가 넘겨준 요청 → 루프 방지, 로컬 처리
+    return STATE.claim_meeting(meeting_id, WORKER_URL, ttl=OWNER_TTL_SEC)
 
-    if request.form:
-        return request.form.to_dict(flat=True)
+def _forward_to_owner(owner: str):
+    """현재 요청을 meeting 소유 워커로 그대로 전달하고 응답을 중계"""
+    try:
+        r = requests.request(
+            request.method, f"{owner}{request.full_path.rstrip('?')}",
+            data=request.get_data(cache=True),
+            headers={"Content-Type": request.headers.get("Content-Type", "application/json"),
+                     FORWARD_HEADER: WORKER_URL,
+                     **({"traceparent": request.headers["traceparent"]} if "traceparent" in request.headers else {})},
+            timeout=(3, 15),
+        )
+        return Response(r.content, status=r.status_code, mimetype=r.headers.get("Content-Type", "application/json"))
+    except Exception as e:
+        print(f"[server] forward to owner {owner} failed: {e}")
+        return jsonify({"status": "error", "error": "owner unreachable", "owner": owner}), 502
 
-    return {}
+def _renew_ownership_loop():
+    """소유 중인 meeting의 TTL 갱신 (놓쳤으면 다시 점유 시도)"""
+    while True:
+        sio.sleep(max(1.0, OWNER_TTL_SEC / 3))
+        with _AGENTS_LOCK:
+            mids = list(_AGENTS)
+        for mid in mids:
+            try:
+                if not STATE.renew_meeting(mid, WORKER_URL, ttl=OWNER_TTL_SEC):
+                    owner = STATE.claim_meeting(mid, WORKER_URL, ttl=OWNER_TTL_SEC)
+                    if owner != WORKER_URL:
+                        print(f"[server] lost ownership of '{mid}' to {owner}")
+                        _release_agent(mid)
+            except Exception as e:
+                print(f"[server] ownership renew error ({mid}): {e}")
+
+def _release_agent(meeting_id: str):
+    """
+    소유권을 잃었거나(새 소유자와 중복 설명 방지) 회의가 끝난(stop/upsert 완료) meeting의
+    로컬 에이전트 정지/제거 + meeting 라벨 메트릭 삭제
+    """
+    with _AGENTS_LOCK:
+        svc = _AGENTS.pop(meeting_id, None)
+    if svc is None or AGENT_POOL is not None:
+        if svc is not None:
+            AGENT_POOL.release(meeting_id)
+        remove_meeting_metrics(meeting_id)
+        return
+    def _stop():
+        svc.stop()      # 유한 drain이지만 호출자(갱신 루프/업서트)를 막지 않도록 백그라운드
+        remove_meeting_metrics(meeting_id)
+    sio.start_background_task(_stop)
 
-def _ensure_agent_for(meeting_id: str):
+def _ensure_agent_for(meeting_id: str, freshness_sec: float | None = None):
     """요청 path의 meeting_id로 AgentService를 meeting별 1개만 기동."""
     with _AGENTS_LOCK:
         svc = _AGENTS.get(meeting_id)
         if svc:
+            if freshness_sec is not None:
+                svc.freshness_sec = freshness_sec
+            return svc
+        if AGENT_POOL is not None:
+            svc = AGENT_POOL.handle(meeting_id)
+            if freshness_sec is not None:
+                svc.freshness_sec = freshness_sec
+            _AGENTS[meeting_id] = svc
             return svc
+        from glossify_agent import start_agent_in_background   # Azure SDK import는 첫 에이전트 기동 시
         # meeting_id를 AgentService에 바인딩해서, 에이전트의 REST POST가 항상
         # /meeting/<meeting_id>/terms 로 가도록 보장
-        svc = start_agent_in_background(meeting_id=meeting_id)
+        svc = start_agent_in_background(
+            meeting_id=meeting_id,
+            freshness_sec=freshness_sec,
+            delta_sink=lambda payload, mid=meeting_id: broadcast_delta_to_meeting(mid, payload),
+        )
         _AGENTS[meeting_id] = svc
         print(f"[server] Agent started for meeting '{meeting_id}' (csv={getattr(svc, 'explain_csv', None)})")
         return svc
@@ -148,17 +315,108 @@ def _ensure_agent_for(meeting_id: str):
 
 @app.get("/health")
 def health():
-    return jsonify({"status": "ok"})
+    out = {"status": "ok", "ner": {**NER_BREAKER.snapshot(), "journal_pending": NER_JOURNAL.pending()}}
+    if AGENT_POOL is not None:
+        out["agent_pool"] = AGENT_POOL.health()
+    return jsonify(out)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition (NER/큐 대기/에이전트 run/전송/E2E 지연 히스토그램, meeting 라벨)"""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+# ------------------- Debug (admin only) -------------------
+# DEBUG_ADMIN_TOKEN 미설정이면 /debug/* 전체 비활성(404)
+DEBUG_ADMIN_TOKEN = (os.getenv("DEBUG_ADMIN_TOKEN") or "").strip()
+
+def _admin_denied():
+    if not DEBUG_ADMIN_TOKEN:
+        return jsonify({"error": "not found"}), 404
+    # 헤더로만 받음 (쿼리스트링은 프록시/접근 로그에 남음), 비교는 상수 시간
+    token = request.headers.get("X-Admin-Token") or ""
+    if not hmac.compare_digest(token.encode("utf-8"), DEBUG_ADMIN_TOKEN.encode("utf-8")):
+        return jsonify({"error": "forbidden"}), 403
+    return None
+
+@app.get("/debug/profile")
+def debug_profile():
+    """
+    전체 스레드(+greenlet) 샘플링 프로파일.
+    ?seconds=N (기본 10, 최대 DEBUG_PROFILE_MAX_SEC) &format=collapsed|speedscope &idle=1(대기 스택 포함)
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        seconds = float(request.args.get("seconds", "10"))
+    except ValueError:
+        return jsonify({"error": "seconds must be a number"}), 400
+    fmt = (request.args.get("format") or "collapsed").lower()
+    include_idle = as_bool(request.args.get("idle"), default=False)
+
+    # 샘플러는 별도 OS 스레드(gevent patch 시 네이티브 스레드풀)에서 돌리고, 요청 쪽은 협조적으로 대기
+    box = {"done": False, "r": None, "err": None}
+    def _run():
+        try:
+            box["r"] = profiler.profile(seconds, fmt, include_idle=include_idle)
+        except Exception as e:
+            box["err"] = e
+        finally:
+            box["done"] = True
+    gevent_mode.spawn_blocking(_run, name="debug-profiler")
+    while not box["done"]:
+        sio.sleep(0.1)
+    if box["err"] is not None:
+        print(f"[debug] profile failed: {box['err']!r}")
+        return jsonify({"error": f"profile failed: {box['err']}"}), 500
+    result = box["r"]
+    if result is None:      # profile()은 다른 프로파일이 락을 잡고 있을 때만 None
+        return jsonify({"error": "profile already running"}), 409
+    if fmt == "speedscope":
+        return jsonify(result)
+    return Response(result, mimetype="text/plain; charset=utf-8")
+
+@app.get("/debug/threads")
+def debug_threads():
+    """AgentService별 워커/감시/메트릭 스레드 스택 + 그 외 스레드"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    with _AGENTS_LOCK:
+        agents = dict(_AGENTS)
+    owned, per_meeting = set(), {}
+    for mid, svc in agents.items():
+        ths = svc.threads() if hasattr(svc, "threads") else []
+        owned.update(t.ident for t in ths)
+        per_meeting[mid] = {
+            "qsize": svc._q.qsize() if hasattr(svc, "_q") else None,
+            "threads": profiler.thread_stacks(ths),
+        }
+    others = [t for t in threading.enumerate() if t.ident not in owned]
+    return jsonify({"agents": per_meeting, "other": profiler.thread_stacks(others)})
 
 # ------------------- Agent lifecycle (optional) -------------------
 @app.post("/meeting/<meeting_id>/start")
 def start_agent(meeting_id: str):
-    """명시적으로 특정 meeting의 Agent를 시작하고 상태를 반환(선택)."""
-    svc = _ensure_agent_for(meeting_id)
+    """
+    명시적으로 특정 meeting의 Agent를 시작하고 상태를 반환(선택).
+    body(optional): {"freshness_sec": 30}  # 이 회의의 task 신선도 한계(초, 0=무제한)
+    """
+    owner = _meeting_owner(meeting_id)
+    if owner != WORKER_URL:
+        return _forward_to_owner(owner)
+    data = _read_payload() or {}
+    freshness = data.get("freshness_sec")
+    try:
+        freshness = float(freshness) if freshness not in (None, "") else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "freshness_sec must be a number"}), 400
+    svc = _ensure_agent_for(meeting_id, freshness_sec=freshness)
     return jsonify({
         "status": "ok",
         "meeting_id": meeting_id,
-        "csv_path": getattr(svc, "explain_csv", None)
+        "csv_path": getattr(svc, "explain_csv", None),
+        "freshness_sec": getattr(svc, "freshness_sec", None)
     })
 
 @app.post("/meeting/<meeting_id>/stt")
@@ -170,74 +428,261 @@ def receive_stt(meeting_id: str):
       "text": "문장...",
       "is_final": true,          # 기본 true
       "timestamp": "ISO8601",    # 생략시 서버 시각
-      "speaker": "A"             # 선택
+      "speaker": "A",            # 선택
+      "seq": 12,                 # 선택: speaker별 증가 번호 → 재전송은 NER 없이 이전 ACK 반환
+      "epoch": "2024-05-01T09:00"   # 선택: seq를 처음부터 다시 매길 때(생산자 재시작) 바꾸는 값
     }
     응답은 항상 최소 ACK만 반환: {"status":"ok"}
     """
+    # meeting 소유 워커가 아니면 소유자에게 전달 (NER CSV/에이전트는 소유 워커에만 있음)
+    owner = _meeting_owner(meeting_id)
+    if owner != WORKER_URL:
+        return _forward_to_owner(owner)
+
     # meeting_id로 Agent가 바인딩되도록 보장
-    _ensure_agent_for(meeting_id)
+    if AGENT_AUTOSTART:
+        _ensure_agent_for(meeting_id)
 
     data = _read_payload()
-    text = (data.get("text") or "").strip()
-    is_final = _as_bool(data.get("is_final", True), default=True)
-    ts = data.get("timestamp") or _now_iso_z()
-    # speaker, seq 등은 현재 로깅/처리 안 함 (원하면 추가)
+    text, is_final, ts, speaker, seq = stt_fields(data)
 
     if not text:
         return jsonify({"error": "text required"}), 400
 
-    # STT 라인 로그 (모든 partial/final 공통)
-    append_stt_line(text, ts)
+    return jsonify(_ingest_stt(meeting_id, text, is_final, ts,
+                               parent_trace=request.headers.get("traceparent"), speaker=speaker, seq=seq))
 
+# ---- 배치/스트리밍 수집 ----
+STT_BATCH_MAX = int(os.getenv("STT_BATCH_MAX", "500"))   # 요청(이벤트)당 최대 건수
+
+def _read_stt_batch() -> list | None:
+    """JSON 배열 / {"items": [...]} / NDJSON(줄마다 객체 1개) → dict 리스트. NDJSON 파싱 실패 또는 JSON 스칼라면 None"""
+    raw = request.get_data(cache=True, as_text=True) or ""
+    try:
+        data = json.loads(raw) if raw.strip() else []
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        data = data["items"] if isinstance(data.get("items"), list) else [data]
+    elif data is not None and not isinstance(data, list):
+        return None          # JSON 스칼라(숫자/문자열/true 등) → 400
+    if data is None:
+        data = []
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                data.append(json.loads(line))
+            except ValueError:
+                return None
+    return [d for d in data if isinstance(d, dict)]
+
+def _ingest_items(meeting_id: str, items: list, parent_trace: str | None = None) -> dict:
+    """배치 엔드포인트/WS 'stt' 공통: 에이전트 보장 1회 → _ingest_stt_batch → 입력 순서대로 결과"""
+    if AGENT_AUTOSTART:
+        _ensure_agent_for(meeting_id)
+    parsed = [stt_fields(d) for d in items]
+    valid = [i for i, p in enumerate(parsed) if p[0]]
+    results = [{"error": "text required"}] * len(items)
+    for i, r in zip(valid, _ingest_stt_batch(meeting_id, [parsed[i] for i in valid], parent_trace=parent_trace)):
+        results[i] = r
+    return {"status": "ok", "count": len(valid), "results": results}
+
+@app.post("/meeting/<meeting_id>/stt/batch")
+def receive_stt_batch(meeting_id: str):
+    """
+    고빈도 STT 생산자용 배치 수집. 바디: JSON 배열, {"items": [...]}, 또는 NDJSON (각 항목은 /stt 바디와 동일)
+    로그/NER/CSV 쓰기를 배치 단위로 묶어 건당 비용을 줄임. 응답: {"status","count","results":[항목별 ACK]}
+    """
+    owner = _meeting_owner(meeting_id)
+    if owner != WORKER_URL:
+        return _forward_to_owner(owner)
+    items = _read_stt_batch()
+    if items is None:
+        return jsonify({"error": "invalid JSON/NDJSON body"}), 400
+    if len(items) > STT_BATCH_MAX:
+        return jsonify({"error": f"too many items (max {STT_BATCH_MAX})"}), 413
+    return jsonify(_ingest_items(meeting_id, items, parent_trace=request.headers.get("traceparent")))
+
+def _ingest_stt(meeting_id: str, text: str, is_final: bool, ts: str, parent_trace: str | None = None,
+                speaker: str = "", seq: int | None = None) -> dict:
+    """STT 1건 처리 (= 1건짜리 배치)"""
+    return _ingest_stt_batch(meeting_id, [(text, is_final, ts, speaker, seq)], parent_trace=parent_trace)[0]
+
+def _stt_gate(meeting_id: str, text: str, is_final: bool, speaker: str, seq: int | None) -> dict | None:
+    """
+    NER 전 스킵 판정. None이면 처리 대상, 아니면 그대로 돌려줄 ACK.
+    seq가 있으면 (meeting, speaker)별 윈도로 멱등 처리 (같은 문장 반복 발화도 정상 처리),
+    없으면 최근 최종문 텍스트(공백 정규화) 비교
+    """
     if not is_final and not RUN_NER_ON_PARTIAL:
         print(f"[STT][partial][{meeting_id}] {text}")
-        return jsonify({"status": "ok", "skipped_ner": True})
-
+        return {"status": "ok", "skipped_ner": True}
+    if seq is not None:
+        state, ack = STATE.seq_claim(meeting_id, speaker, seq, is_final, text)
+        if state == "new":
+            return None
+        STT_DUPLICATES.labels(meeting_id, "seq" if state == "dup" else "stale").inc()
+        print(f"[STT][{meeting_id}] ({state} seq {speaker}#{seq}) {text[:40]}")
+        if state == "stale":
+            return {"status": "ok", "stale_seq": True}
+        return {**(ack or {"status": "ok", "pending": True}), "duplicate_seq": True}
     # 최종문 중복 방지
-    if is_final:
-        if text in LAST_FINAL[meeting_id]:
-            print(f"[STT][final][{meeting_id}] (dup) {text}")
-            return jsonify({"status": "ok", "duplicate_final": True})
-        LAST_FINAL[meeting_id].append(text)
+    if is_final and STATE.seen_final(meeting_id, text):
+        STT_DUPLICATES.labels(meeting_id, "text").inc()
+        print(f"[STT][final][{meeting_id}] (dup) {text}")
+        return {"status": "ok", "duplicate_final": True}
+    return None
+
+def _commit_ner(meeting_id: str, records: list):
+    """NER 결과 records [(entities, text, ts, trace)] → NER CSV (+ 에이전트 풀 전달). 실시간/재처리 공통"""
+    append_ner_batch(records)    # log_writer 버퍼에 넣고 바로 반환 (파일 I/O는 writer 스레드)
+    if AGENT_POOL is not None:
+        for entities, text, ts, trace in records:
+            _publish_to_pool(meeting_id, entities, text, ts, trace)
+
+def _replay_ner(records: list):
+    """재처리 저널 레코드 {"meeting_id","text","ts","trace"} → NER 1회 호출 → meeting별 commit"""
+    analyzed = analyze_ner_batch([r["text"] for r in records])
+    by_meeting: dict = {}
+    for r, (entities, _g) in zip(records, analyzed):
+        by_meeting.setdefault(r["meeting_id"], []).append((entities, r["text"], r["ts"], r.get("trace") or ""))
+    for mid, recs in by_meeting.items():
+        _commit_ner(mid, recs)
+        NER_DEFERRED.labels(mid, "replayed").inc(len(recs))
+
+def _ner_replay_loop():
+    """저널에 쌓인 문장을 NER_REPLAY_RATE(docs/s)로 재처리. 브레이커가 open이면 호출 없이 대기 (half-open probe 역할도 겸함)"""
+    while True:
+        sio.sleep(NER_REPLAY_INTERVAL_SEC)
+        while NER_JOURNAL.pending():
+            try:
+                n = replay_once(NER_JOURNAL, _replay_ner, NER_BATCH_DOCS)
+            except Exception as e:
+                print(f"[NER REPLAY] error: {e}")
+                n = 0
+            if not n:
+                break
+            print(f"[NER REPLAY] {n} text(s) reprocessed, {NER_JOURNAL.pending()} left")
+            sio.sleep(n / max(NER_REPLAY_RATE, 0.01))
+
+def _ingest_stt_batch(meeting_id: str, items: list, parent_trace: str | None = None) -> list:
+    """
+    STT 여러 건 처리: 로그(1회 write) → (partial/중복 스킵) → NER(NER_BATCH_DOCS개씩 1회 호출) → CSV(1회 write).
+    items: [(text, is_final, ts, speaker, seq)] → 항목별 ACK dict 리스트.
+    seq 재전송/윈도 밖 항목은 STT 로그에도 남기지 않음.
+    stt.receive span(배치당 1개)의 traceparent를 NER CSV 행에 남겨 에이전트 워커가 이어받게 함.
+    NER 장애(브레이커 open/연결 실패/5xx)로 못 한 문장은 재처리 저널에 적재 → ACK에 deferred: true.
+    """
+    results: list = [None] * len(items)
+    deferred = set()
+    todo = []
+    for i, (text, is_final, _, speaker, seq) in enumerate(items):
+        STT_REQUESTS.labels(meeting_id, "final" if is_final else "partial").inc()
+        results[i] = _stt_gate(meeting_id, text, is_final, speaker, seq)
+        if results[i] is None:
+            todo.append(i)
+
+    # STT 라인 로그 (partial/final 공통, seq 재전송 제외)
+    append_stt_lines([(it[0], it[2]) for it, r in zip(items, results)
+                      if not (r and ("duplicate_seq" in r or "stale_seq" in r))])
+    if not todo:
+        return results
+
+    with span("stt.receive", parent=parent_trace, meeting=meeting_id, items=len(todo),
+              chars=sum(len(items[i][0]) for i in todo)) as sp:
+        trace = current_traceparent(parent_trace)
+        tid = trace_id_of(trace)
+        n_entities = 0
+        # NER 수행 → CSV 누적 + 콘솔 출력 (청크 단위로 실패 격리)
+        for k in range(0, len(todo), NER_BATCH_DOCS):
+            chunk = todo[k:k + NER_BATCH_DOCS]
+            try:
+                for i in chunk:
+                    print(f"[STT][{'final' if items[i][1] else 'partial'}][{meeting_id}] trace={tid[:8]} {items[i][0]}")
+                t0 = time.perf_counter()
+                try:
+                    with span("ner.analyze", meeting=meeting_id, docs=len(chunk)):
+                        analyzed = analyze_ner_batch([items[i][0] for i in chunk])
+                except Exception:
+                    NER_LATENCY.labels(meeting_id, "error").observe(time.perf_counter() - t0)
+                    raise
+                NER_LATENCY.labels(meeting_id, "ok").observe(time.perf_counter() - t0)
+                records = [(entities, items[i][0], items[i][2], trace) for i, (entities, _g) in zip(chunk, analyzed)]
+                n_entities += sum(len(r[0]) for r in records)
+                _commit_ner(meeting_id, records)
+                print("-" * 60, flush=True)
+            except Exception as e:
+                # 실패해도 외부 STT 모듈엔 ACK만 (파이프라인 끊기지 않도록)
+                sp.record_exception(e)
+                if is_outage(e):
+                    gevent_mode.run_blocking(NER_JOURNAL.append, [
+                        {"meeting_id": meeting_id, "text": items[i][0], "ts": items[i][2], "trace": trace} for i in chunk])
+                    NER_DEFERRED.labels(meeting_id, "journaled").inc(len(chunk))
+                    deferred.update(chunk)
+                    print(f"[NER DEFERRED][{meeting_id}] {len(chunk)} text(s) journaled: {e}")
+                else:
+                    print(f"[NER ERROR] {e}")
+        sp.set_attribute("glossify.entities", n_entities)
+
+    for i in todo:
+        results[i] = {"status": "ok", "trace_id": tid, "deferred": True} if i in deferred else {"status": "ok", "trace_id": tid}
+        _, is_final, _, speaker, seq = items[i]
+        if seq is not None:
+            STATE.seq_done(meeting_id, speaker, seq, is_final, results[i])
+    return results
 
-    # NER 수행 → CSV 누적 + 콘솔 출력
-    try:
-        print(f"[STT][{'final' if is_final else 'partial'}][{meeting_id}] {text}")
-        entities, grouped = analyze_ner(text)
-        append_ner_rows(entities, text, ts)
-        # print_ner(grouped)  # 필요 시 콘솔에 요약 찍기
-        print("-" * 60, flush=True)
-    except Exception as e:
-        # 실패해도 외부 STT 모듈엔 ACK만 (파이프라인 끊기지 않도록)
-        print(f"[NER ERROR] {e}")
 
-    return jsonify({"status": "ok"})
+# ------------------- Agent -> server (terms) -------------------
+# ---- agent pool (프로세스 외부 워커) ----
+def _publish_to_pool(meeting_id: str, entities: list, text: str, ts: str, trace: str):
+    """NER 결과를 dict item으로 풀에 게시 (워커 프로세스에서 AgentTask.from_item → 필터)"""
+    _ensure_agent_for(meeting_id)
+    for e in entities:
+        offset, length = entity_span(e, text)
+        AGENT_POOL.publish(meeting_id, {
+            "timestamp": ts,
+            "category": (e.get("category") or "").strip(),
+            "entity": (e.get("text") or "").strip(),
+            "confidence": e.get("confidenceScore") or 0.0,
+            "source_text": text,
+            "trace": trace,
+            "offset": offset,
+            "length": length,
+        })
+
+def _agent_pool_loop():
+    """워커 결과(최종 용어/terms_delta) → 브로드캐스트, 주기적으로 워커 헬스 점검/재기동"""
+    last_check = time.monotonic()
+    while True:
+        msgs = AGENT_POOL.drain()
+        for kind, mid, payload, trace in msgs:
+            try:
+                if kind == "delta":
+                    broadcast_delta_to_meeting(mid, payload)
+                    continue
+                out = normalize_terms([payload], trace)
+                if out:
+                    broadcast_to_meeting(mid, {"type": "terms", "meeting_id": mid, "items": out}, trace=trace)
+            except Exception as e:
+                print(f"[agent-pool] result handling error ({mid}): {e}")
+        if time.monotonic() - last_check >= 1.0:
+            AGENT_POOL.check()
+            last_check = time.monotonic()
+        if not msgs:
+            sio.sleep(AGENT_POOL_POLL_SEC)
 
 
-# ------------------- Agent -> server (terms) -------------------
 # 외부 프로세스가 에이전트 결과를 REST로 보내고 싶을 때 호환용
 @app.post("/meeting/<meeting_id>/terms")
 def receive_terms(meeting_id: str):
     data = _read_payload() or {}
-    items = data.get("items")
-    if not items: # 단건도 허용
-        maybe = {k: data.get(k) for k in ("timestamp", "entity", "domain", "body")}
-        if any(maybe.values()):
-            items = [maybe]
-    if not items or not isinstance(items, list):
+    items = terms_from_payload(data)   # {"items": [...]} 또는 단건
+    if items is None:
         return jsonify({"error": "items or single term payload required"}), 400
 
-    # timestamp 기본값 / 필수 필드 보정
-    out = []
-    for it in items:
-        ts = (it.get("timestamp") or _now_iso_z())
-        ent = (it.get("entity") or "").strip()
-        body = (it.get("body") or "").strip()
-        dom = (it.get("domain") or "-").strip()
-        if not ent or not body:
-            continue
-        out.append({"timestamp": ts, "entity": ent, "domain": dom, "body": body})
-
+    trace = request.headers.get("traceparent")
+    out = normalize_terms(items, trace)
     if not out:
         return jsonify({"error": "no valid items"}), 400
 
@@ -245,14 +690,32 @@ def receive_terms(meeting_id: str):
     # sio.emit("terms", {"type": "terms", "meeting_id": meeting_id, "items": out}, to=meeting_id)
     # return jsonify({"status": "ok", "count": len(out)})
     payload = {"type": "terms", "meeting_id": meeting_id, "items": out}
-    ok = broadcast_to_meeting(meeting_id, payload)
+    ok = broadcast_to_meeting(meeting_id, payload, trace=trace)
 
     return jsonify({"status": "ok", "count": len(out), "broadcasted": ok})
 
+def _replay_payload(meeting_id: str, since, limit=None) -> dict:
+    try:
+        cursor = int(since) if since not in (None, "") else None
+    except (TypeError, ValueError):
+        cursor = None
+    items, last, truncated = STATE.history_since(meeting_id, cursor, limit=limit)
+    return {"type": "terms", "meeting_id": meeting_id, "items": items,
+            "cursor": last, "truncated": truncated, "replay": True}
+
+@app.get("/meeting/<meeting_id>/terms")
+def list_terms(meeting_id: str):
+    """메모리 링버퍼에서 최근 용어 조회. ?since=<cursor>&limit=N (cursor는 응답/이벤트의 seq)"""
+    limit = request.args.get("limit")
+    try:
+        limit = int(limit) if limit else None
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify(_replay_payload(meeting_id, request.args.get("since"), limit=limit))
+
 # ------------------- Stop & Cosmos upsert -------------------
 # ===== Cosmos upsert wiring =====
-_STOP_STATUS = {}           # meeting_id -> dict(status, csv_path, upserted, error, started_at, ended_at)
-_STOP_LOCK = threading.Lock()
+# stop 상태: STATE 백엔드에 meeting_id -> dict(status, csv_path, upserted, error, started_at, ended_at)
 _term_store = None          # lazy CosmosTermStore
 
 def _ensure_store():
@@ -275,8 +738,7 @@ def _pick_csv_for_meeting(meeting_id: str) -> str | None:
     return newest_glossify_csv(base)
 
 def _set_stop_status(meeting_id: str, **kw):
-    with _STOP_LOCK:
-        _STOP_STATUS[meeting_id] = {**(_STOP_STATUS.get(meeting_id) or {}), **kw}
+    STATE.set_stop_status(meeting_id, **kw)
 
 @app.post("/meeting/<meeting_id>/stop")
 def stop_and_upsert(meeting_id: str):
@@ -286,6 +748,10 @@ def stop_and_upsert(meeting_id: str):
     응답은 즉시 ACK, 실제 upsert는 백그라운드 실행.
     완료/에러 결과는 WebSocket 'cosmos_upsert_done' / 'cosmos_upsert_error' 로 room에 브로드캐스트.
     """
+    # glossify CSV는 meeting 소유 워커의 디스크에 있음
+    owner = _meeting_owner(meeting_id)
+    if owner != WORKER_URL:
+        return _forward_to_owner(owner)
     data = _read_payload() or {}
     csv_path = (data.get("csv_path") or "").strip() or _pick_csv_for_meeting(meeting_id)
     if not csv_path or not os.path.exists(csv_path):
@@ -296,14 +762,17 @@ def stop_and_upsert(meeting_id: str):
                      csv_path=csv_path,
                      upserted=0,
                      error=None,
-                     started_at=_now_iso_z(),
+                     started_at=now_iso_z(),
                      ended_at=None)
 
     def _worker():
         try:
-            store = _ensure_store()
-            n = store.upsert_from_csv(csv_path)
-            _set_stop_status(meeting_id, status="done", upserted=n, ended_at=_now_iso_z())
+            # psycopg2는 C 확장 블로킹 → gevent patch 시 네이티브 스레드풀에서 실행 (허브 보호)
+            flush_logs()   # 버퍼에 남은 설명 CSV 행까지 반영
+            n = gevent_mode.run_blocking(lambda: _ensure_store().upsert_from_csv(csv_path))
+            _set_stop_status(meeting_id, status="done", upserted=n, ended_at=now_iso_z())
+            STATE.end_meeting(meeting_id, WORKER_URL)   # 회의 종료: 링버퍼/중복 판정 상태 해제 + 소유권 반납
+            _release_agent(meeting_id)        # 에이전트 정지 + meeting 메트릭 삭제
             # WebSocket notify
             sio.emit("cosmos_upsert_done", {
                 "meeting_id": meeting_id,
@@ -312,7 +781,7 @@ def stop_and_upsert(meeting_id: str):
             }, to=meeting_id)
             print(f"[COSMOS][{meeting_id}] upsert done: {n} rows from {csv_path}")
         except Exception as e:
-            _set_stop_status(meeting_id, status="error", error=str(e), ended_at=_now_iso_z())
+            _set_stop_status(meeting_id, status="error", error=str(e), ended_at=now_iso_z())
             sio.emit("cosmos_upsert_error", {
                 "meeting_id": meeting_id,
                 "csv_path": csv_path,
@@ -320,12 +789,12 @@ def stop_and_upsert(meeting_id: str):
             }, to=meeting_id)
             print(f"[COSMOS][{meeting_id}] upsert error: {e}")
 
-    threading.Thread(target=_worker, name=f"cosmos-upsert-{meeting_id}", daemon=True).start()
+    sio.start_background_task(_worker)
     return jsonify({"status": "accepted", "csv_path": csv_path})
 
 @app.get("/meeting/<meeting_id>/stop/status")
 def stop_status(meeting_id: str):
-    return jsonify(_STOP_STATUS.get(meeting_id) or {"status": "idle"})
+    return jsonify(STATE.get_stop_status(meeting_id) or {"status": "idle"})
 
 # 프론트(Teams Side Panel)에서 호출 예시
 # Stop 버튼 클릭 →
@@ -346,6 +815,11 @@ def ws_join(data):
         return
     join_room(meeting_id)
     emit("ack", {"message": "joined", "meeting_id": meeting_id, "user_id": user_id, "user_name": user_name})
+    # 늦게 들어온/재접속 클라이언트: 링버퍼 재생 (since=<마지막으로 받은 seq>, replay=false면 생략)
+    if as_bool((data or {}).get("replay", True), default=True):
+        replay = _replay_payload(meeting_id, (data or {}).get("since"))
+        if replay["items"]:
+            emit("terms", replay)
 
 @sio.on("leave")
 def ws_leave(data):
@@ -354,12 +828,86 @@ def ws_leave(data):
         leave_room(meeting_id)
         emit("ack", {"message": "left", "meeting_id": meeting_id})
 
+@sio.on("stt")
+def ws_stt(data):
+    """
+    지속 연결 STT 생산자용: {"meeting_id", "items": [...]} 또는 단건 {"meeting_id", "text", ...}
+    결과는 Socket.IO ack로 반환 (/stt/batch 응답과 동일)
+    """
+    data = data or {}
+    meeting_id = data.get("meeting_id")
+    if not meeting_id:
+        return {"error": "meeting_id required"}
+    items = data["items"] if isinstance(data.get("items"), list) else [data]
+    if len(items) > STT_BATCH_MAX:
+        return {"error": f"too many items (max {STT_BATCH_MAX})"}
+    owner = STATE.claim_meeting(meeting_id, WORKER_URL, ttl=OWNER_TTL_SEC)
+    if owner != WORKER_URL:
+        try:
+            r = requests.post(f"{owner}/meeting/{meeting_id}/stt/batch", json=items,
+                              headers={FORWARD_HEADER: WORKER_URL}, timeout=(3, 30))
+            return r.json()
+        except Exception as e:
+            print(f"[server] ws stt forward to {owner} failed: {e}")
+            return {"status": "error", "error": "owner unreachable", "owner": owner}
+    return _ingest_items(meeting_id, [d for d in items if isinstance(d, dict)])
+
 @sio.on("ping")
 def ws_ping(_data=None):
-    emit("pong", {"t": _now_iso_z()})
+    emit("pong", {"t": now_iso_z()})
+
+# ------------------- App factory -------------------
+_STARTED = False
+_START_LOCK = threading.Lock()
+
+def _prewarm_agent():
+    from glossify_agent import prewarm_foundry   # 무거운 SDK import도 요청 경로 밖(백그라운드)에서
+    prewarm_foundry()
+
+def create_app():
+    """
+    프로세스당 1회 초기화 후 Flask app 반환 (이후 호출은 바로 반환)
+    - 설정 확인(LANGUAGE_KEY/ENDPOINT), tracing, NER/STT 로그 파일
+    - 백그라운드: 소유권 갱신, NER 재처리 저널, 에이전트 풀 / Foundry 예열
+    """
+    global _STARTED
+    with _START_LOCK:
+        if _STARTED:
+            return app
+        check_ner_config()
+        _STARTED = True
+        init_tracing()   # TRACE_EXPORTER / APPLICATIONINSIGHTS_CONNECTION_STRING 설정 시에만 span 기록
+        if sio.async_mode.startswith("gevent"):
+            if gevent_mode.is_patched():
+                gevent_mode.start_block_detector()
+            else:
+                print("[socketio] ⚠️ gevent mode without monkey-patching: blocking I/O will stall the hub (GEVENT_PATCH=0?)")
+        # 초기 로그 파일 준비 (reloader 중복 생성 방지하려면 app.run(use_reloader=False) 권장)
+        init_ner_log()
+        init_stt_log()
+        sio.start_background_task(_renew_ownership_loop)
+        sio.start_background_task(_ner_replay_loop)
+        if AGENT_POOL is not None:
+            AGENT_POOL.start()
+            sio.start_background_task(_agent_pool_loop)
+        elif AGENT_AUTOSTART:
+            # 웹 프로세스 내 AgentService 모드: 공유 Foundry client 예열 (풀 모드는 워커 프로세스가 각자 예열)
+            sio.start_background_task(_prewarm_agent)
+    return app
+
+# 'server:app'으로 띄운 경우: 첫 요청(HTTP/Socket.IO 공통)에서 create_app()
+_wsgi_app = app.wsgi_app
+
+def _startup_on_first_request(environ, start_response):
+    if not _STARTED:
+        create_app()
+    return _wsgi_app(environ, start_response)
+
+app.wsgi_app = _startup_on_first_request
 
 # ------------------- 서버 시작 -------------------
 if __name__ == "__main__":
+    create_app()
     port = int(os.getenv("PORT", 5000))
     # 개발 편의: reloader가 로그 파일을 두 번 만들지 않게 하려면 use_reloader=False 권장
     # app.run(host="0.0.0.0", port=port, debug=True, use_reloader=False)
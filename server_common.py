@@ -0,0 +1,163 @@
+# server_common.py
+# server.py(Flask + Flask-SocketIO)와 asgi_server.py(FastAPI + python-socketio)가 공유하는 프레임워크 무관 헬퍼
+# - 시각/불리언 파싱, 요청 바디 → dict (JSON → raw JSON → form/urlencoded), STT 항목 필드 (+ epoch)
+# - /terms 페이로드 → 정규화된 용어 항목 (+ trace_id), 룸 배치 분할, E2E 지연 기록
+# - 느린 WS 클라이언트 분류 (끊을 대상 / 이번 emit에서 건너뛸 대상)
+# - 이 프로세스의 meeting 소유자 ID(WORKER_URL) 결정
+# 실제 emit/disconnect는 각 진입점이 동기/비동기 방식에 맞게 수행
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from metrics_registry import E2E_LATENCY
+from tracing import trace_id_of
+
+# ---- WS 브로드캐스트 설정 ----
+# 룸별 coalescing: WS_BATCH_WINDOW_MS 안에 들어온 용어들을 'terms' 이벤트 1개로 합쳐 전송 (0 = 즉시 전송)
+WS_BATCH_WINDOW_MS   = float(os.getenv("WS_BATCH_WINDOW_MS", "100"))
+WS_BATCH_MAX_ITEMS   = int(os.getenv("WS_BATCH_MAX_ITEMS", "32"))
+# 느린 클라이언트 보호: engine.io 송신 큐가 이 이상 쌓인 클라이언트는 건너뛰고, DISCONNECT 이상이면 끊음
+WS_CLIENT_MAX_QUEUE  = int(os.getenv("WS_CLIENT_MAX_QUEUE", "64"))
+WS_CLIENT_DISCONNECT_QUEUE = int(os.getenv("WS_CLIENT_DISCONNECT_QUEUE", "256"))
+
+TERM_FIELDS = ("timestamp", "entity", "domain", "body", "stream_id")
+
+
+# ---- 소유자 ID ----
+def resolve_worker_url(shared_state: bool) -> str:
+    """
+    이 프로세스를 다른 워커가 찾아올 수 있는 주소 (= meeting 소유자 ID).
+    WORKER_URL 미설정 시 기본값(BACKEND_BASE_URL/localhost:5000)은 같은 호스트의 모든 프로세스가 같으므로
+    공유 상태 백엔드(Redis)에서는 여러 프로세스가 서로를 소유자로 착각함 → 기동 거부
+    """
+    url = (os.getenv("WORKER_URL") or "").strip()
+    if not url and shared_state:
+        raise RuntimeError("WORKER_URL must be set per process when STATE_BACKEND_URL is shared "
+                           "(the default BACKEND_BASE_URL/localhost address is identical across processes)")
+    return (url or os.getenv("BACKEND_BASE_URL") or "http://localhost:5000").rstrip("/")
+
+
+# ---- 값 파싱 ----
+def as_bool(v, default=False):
+    if isinstance(v, bool):
+        return v
+    if isinstance(v, (int, float)):
+        return v != 0
+    if isinstance(v, str):
+        return v.strip().lower() in {"1", "true", "t", "y", "yes"}
+    return default
+
+def now_iso_z() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+def parse_iso(ts) -> Optional[float]:
+    """ISO8601(…Z 포함) → epoch seconds. 실패 시 None"""
+    try:
+        return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def parse_payload(raw: str, form: Optional[dict] = None) -> dict:
+    """
+    JSON 파싱이 안 된(Content-Type 누락 등) 요청 바디 → dict.
+    raw JSON 재시도 → 프레임워크가 파싱한 form → raw를 urlencoded로 해석 순
+    """
+    if raw:
+        try:
+            parsed = json.loads(raw)
+            if isinstance(parsed, dict):
+                return parsed
+        except ValueError:
+            pass
+    if form:
+        return dict(form)
+    if raw and "=" in raw:
+        return dict(parse_qsl(raw.strip(), keep_blank_values=True))
+    return {}
+
+
+# ---- STT 항목 ----
+def stt_fields(data: dict) -> tuple:
+    """
+    STT 페이로드 1건 → (text, is_final, timestamp, speaker, seq). seq가 정수가 아니면 None (텍스트 중복 검사로 대체)
+    epoch(선택): 생산자가 재시작해 seq를 처음부터 다시 매길 때 바꾸는 값 → speaker 스트림 키에 포함되어 새 seq 윈도 사용
+    """
+    text = (data.get("text") or "").strip()
+    is_final = as_bool(data.get("is_final", True), default=True)
+    ts = data.get("timestamp") or now_iso_z()
+    speaker = str(data.get("speaker") or "")
+    if data.get("epoch") not in (None, ""):
+        speaker = f"{speaker}@{data['epoch']}"
+    try:
+        seq = int(data["seq"]) if data.get("seq") is not None else None
+    except (TypeError, ValueError):
+        seq = None
+    return text, is_final, ts, speaker, seq
+
+
+# ---- 용어 항목 ----
+def terms_from_payload(data: dict) -> Optional[list]:
+    """/terms 바디 → 항목 리스트 ({"items": [...]} 또는 단건 필드). 없으면 None"""
+    items = data.get("items")
+    if not items:   # 단건도 허용
+        maybe = {k: data.get(k) for k in TERM_FIELDS}
+        if any(maybe.values()):
+            items = [maybe]
+    return items if items and isinstance(items, list) else None
+
+def normalize_terms(items: list, trace: Optional[str] = None) -> list:
+    """timestamp 기본값 / 필수 필드 보정 (entity/body 없는 항목 제외), trace가 있으면 trace_id 부여"""
+    tid = trace_id_of(trace) if trace else None
+    out = []
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        ent = (it.get("entity") or "").strip()
+        body = (it.get("body") or "").strip()
+        if not ent or not body:
+            continue
+        term = {"timestamp": it.get("timestamp") or now_iso_z(), "entity": ent,
+                "domain": (it.get("domain") or "-").strip(), "body": body}
+        if it.get("stream_id"):
+            term["stream_id"] = it["stream_id"]   # terms_delta 스트림의 최종본
+        if tid:
+            term["trace_id"] = tid
+        out.append(term)
+    return out
+
+
+# ---- 룸 배치 ----
+def batch_chunks(buf: List[tuple], max_items: int = WS_BATCH_MAX_ITEMS) -> Iterator[Tuple[list, list]]:
+    """룸 버퍼 [(item, trace)] → emit 단위 (items, traces) 묶음"""
+    for i in range(0, len(buf), max(1, max_items)):
+        chunk = buf[i:i + max_items]
+        yield [it for it, _ in chunk], [tr for _, tr in chunk]
+
+def observe_e2e(meeting_id: str, items: Iterable[dict]):
+    """E2E: 용어의 STT timestamp → 브로드캐스트 시각 (STT 생산자 시계 기준)"""
+    now = time.time()
+    for it in items:
+        t_stt = parse_iso(it.get("timestamp"))
+        if t_stt is not None and now >= t_stt:
+            E2E_LATENCY.labels(meeting_id).observe(now - t_stt)
+
+
+# ---- 느린 클라이언트 ----
+def classify_laggards(participants: Iterable[tuple], eio_sockets: dict) -> Tuple[List[tuple], List[str]]:
+    """
+    룸 참가자 [(sid, eio_sid)] → (끊을 [(sid, backlog)], 건너뛸 [sid]).
+    backlog = engine.io 소켓 송신 큐 길이
+    """
+    kick, skip = [], []
+    for sid, eio_sid in list(participants):
+        sock = eio_sockets.get(eio_sid)
+        backlog = sock.queue.qsize() if sock is not None else 0
+        if backlog >= WS_CLIENT_DISCONNECT_QUEUE:
+            kick.append((sid, backlog))
+        elif backlog >= WS_CLIENT_MAX_QUEUE:
+            skip.append(sid)
+    return kick, skip
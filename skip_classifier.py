@@ -0,0 +1,215 @@
+# skip_classifier.py
+# 에이전트 호출 전에 '__SKIP__'될 엔티티를 거르는 경량 로컬 분류기
+# - 문자 n-gram + 카테고리/확신도/토큰/문맥 특징 → 로지스틱 회귀 (순수 파이썬, 추가 의존성 없음)
+# - 학습 데이터: agent_results/decisions_*.csv (AgentService가 기록하는 explain/skip 결과)
+#               + (선택) agent_results/glossify_*.csv (설명된 엔티티 = 양성 'explain')
+# - 모델은 JSON 가중치 파일로 저장 → AgentService가 SKIP_MODEL_PATH로 로드
+#
+# 사용 예:
+#   python skip_classifier.py train --out skip_model.json
+#   python skip_classifier.py eval  --model skip_model.json --holdout agent_results/decisions_20250915_101010.csv
+
+import os
+import csv
+import glob
+import json
+import math
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DECISION_HEADER = ["timestamp", "category", "entity", "confidence", "context", "outcome"]
+OUTCOME_SKIP    = "skip"
+OUTCOME_EXPLAIN = "explain"
+# 분류기가 에이전트 호출 전에 거른 엔티티 (감사/재평가용 기록, 정답 라벨이 아니므로 학습에서 제외)
+OUTCOME_MODEL_SKIP = "model_skip"
+
+CONTEXT_RADIUS = int(os.getenv("DECISION_CONTEXT_RADIUS", "40"))
+
+# ---------------------- 특징 추출 ----------------------
+def context_window(entity: str, source_text: str, radius: int = CONTEXT_RADIUS) -> str:
+    """source_text에서 엔티티 주변 ±radius 글자만 잘라냄 (없으면 앞부분)"""
+    src = source_text or ""
+    i = src.find(entity) if entity else -1
+    if i < 0:
+        return src[:2 * radius]
+    return src[max(0, i - radius): i + len(entity) + radius]
+
+def _char_ngrams(s: str, lo: int = 2, hi: int = 4) -> Iterable[str]:
+    s = f"^{s}$"
+    for n in range(lo, hi + 1):
+        for i in range(len(s) - n + 1):
+            yield s[i:i + n]
+
+def extract_features(entity: str, category: str, confidence: float, context: str = "") -> Dict[str, float]:
+    ent = (entity or "").strip()
+    low = ent.lower()
+    feats: Dict[str, float] = {"bias": 1.0}
+    for g in _char_ngrams(low):
+        feats["ng:" + g] = feats.get("ng:" + g, 0.0) + 1.0
+    # 긴 엔티티가 n-gram 수만으로 점수를 독식하지 않도록 정규화
+    norm = 1.0 / math.sqrt(max(1, len(low)))
+    for k in list(feats):
+        if k.startswith("ng:"):
+            feats[k] *= norm
+
+    feats["cat:" + (category or "-")] = 1.0
+    feats["conf"] = float(confidence or 0.0)
+    feats["conf_bucket:%d" % int(float(confidence or 0.0) * 10)] = 1.0
+    toks = len(ent.replace("-", " ").replace("/", " ").split())
+    feats["toks:%d" % min(toks, 4)] = 1.0
+    feats["len:%d" % min(len(ent) // 3, 6)] = 1.0
+    if ent.isupper():
+        feats["is_upper"] = 1.0
+    if any(ch.isdigit() for ch in ent):
+        feats["has_digit"] = 1.0
+    if any(ch.isascii() and ch.isalpha() for ch in ent):
+        feats["has_latin"] = 1.0
+    if context:
+        feats["ctx_count:%d" % min(context.count(ent), 3)] = 1.0
+        for w in context.replace(ent, " ").split()[:12]:
+            feats["ctx:" + w.lower()[:8]] = 0.3
+    return feats
+
+# ---------------------- 모델 ----------------------
+class SkipClassifier:
+    """희소 특징 로지스틱 회귀. predict_proba = P(outcome == skip)."""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, threshold: float = 0.9):
+        self.w: Dict[str, float] = dict(weights or {})
+        self.threshold = threshold
+
+    def _score(self, feats: Dict[str, float]) -> float:
+        z = sum(self.w.get(k, 0.0) * v for k, v in feats.items())
+        z = max(-30.0, min(30.0, z))
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def predict_proba(self, entity: str, category: str, confidence: float, context: str = "") -> float:
+        return self._score(extract_features(entity, category, confidence, context))
+
+    def should_skip(self, entity: str, category: str, confidence: float, context: str = "") -> bool:
+        return self.predict_proba(entity, category, confidence, context) >= self.threshold
+
+    def fit(self, samples: List[Tuple[Dict[str, float], int]],
+            epochs: int = 15, lr: float = 0.2, l2: float = 1e-4, seed: int = 13):
+        rnd = random.Random(seed)
+        data = list(samples)
+        for ep in range(epochs):
+            rnd.shuffle(data)
+            step = lr / (1.0 + ep * 0.3)
+            for feats, y in data:
+                g = self._score(feats) - y
+                for k, v in feats.items():
+                    wk = self.w.get(k, 0.0)
+                    self.w[k] = wk - step * (g * v + l2 * wk)
+        # 사실상 0인 가중치 제거 → 파일 크기/로딩 시간 축소
+        self.w = {k: round(v, 5) for k, v in self.w.items() if abs(v) >= 1e-4}
+        return self
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "threshold": self.threshold, "weights": self.w}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, threshold: Optional[float] = None) -> "SkipClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        thr = threshold if threshold is not None else float(data.get("threshold", 0.9))
+        return cls(data.get("weights") or {}, threshold=thr)
+
+# ---------------------- 데이터 로딩 ----------------------
+def load_decisions(paths: Iterable[str]) -> List[dict]:
+    rows: List[dict] = []
+    for p in paths:
+        with open(p, "r", encoding="utf-8-sig", newline="") as f:
+            for r in csv.DictReader(f):
+                outcome = (r.get("outcome") or "").strip().lower()
+                if outcome not in (OUTCOME_SKIP, OUTCOME_EXPLAIN) or not (r.get("entity") or "").strip():
+                    continue
+                rows.append(r)
+    return rows
+
+def load_glossify_positives(paths: Iterable[str]) -> List[dict]:
+    """glossify_*.csv는 설명된 엔티티만 담고 있으므로 모두 'explain'으로 취급 (카테고리 정보 없음)"""
+    rows: List[dict] = []
+    for p in paths:
+        with open(p, "r", encoding="utf-8-sig", newline="") as f:
+            for r in csv.DictReader(f):
+                ent = (r.get("entity") or "").strip()
+                if ent:
+                    rows.append({"timestamp": r.get("timestamp", ""), "category": "", "entity": ent,
+                                 "confidence": "", "context": "", "outcome": OUTCOME_EXPLAIN})
+    return rows
+
+def _to_sample(r: dict) -> Tuple[Dict[str, float], int]:
+    try:
+        conf = float(r.get("confidence") or 0.0)
+    except ValueError:
+        conf = 0.0
+    feats = extract_features(r["entity"], r.get("category") or "", conf, r.get("context") or "")
+    return feats, 1 if r["outcome"].strip().lower() == OUTCOME_SKIP else 0
+
+def evaluate(model: SkipClassifier, rows: List[dict],
+             thresholds: Iterable[float] = (0.5, 0.7, 0.8, 0.9, 0.95)) -> List[dict]:
+    """skip 클래스 기준 precision/recall. precision이 낮으면 설명할 용어를 잃는다는 뜻."""
+    scored = [(model._score(f), y) for f, y in (_to_sample(r) for r in rows)]
+    report = []
+    for thr in thresholds:
+        tp = sum(1 for p, y in scored if p >= thr and y == 1)
+        fp = sum(1 for p, y in scored if p >= thr and y == 0)
+        fn = sum(1 for p, y in scored if p < thr and y == 1)
+        report.append({
+            "threshold": thr,
+            "precision": tp / (tp + fp) if (tp + fp) else 0.0,
+            "recall": tp / (tp + fn) if (tp + fn) else 0.0,
+            "dropped": tp + fp,
+            "lost_terms": fp,
+            "n": len(scored),
+        })
+    return report
+
+def _print_report(report: List[dict]):
+    print(f"{'thr':>5} {'precision':>9} {'recall':>7} {'dropped':>8} {'lost':>5} {'n':>6}")
+    for r in report:
+        print(f"{r['threshold']:>5.2f} {r['precision']:>9.3f} {r['recall']:>7.3f} "
+              f"{r['dropped']:>8d} {r['lost_terms']:>5d} {r['n']:>6d}")
+
+# ---------------- Optional CLI ----------------
+if __name__ == "__main__":
+    import argparse
+    base = os.getenv("AGENT_RESULTS_DIR", os.path.join(os.getcwd(), "agent_results"))
+    parser = argparse.ArgumentParser(description="Train/evaluate the pre-LLM skip classifier")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    tr = sub.add_parser("train")
+    tr.add_argument("--decisions", nargs="*", help="decisions_*.csv (default: all in $AGENT_RESULTS_DIR)")
+    tr.add_argument("--glossify", nargs="*", help="glossify_*.csv positives (default: none)")
+    tr.add_argument("--holdout-frac", type=float, default=0.2, help="시간순 마지막 비율을 평가용으로 분리")
+    tr.add_argument("--threshold", type=float, default=0.9)
+    tr.add_argument("--out", default=os.getenv("SKIP_MODEL_PATH", "skip_model.json"))
+
+    ev = sub.add_parser("eval")
+    ev.add_argument("--model", default=os.getenv("SKIP_MODEL_PATH", "skip_model.json"))
+    ev.add_argument("--holdout", nargs="+", required=True, help="held-out decisions_*.csv")
+    args = parser.parse_args()
+
+    if args.cmd == "train":
+        dec_paths = args.decisions or sorted(glob.glob(os.path.join(base, "decisions_*.csv")))
+        rows = load_decisions(dec_paths)
+        if not rows:
+            raise SystemExit(f"No decisions found. Run the agent with DECISION_LOG=1 first ({base}/decisions_*.csv)")
+        rows.sort(key=lambda r: r.get("timestamp") or "")
+        cut = int(len(rows) * (1.0 - args.holdout_frac))
+        train_rows, test_rows = rows[:cut], rows[cut:]
+        if args.glossify:
+            train_rows += load_glossify_positives(args.glossify)
+        model = SkipClassifier(threshold=args.threshold).fit([_to_sample(r) for r in train_rows])
+        model.save(args.out)
+        print(f"✅ trained on {len(train_rows)} rows ({sum(1 for r in train_rows if r['outcome'] == OUTCOME_SKIP)} skip) → {args.out}")
+        if test_rows:
+            print(f"[holdout] {len(test_rows)} rows")
+            _print_report(evaluate(model, test_rows))
+    else:
+        model = SkipClassifier.load(args.model)
+        _print_report(evaluate(model, load_decisions(args.holdout)))
@@ -0,0 +1,389 @@
+# state_backend.py
+# 서버 공유 상태 백엔드 (단일 프로세스 메모리 ↔ 멀티 프로세스/노드 Redis)
+# - 최종문 중복 방지(LAST_FINAL, seq 없는 STT), (meeting, speaker)별 seq 윈도(재전송 멱등/순서 뒤바뀜 허용), stop/upsert 상태(_STOP_STATUS), 용어 링버퍼(TERM_HISTORY),
+#   meeting → worker 소유권(에이전트는 소유 워커 1곳에서만 기동)
+# - STATE_BACKEND_URL: 비우거나 memory:// → MemoryBackend, redis://… → RedisBackend
+# - RedisBackend는 redis-py 호환 클라이언트를 주입받을 수 있음 (로컬 stand-in: fakeredis 등)
+# - Socket.IO 룸/emit 공유는 Flask-SocketIO message_queue(SOCKETIO_MESSAGE_QUEUE)가 담당
+
+import os
+import abc
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from term_history import TermHistory, TERM_HISTORY_MAX
+
+STATE_BACKEND_URL   = (os.getenv("STATE_BACKEND_URL") or "").strip()
+STATE_KEY_PREFIX    = os.getenv("STATE_KEY_PREFIX", "glossify")
+LAST_FINAL_MAX      = int(os.getenv("LAST_FINAL_MAX", "32"))
+OWNER_TTL_SEC       = int(os.getenv("MEETING_OWNER_TTL_SEC", "60"))
+STATE_TTL_SEC       = int(os.getenv("STATE_TTL_SEC", str(24 * 3600)))   # 회의 상태 키 만료
+STT_SEQ_WINDOW      = int(os.getenv("STT_SEQ_WINDOW", "64"))         # 최고 seq 기준 이만큼 뒤까지 늦게 와도 처리
+STT_SEQ_STREAMS_MAX = int(os.getenv("STT_SEQ_STREAMS_MAX", "4096"))  # 메모리 백엔드: (meeting, speaker) 스트림 LRU 상한
+# 최고 seq보다 이만큼 이상 뒤로 점프하면 늦은 재전송이 아니라 생산자 재시작(번호 재사용)으로 보고 윈도 초기화
+STT_SEQ_RESET_GAP   = int(os.getenv("STT_SEQ_RESET_GAP", str(4 * STT_SEQ_WINDOW)))
+
+
+def _norm_text(text: str) -> str:
+    """공백 차이만 있는 재전송을 같은 문장으로 취급"""
+    return " ".join(text.split())
+
+def _text_digest(text: str) -> str:
+    """seq ACK와 함께 저장하는 짧은 문장 지문 (빈 문자열 = 비교 안 함)"""
+    return hashlib.sha1(_norm_text(text).encode("utf-8")).hexdigest()[:12] if text else ""
+
+
+class SeqWindow:
+    """
+    (meeting, speaker) 스트림 1개의 처리 기록 (anti-replay 윈도)
+      hi   : 지금까지 본 최고 seq
+      acks : (seq, is_final) → (문장 지문, ACK dict) (처리 중이면 ACK None). hi - STT_SEQ_WINDOW 이하는 버림
+    생산자 재시작(epoch 없이 seq 재사용)으로 보고 윈도를 비운 뒤 처리하는 경우:
+      - hi보다 STT_SEQ_RESET_GAP 이상 작은 seq
+      - 이미 본 seq인데 문장 지문이 다름
+    """
+    __slots__ = ("hi", "acks")
+
+    def __init__(self):
+        self.hi = None
+        self.acks: dict = {}
+
+    def _reset(self):
+        self.hi = None
+        self.acks.clear()
+
+    def claim(self, seq: int, final: bool, digest: str = "",
+              window: int = STT_SEQ_WINDOW, reset_gap: int = STT_SEQ_RESET_GAP):
+        if self.hi is not None and seq <= self.hi - window:
+            if self.hi - seq < reset_gap:
+                return "stale", None
+            self._reset()
+        key = (seq, final)
+        hit = self.acks.get(key)
+        if hit is not None:
+            if not (digest and hit[0] and hit[0] != digest):
+                return "dup", hit[1]
+            self._reset()
+        self.acks[key] = (digest, None)
+        if self.hi is None or seq > self.hi:
+            self.hi = seq
+            for k in [k for k in self.acks if k[0] <= seq - window]:
+                del self.acks[k]
+        return "new", None
+
+    def done(self, seq: int, final: bool, ack: dict):
+        hit = self.acks.get((seq, final))
+        if hit is not None:
+            self.acks[(seq, final)] = (hit[0], ack)
+
+
+class StateBackend(abc.ABC):
+    """공유 상태 인터페이스"""
+
+    # --- 최종문 중복 방지 ---
+    @abc.abstractmethod
+    def seen_final(self, meeting_id: str, text: str) -> bool:
+        """text가 최근 최종문에 있으면 True, 없으면 기록하고 False (check-and-add)"""
+
+    # --- seq 멱등/재정렬 윈도 ---
+    @abc.abstractmethod
+    def seq_claim(self, meeting_id: str, speaker: str, seq: int, final: bool,
+                  text: str = "") -> Tuple[str, Optional[dict]]:
+        """
+        ("new", None): 처음 보는 seq (또는 같은 seq에 다른 text → 재시작으로 보고 윈도 초기화) → 처리 후 seq_done() 호출
+        ("dup", ack) : 이미 처리(ack) 또는 처리 중(None)
+        ("stale", None): 윈도(STT_SEQ_WINDOW)보다 오래된 seq
+        """
+    @abc.abstractmethod
+    def seq_done(self, meeting_id: str, speaker: str, seq: int, final: bool, ack: dict): ...
+
+    # --- stop/upsert 상태 ---
+    @abc.abstractmethod
+    def set_stop_status(self, meeting_id: str, **kw): ...
+    @abc.abstractmethod
+    def get_stop_status(self, meeting_id: str) -> Optional[dict]: ...
+
+    # --- 용어 링버퍼 ---
+    @abc.abstractmethod
+    def history_append(self, meeting_id: str, items: List[dict]) -> List[dict]: ...
+    @abc.abstractmethod
+    def history_since(self, meeting_id: str, cursor: Optional[int] = None,
+                      limit: Optional[int] = None) -> Tuple[List[dict], int, bool]: ...
+    @abc.abstractmethod
+    def history_drop(self, meeting_id: str):
+        """회의 종료(stop/upsert 완료): 링버퍼와 커서 삭제"""
+
+    # --- meeting 소유권 ---
+    @abc.abstractmethod
+    def claim_meeting(self, meeting_id: str, owner: str, ttl: int = OWNER_TTL_SEC) -> str:
+        """비어 있으면 owner로 점유. 현재 소유자 반환 (== owner 이면 점유 성공)"""
+    @abc.abstractmethod
+    def renew_meeting(self, meeting_id: str, owner: str, ttl: int = OWNER_TTL_SEC) -> bool: ...
+    @abc.abstractmethod
+    def release_meeting(self, meeting_id: str, owner: str): ...
+
+    # --- 회의 종료 ---
+    def end_meeting(self, meeting_id: str, owner: str):
+        """회의 종료(stop/upsert 완료): 링버퍼 삭제 + 소유권 반납. stop 상태는 조회용으로 남김 (TTL로 만료)"""
+        self.history_drop(meeting_id)
+        self.release_meeting(meeting_id, owner)
+
+
+# ---------------- 메모리 (단일 프로세스, 기본) ----------------
+class MemoryBackend(StateBackend):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._finals: dict = {}
+        self._seqs: OrderedDict = OrderedDict()   # (meeting_id, speaker) -> SeqWindow (LRU)
+        self._stop: OrderedDict = OrderedDict()   # meeting_id -> (status, updated_at), 오래된 순 (STATE_TTL_SEC 후 삭제)
+        self._owners: dict = {}      # meeting_id -> (owner, expires_at)
+        self._history = TermHistory()
+
+    def seen_final(self, meeting_id, text):
+        with self._lock:
+            recent = self._finals.get(meeting_id)
+            if recent is None:
+                recent = self._finals[meeting_id] = OrderedDict()   # 삽입 순서 = 오래된 순, O(1) 조회
+            key = _norm_text(text)
+            if key in recent:
+                return True
+            recent[key] = None
+            if len(recent) > LAST_FINAL_MAX:
+                recent.popitem(last=False)
+            return False
+
+    def seq_claim(self, meeting_id, speaker, seq, final, text=""):
+        digest = _text_digest(text)
+        with self._lock:
+            win = self._seqs.get((meeting_id, speaker))
+            if win is None:
+                win = self._seqs[(meeting_id, speaker)] = SeqWindow()
+                if len(self._seqs) > STT_SEQ_STREAMS_MAX:
+                    self._seqs.popitem(last=False)
+            else:
+                self._seqs.move_to_end((meeting_id, speaker))
+            return win.claim(seq, final, digest)
+
+    def seq_done(self, meeting_id, speaker, seq, final, ack):
+        with self._lock:
+            win = self._seqs.get((meeting_id, speaker))
+            if win is not None:
+                win.done(seq, final, ack)
+
+    def set_stop_status(self, meeting_id, **kw):
+        now = time.time()
+        with self._lock:
+            cur = self._stop.pop(meeting_id, None)
+            self._stop[meeting_id] = ({**(cur[0] if cur else {}), **kw}, now)
+            while self._stop:            # Redis 키 만료(STATE_TTL_SEC)와 같은 수명
+                mid, (_, at) = next(iter(self._stop.items()))
+                if now - at <= STATE_TTL_SEC:
+                    break
+                del self._stop[mid]
+
+    def get_stop_status(self, meeting_id):
+        with self._lock:
+            cur = self._stop.get(meeting_id)
+            return dict(cur[0]) if cur else None
+
+    def history_append(self, meeting_id, items):
+        return self._history.append(meeting_id, items)
+
+    def history_since(self, meeting_id, cursor=None, limit=None):
+        return self._history.since(meeting_id, cursor, limit=limit)
+
+    def history_drop(self, meeting_id):
+        self._history.drop(meeting_id)
+
+    def end_meeting(self, meeting_id, owner):
+        super().end_meeting(meeting_id, owner)
+        with self._lock:
+            self._finals.pop(meeting_id, None)
+            for k in [k for k in self._seqs if k[0] == meeting_id]:
+                del self._seqs[k]
+
+    def claim_meeting(self, meeting_id, owner, ttl=OWNER_TTL_SEC):
+        now = time.time()
+        with self._lock:
+            cur = self._owners.get(meeting_id)
+            if cur is None or cur[1] <= now:
+                if cur is None:          # 새 meeting 점유 시에만: stop 없이 끝나 만료된 소유권 정리
+                    for mid in [m for m, (_, exp) in self._owners.items() if exp <= now]:
+                        del self._owners[mid]
+                self._owners[meeting_id] = (owner, now + ttl)
+                return owner
+            return cur[0]
+
+    def renew_meeting(self, meeting_id, owner, ttl=OWNER_TTL_SEC):
+        with self._lock:
+            cur = self._owners.get(meeting_id)
+            if cur and cur[0] == owner:
+                self._owners[meeting_id] = (owner, time.time() + ttl)
+                return True
+            return False
+
+    def release_meeting(self, meeting_id, owner):
+        with self._lock:
+            cur = self._owners.get(meeting_id)
+            if cur and cur[0] == owner:
+                del self._owners[meeting_id]
+
+
+# ---------------- Redis (멀티 프로세스/노드) ----------------
+class RedisBackend(StateBackend):
+    """
+    키 구조 (prefix 기본 'glossify'):
+      {p}:final:{mid}    ZSET  sha1(공백 정규화 text) → 기록시각  (최근 LAST_FINAL_MAX개 유지)
+      {p}:seq:{mid}:{spk} HASH  hi → 최고 seq, "{seq}:f|p" → "{문장 지문}|{ACK JSON}" (ACK "" = 처리 중). 윈도 밖 필드는 hi 갱신 시 삭제
+      {p}:stop:{mid}     STRING JSON
+      {p}:hist:{mid}     LIST  JSON item (최근 TERM_HISTORY_MAX개)
+      {p}:hist_seq:{mid} INCR  커서
+      {p}:owner:{mid}    STRING owner (EX ttl)
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = STATE_KEY_PREFIX):
+        if client is None:
+            import redis  # 선택 의존성: Redis 백엔드 사용 시에만 필요
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.r = client
+        self.p = prefix
+
+    def _k(self, kind: str, mid: str) -> str:
+        return f"{self.p}:{kind}:{mid}"
+
+    @staticmethod
+    def _s(v) -> str:
+        return v.decode("utf-8") if isinstance(v, bytes) else v
+
+    def seen_final(self, meeting_id, text):
+        key = self._k("final", meeting_id)
+        member = hashlib.sha1(_norm_text(text).encode("utf-8")).hexdigest()
+        pipe = self.r.pipeline()
+        pipe.zadd(key, {member: time.time()}, nx=True)
+        pipe.zremrangebyrank(key, 0, -(LAST_FINAL_MAX + 1))
+        pipe.expire(key, STATE_TTL_SEC)
+        added, _, _ = pipe.execute()
+        return not added
+
+    def _seq_key(self, meeting_id, speaker, seq, final):
+        return self._k("seq", f"{meeting_id}:{speaker}"), f"{seq}:{'f' if final else 'p'}"
+
+    @staticmethod
+    def _seq_val(raw) -> Tuple[str, str]:
+        """필드 값 → (문장 지문, ACK JSON). 지문 없는 이전 형식(ACK JSON 그대로)도 허용"""
+        digest, sep, ack = (raw or "").partition("|")
+        if not sep or digest.startswith("{"):
+            return "", raw or ""
+        return digest, ack
+
+    def seq_claim(self, meeting_id, speaker, seq, final, text=""):
+        key, field = self._seq_key(meeting_id, speaker, seq, final)
+        digest = _text_digest(text)
+        hi = self.r.hget(key, "hi")
+        hi = int(self._s(hi)) if hi is not None else None
+        if hi is not None and seq <= hi - STT_SEQ_WINDOW:
+            if hi - seq < STT_SEQ_RESET_GAP:
+                return "stale", None
+            self.r.delete(key)      # 새 epoch (생산자 재시작) → 윈도 초기화
+            hi = None
+        if not self.r.hsetnx(key, field, f"{digest}|"):
+            seen, raw = self._seq_val(self._s(self.r.hget(key, field)))
+            if not (digest and seen and seen != digest):
+                return "dup", (json.loads(raw) if raw else None)
+            self.r.delete(key)      # 같은 seq에 다른 문장 → 생산자 재시작 → 윈도 초기화
+            hi = None
+            if not self.r.hsetnx(key, field, f"{digest}|"):    # 동시에 다른 요청이 먼저 점유
+                return "dup", None
+        if hi is None or seq > hi:
+            # hi 경합(동시 도착)은 윈도 폭 대비 무시 가능. 필드 수 ≤ 2 * STT_SEQ_WINDOW 라 HKEYS 비용 작음
+            self.r.hset(key, "hi", seq)
+            old = [f for f in map(self._s, self.r.hkeys(key))
+                   if f != "hi" and int(f.split(":", 1)[0]) <= seq - STT_SEQ_WINDOW]
+            if old:
+                self.r.hdel(key, *old)
+        self.r.expire(key, STATE_TTL_SEC)
+        return "new", None
+
+    def seq_done(self, meeting_id, speaker, seq, final, ack):
+        key, field = self._seq_key(meeting_id, speaker, seq, final)
+        raw = self.r.hget(key, field)
+        if raw is not None:
+            digest, _ = self._seq_val(self._s(raw))
+            self.r.hset(key, field, f"{digest}|{json.dumps(ack, ensure_ascii=False)}")
+
+    def set_stop_status(self, meeting_id, **kw):
+        cur = self.get_stop_status(meeting_id) or {}
+        self.r.set(self._k("stop", meeting_id), json.dumps({**cur, **kw}, ensure_ascii=False), ex=STATE_TTL_SEC)
+
+    def get_stop_status(self, meeting_id):
+        raw = self.r.get(self._k("stop", meeting_id))
+        return json.loads(self._s(raw)) if raw else None
+
+    def history_append(self, meeting_id, items):
+        if not items:
+            return []
+        last = self.r.incrby(self._k("hist_seq", meeting_id), len(items))
+        first = last - len(items) + 1
+        stamped = [{**it, "seq": first + i} for i, it in enumerate(items)]
+        key = self._k("hist", meeting_id)
+        pipe = self.r.pipeline()
+        pipe.rpush(key, *[json.dumps(it, ensure_ascii=False) for it in stamped])
+        pipe.ltrim(key, -TERM_HISTORY_MAX, -1)
+        pipe.expire(key, STATE_TTL_SEC)
+        pipe.expire(self._k("hist_seq", meeting_id), STATE_TTL_SEC)
+        pipe.execute()
+        return stamped
+
+    def history_since(self, meeting_id, cursor=None, limit=None):
+        raw = self.r.lrange(self._k("hist", meeting_id), 0, -1)
+        last = int(self._s(self.r.get(self._k("hist_seq", meeting_id))) or 0)
+        ring = [json.loads(self._s(x)) for x in raw]
+        if not ring:
+            return [], last, False
+        first_seq = ring[0]["seq"]
+        c = cursor or 0
+        items = [it for it in ring if it["seq"] > c] if c >= first_seq else ring
+        truncated = cursor is not None and cursor + 1 < first_seq
+        if limit is not None and len(items) > limit:
+            items, truncated = items[-limit:], True
+        return items, last, truncated
+
+    def history_drop(self, meeting_id):
+        self.r.delete(self._k("hist", meeting_id), self._k("hist_seq", meeting_id))
+
+    def end_meeting(self, meeting_id, owner):
+        super().end_meeting(meeting_id, owner)
+        self.r.delete(self._k("final", meeting_id))     # seq 윈도 키(speaker별)는 STATE_TTL_SEC로 만료
+
+    def claim_meeting(self, meeting_id, owner, ttl=OWNER_TTL_SEC):
+        key = self._k("owner", meeting_id)
+        if self.r.set(key, owner, nx=True, ex=ttl):
+            return owner
+        cur = self._s(self.r.get(key))
+        if cur is None:   # 그 사이 만료됨 → 한 번 더 시도
+            return owner if self.r.set(key, owner, nx=True, ex=ttl) else self._s(self.r.get(key)) or ""
+        return cur
+
+    def renew_meeting(self, meeting_id, owner, ttl=OWNER_TTL_SEC):
+        # GET→EXPIRE 사이 경합은 ttl 주기(수십 초) 대비 무시 가능 (Lua 불필요 → stand-in 호환)
+        key = self._k("owner", meeting_id)
+        if self._s(self.r.get(key)) == owner:
+            return bool(self.r.expire(key, ttl))
+        return False
+
+    def release_meeting(self, meeting_id, owner):
+        key = self._k("owner", meeting_id)
+        if self._s(self.r.get(key)) == owner:
+            self.r.delete(key)
+
+
+def make_backend(url: str = STATE_BACKEND_URL) -> StateBackend:
+    if not url or url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"unsupported STATE_BACKEND_URL: {url}")
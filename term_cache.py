@@ -0,0 +1,134 @@
+# term_cache.py
+# 에이전트가 '__SKIP__'(또는 본문 없음)으로 거절한 용어의 negative cache
+# - 키: (canonicalize_term(term), category) → 철자/대소문자 차이는 같은 키
+#   AgentService는 alias 키(alias_index.alias_key, 구분자 제거 + 변형 병합)를 넘김 → 파일에 키 방식("key") 기록,
+#   예전(version 1, canonicalize_term 키) 파일은 로드 시 alias 키로 변환해 계속 적중
+# - LRU 상한(NEG_CACHE_MAX) + 항목별 TTL(NEG_CACHE_TTL_SEC)
+# - 선택적 영속화(NEG_CACHE_PATH): JSON 파일로 저장/복원, 프로세스 재시작 후에도 유지
+# - 프로세스 전역 1개(get_negative_cache) → 여러 meeting의 AgentService가 공유
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from cosmos_terms import canonicalize_term
+from alias_index import ALIAS_INDEX, alias_key
+
+NEG_CACHE_MAX      = int(os.getenv("NEG_CACHE_MAX", "20000"))
+NEG_CACHE_TTL_SEC  = float(os.getenv("NEG_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+NEG_CACHE_PATH     = os.getenv("NEG_CACHE_PATH", "").strip()   # 비우면 메모리 전용
+
+
+class NegativeCache:
+    """thread-safe LRU + TTL. 값은 만료 시각(wall clock, 영속화 때문에 time.time 기준)."""
+
+    def __init__(self, maxsize: int = NEG_CACHE_MAX, ttl_sec: float = NEG_CACHE_TTL_SEC,
+                 path: Optional[str] = None, alias_keys: bool = ALIAS_INDEX):
+        self.maxsize = maxsize
+        self.ttl_sec = ttl_sec
+        self.path = path or None
+        self.key_scheme = "alias" if alias_keys else "canonical"   # 호출자가 넘기는 키 형태 (영속 파일에 기록)
+        self._d: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.adds = 0
+        if self.path:
+            self.load()
+
+    @staticmethod
+    def _key(term: str, category: str) -> Tuple[str, str]:
+        return canonicalize_term(term), (category or "").strip()
+
+    def contains(self, term: str, category: str) -> bool:
+        key = self._key(term, category)
+        now = time.time()
+        with self._lock:
+            exp = self._d.get(key)
+            if exp is None:
+                self.misses += 1
+                return False
+            if exp <= now:
+                del self._d[key]
+                self._dirty = True
+                self.misses += 1
+                return False
+            self._d.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def add(self, term: str, category: str):
+        key = self._key(term, category)
+        if not key[0]:
+            return
+        with self._lock:
+            self._d[key] = time.time() + self.ttl_sec
+            self._d.move_to_end(key)
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+            self._dirty = True
+            self.adds += 1
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._d)
+        return {"size": size, "hits": self.hits, "misses": self.misses,
+                "adds": self.adds, "hit_rate": round(self.hit_rate(), 4)}
+
+    # ---------- 영속화 ----------
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[neg-cache] load fail: {e}")
+            return
+        now = time.time()
+        # version 1 파일은 canonicalize_term 키 → alias 키 사용 중이면 변환 (같은 키로 합쳐지면 늦은 만료 유지)
+        convert = self.key_scheme == "alias" and data.get("key", "canonical") != "alias"
+        with self._lock:
+            for term, cat, exp in data.get("items", []):
+                if exp > now:
+                    key = (alias_key(term) if convert else term, cat)
+                    if key[0] and exp > self._d.get(key, 0.0):
+                        self._d[key] = exp
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+            self._dirty = self._dirty or convert   # 변환본을 다음 save에 기록
+
+    def save(self, force: bool = False):
+        if not self.path or not (self._dirty or force):
+            return
+        now = time.time()
+        with self._lock:
+            items = [[t, c, exp] for (t, c), exp in self._d.items() if exp > now]
+            self._dirty = False
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 2, "key": self.key_scheme, "items": items}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)  # 원자적 교체
+        except Exception as e:
+            print(f"[neg-cache] save fail: {e}")
+
+
+_NEG_CACHE: Optional[NegativeCache] = None
+_NEG_CACHE_LOCK = threading.Lock()
+
+def get_negative_cache() -> NegativeCache:
+    """프로세스 전역 negative cache (lazy)"""
+    global _NEG_CACHE
+    with _NEG_CACHE_LOCK:
+        if _NEG_CACHE is None:
+            _NEG_CACHE = NegativeCache(path=NEG_CACHE_PATH or None)
+        return _NEG_CACHE
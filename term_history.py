@@ -0,0 +1,84 @@
+# term_history.py
+# 회의별 최근 브로드캐스트 용어 링버퍼 (메모리)
+# - 브로드캐스트되는 item마다 회의별 단조 증가 seq(커서) 부여
+# - join 시 재생(replay), GET /meeting/<id>/terms?since=<seq> 로 조회 → 재접속 폭주 때 디스크/DB 미접근
+# - 회의 수 상한(LRU) + 마지막 append 후 TTL: stop 없이 끝난 회의도 메모리에 계속 남지 않음 (stop 시에는 drop)
+
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+TERM_HISTORY_MAX = int(os.getenv("TERM_HISTORY_MAX", "500"))   # 회의별 보관 개수
+TERM_HISTORY_MEETINGS_MAX = int(os.getenv("TERM_HISTORY_MEETINGS_MAX", "1024"))   # 보관 회의 수 (LRU)
+TERM_HISTORY_TTL_SEC = float(os.getenv("TERM_HISTORY_TTL_SEC", os.getenv("STATE_TTL_SEC", str(24 * 3600))))
+
+
+class TermHistory:
+    def __init__(self, maxlen: int = TERM_HISTORY_MAX, max_meetings: int = TERM_HISTORY_MEETINGS_MAX,
+                 ttl_sec: float = TERM_HISTORY_TTL_SEC):
+        self.maxlen = maxlen
+        self.max_meetings = max_meetings
+        self.ttl_sec = ttl_sec
+        self._rings: Dict[str, deque] = {}
+        self._seq: Dict[str, int] = {}
+        self._touched: "OrderedDict[str, float]" = OrderedDict()   # meeting_id -> 마지막 append 시각 (오래된 순)
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        """self._lock 보유 상태에서 호출: 상한 초과/TTL 만료 회의 제거 (오래된 순이라 앞쪽만 확인)"""
+        while self._touched:
+            mid, t = next(iter(self._touched.items()))
+            if len(self._touched) <= self.max_meetings and now - t < self.ttl_sec:
+                break
+            self._drop_locked(mid)
+
+    def _drop_locked(self, meeting_id: str):
+        self._rings.pop(meeting_id, None)
+        self._seq.pop(meeting_id, None)
+        self._touched.pop(meeting_id, None)
+
+    def append(self, meeting_id: str, items: List[dict]) -> List[dict]:
+        """items에 seq를 붙여 저장하고, seq가 붙은 item 목록 반환 (브로드캐스트에 그대로 사용)"""
+        out = []
+        with self._lock:
+            ring = self._rings.get(meeting_id)
+            if ring is None:
+                ring = self._rings[meeting_id] = deque(maxlen=self.maxlen)
+            seq = self._seq.get(meeting_id, 0)
+            for it in items:
+                seq += 1
+                stamped = {**it, "seq": seq}
+                ring.append(stamped)
+                out.append(stamped)
+            self._seq[meeting_id] = seq
+            now = time.time()
+            self._touched[meeting_id] = now
+            self._touched.move_to_end(meeting_id)
+            self._evict(now)
+        return out
+
+    def since(self, meeting_id: str, cursor: Optional[int] = None,
+              limit: Optional[int] = None) -> Tuple[List[dict], int, bool]:
+        """
+        cursor 이후(seq > cursor) item들 → (items, 현재 커서, truncated)
+        truncated: 요청한 cursor 이후 일부가 이미 링버퍼에서 밀려났음 (클라이언트는 CSV/DB로 보충 가능)
+        """
+        with self._lock:
+            ring = self._rings.get(meeting_id)
+            last = self._seq.get(meeting_id, 0)
+            if not ring:
+                return [], last, False
+            first_seq = ring[0]["seq"]
+            c = cursor or 0
+            items = [it for it in ring if it["seq"] > c] if c >= first_seq else list(ring)
+        truncated = cursor is not None and cursor + 1 < first_seq
+        if limit is not None and len(items) > limit:
+            items = items[-limit:]
+            truncated = True
+        return items, last, truncated
+
+    def drop(self, meeting_id: str):
+        with self._lock:
+            self._drop_locked(meeting_id)
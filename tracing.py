@@ -0,0 +1,106 @@
+# tracing.py
+# STT 요청 → NER → CSV → 큐 → 에이전트 run → /terms POST → WS 브로드캐스트를 하나의 trace로 묶음
+# - 상관관계 ID = W3C traceparent 문자열 ("00-<trace_id>-<span_id>-01")
+#   CSV/작업 dict/HTTP 헤더로 전달되며, 각 단계가 이를 부모로 span을 이어 붙임
+# - OpenTelemetry가 있으면 span 기록:
+#     APPLICATIONINSIGHTS_CONNECTION_STRING → azure-monitor-opentelemetry
+#     TRACE_EXPORTER=console | file (TRACE_FILE, 기본 logs/traces.jsonl) → 오프라인용 로컬 exporter
+#   없거나 비활성이면 traceparent만 생성/전달 (로그 상관관계는 그대로 동작)
+
+import os
+import secrets
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    from opentelemetry import trace as _otel_trace
+    from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+    _PROPAGATOR = TraceContextTextMapPropagator()
+except ImportError:  # 선택 의존성
+    _otel_trace = None
+    _PROPAGATOR = None
+
+TRACE_EXPORTER = (os.getenv("TRACE_EXPORTER") or "").strip().lower()   # "" | console | file
+TRACE_FILE     = os.getenv("TRACE_FILE", os.path.join("logs", "traces.jsonl"))
+SERVICE_NAME   = os.getenv("OTEL_SERVICE_NAME", "glossify-backend")
+
+_INIT_LOCK = threading.Lock()
+_initialized = False
+
+
+def init_tracing():
+    """프로세스당 1회. exporter 설정이 없으면 아무것도 하지 않음."""
+    global _initialized
+    with _INIT_LOCK:
+        if _initialized or _otel_trace is None:
+            return
+        _initialized = True
+        try:
+            if os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING"):
+                from azure.monitor.opentelemetry import configure_azure_monitor
+                configure_azure_monitor()
+                print("[trace] exporting to Azure Monitor")
+                return
+            if TRACE_EXPORTER not in {"console", "file"}:
+                return
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+            provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+            if TRACE_EXPORTER == "file":
+                os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+                out = open(TRACE_FILE, "a", encoding="utf-8")
+                exporter = ConsoleSpanExporter(out=out, formatter=lambda s: s.to_json(indent=None) + "\n")
+            else:
+                exporter = ConsoleSpanExporter()
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+            _otel_trace.set_tracer_provider(provider)
+            print(f"[trace] exporter={TRACE_EXPORTER}" + (f" → {TRACE_FILE}" if TRACE_EXPORTER == "file" else ""))
+        except Exception as e:
+            print(f"[trace] init failed (continuing without spans): {e}")
+
+
+def _random_traceparent() -> str:
+    return f"00-{secrets.token_hex(16)}-{secrets.token_hex(8)}-01"
+
+def trace_id_of(traceparent: Optional[str]) -> str:
+    """traceparent → 32자리 trace_id (로그/페이로드용 상관관계 ID)"""
+    parts = (traceparent or "").split("-")
+    return parts[1] if len(parts) >= 4 else ""
+
+def current_traceparent(fallback: Optional[str] = None) -> str:
+    """
+    현재 활성 span의 traceparent. span이 없으면(OTel 없음/비활성) 이어받은 fallback(클라이언트 헤더,
+    CSV/task의 trace)을 그대로 쓰고, 그것도 없을 때만 새로 생성 → "ID만" 모드에서도 단계 간 trace_id 유지
+    """
+    if _PROPAGATOR is not None:
+        carrier: dict = {}
+        _PROPAGATOR.inject(carrier)
+        if carrier.get("traceparent"):
+            return carrier["traceparent"]
+    if trace_id_of(fallback):
+        return fallback
+    return _random_traceparent()
+
+
+class _NoopSpan:
+    def set_attribute(self, *_a, **_kw): pass
+    def record_exception(self, *_a, **_kw): pass
+
+
+@contextmanager
+def span(name: str, parent: Optional[str] = None, **attrs):
+    """
+    parent(traceparent)를 부모로 span 시작. parent가 없으면 현재 컨텍스트를 이어감.
+    OpenTelemetry가 없으면 no-op.
+    """
+    if _otel_trace is None:
+        yield _NoopSpan()
+        return
+    ctx = _PROPAGATOR.extract({"traceparent": parent}) if parent else None
+    tracer = _otel_trace.get_tracer("glossify")
+    attributes = {f"glossify.{k}": v for k, v in attrs.items() if v is not None}
+    with tracer.start_as_current_span(name, context=ctx, attributes=attributes) as sp:
+        yield sp